@@ -0,0 +1,332 @@
+# batch_analyze.py
+"""
+Analisis batch offline untuk rekaman video (satu file atau folder) dengan kecepatan penuh, tanpa upload.
+
+Setiap video dibagi menjadi potongan frame; potongan diproses paralel oleh beberapa proses worker
+(masing-masing memuat detektor sekali, decode-ahead di thread terpisah, inferensi per batch).
+Hasil per frame (jumlah ayam di ROI & hitungan per sel grid) ditulis per potongan lalu digabung per video,
+sehingga proses yang terhenti bisa dilanjutkan: potongan yang sudah ada dilewati.
+
+Contoh:
+  python batch_analyze.py "D:\\Downloads\\Ayam Panjang.mp4" --out D:\\Downloads\\batch_out
+  python batch_analyze.py D:\\Rekaman --stride 25 --workers 4 --threads 2 --format parquet
+  python batch_analyze.py D:\\Rekaman\\kandang1_0501.mp4 --camera kandang1 --start-time 2024-05-01T06:00:00 --history-db D:\\Downloads\\history.sqlite
+"""
+import argparse, csv, glob, multiprocessing as mp, os, queue, sys, threading, time
+from datetime import datetime, timedelta
+import cv2
+import numpy as np
+from config import Config
+from camera import CameraSource
+from density import compute_grid_density, grid_shape
+from detection_geometry import box_reference_points, points_in_roi_mask, project_to_world
+from detector_backends import load_detector
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".ts")
+
+def list_videos(inputs):
+    """
+    Daftar (path, key) video. key = path relatif terhadap folder input (atau nama file untuk input file), dipakai
+    untuk folder hasil & kolom video, sehingga 0501/kandang1.mp4 dan 0502/kandang1.mp4 tidak saling menimpa.
+    """
+    videos = {}
+    for path in inputs:
+        if os.path.isdir(path):
+            found = sorted(p for p in glob.glob(os.path.join(path, "**", "*"), recursive=True) if p.lower().endswith(VIDEO_EXTENSIONS))
+            entries = [(p, os.path.relpath(p, path)) for p in found]
+        else:
+            entries = [(path, os.path.basename(path))]
+        for video, key in entries:
+            videos.setdefault(os.path.abspath(video), (video, key.replace(os.sep, "/")))
+    keys = {}
+    for video, key in videos.values():
+        output_key = os.path.splitext(key)[0].lower()
+        if output_key in keys:
+            raise ValueError(f"Hasil '{keys[output_key]}' dan '{video}' akan ditulis ke folder yang sama ({os.path.splitext(key)[0]}); "
+                             "proses terpisah dengan --out berbeda, atau pilih folder induknya sebagai input.")
+        keys[output_key] = video
+    return list(videos.values())
+
+def plan_chunks(videos, chunk_frames, stride):
+    """Potongan (video, frame awal, frame akhir) dengan batas kelipatan stride agar hasilnya sama dengan satu pass penuh."""
+    chunk_frames = max(stride, chunk_frames - chunk_frames % stride)
+    chunks = []
+    for video, key in videos:
+        cap = cv2.VideoCapture(video)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        cap.release()
+        if total <= 0:
+            print(f"[Batch] Video tidak bisa dibaca atau jumlah frame tidak diketahui, dilewati: {video}")
+            continue
+        for start in range(0, total, chunk_frames):
+            chunks.append({"video": video, "key": key, "start": start, "end": min(start + chunk_frames, total), "fps": fps, "stride": stride})
+    return chunks
+
+def video_output_dir(out_dir, key):
+    return os.path.join(out_dir, *os.path.splitext(key)[0].split("/"))
+
+def chunk_output_path(out_dir, chunk, fmt):
+    return os.path.join(video_output_dir(out_dir, chunk["key"]), f"chunk_{chunk['start']:09d}.{fmt}")
+
+def write_rows(path, rows, columns, fmt):
+    """Tulis atomik (file .tmp lalu rename) agar potongan setengah jadi tidak dianggap selesai saat resume."""
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        import pandas as pd
+        pd.DataFrame(rows, columns=columns).to_parquet(tmp_path, index=False)
+    else:
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+def read_rows(path, fmt):
+    if fmt == "parquet":
+        import pandas as pd
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def merge_video_chunks(out_dir, key, fmt):
+    """Gabungkan potongan satu video menjadi <key tanpa ekstensi>.<fmt> di out_dir (urut frame)."""
+    chunk_paths = sorted(glob.glob(os.path.join(video_output_dir(out_dir, key), f"chunk_*.{fmt}")))
+    merged_path = f"{video_output_dir(out_dir, key)}.{fmt}"
+    if fmt == "parquet":
+        import pandas as pd
+        pd.concat([pd.read_parquet(p) for p in chunk_paths], ignore_index=True).to_parquet(merged_path, index=False)
+    else:
+        with open(merged_path, "w", newline="") as out:
+            for i, chunk_path in enumerate(chunk_paths):
+                with open(chunk_path, newline="") as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    out.write(f.read())
+    return merged_path
+
+class DecodeAhead:
+    """Thread decode yang mengisi antrean terbatas; frame yang dilewati stride hanya di-grab, tidak di-decode."""
+    def __init__(self, video, start, end, stride, max_width=None, depth=8):
+        self.frames = queue.Queue(maxsize=depth)
+        self.source_size = None
+        self._args = (video, start, end, stride, max_width)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        video, start, end, stride, max_width = self._args
+        cap = cv2.VideoCapture(video)
+        try:
+            if start:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            for index in range(start, end):
+                if not cap.grab():
+                    break
+                if (index - start) % stride:
+                    continue
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                if self.source_size is None:
+                    self.source_size = (frame.shape[1], frame.shape[0])
+                if max_width and frame.shape[1] > max_width:
+                    scale = max_width / frame.shape[1]
+                    frame = cv2.resize(frame, (max_width, int(round(frame.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+                self.frames.put((index, frame))
+        finally:
+            cap.release()
+            self.frames.put(None)
+
+    def __iter__(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            yield item
+
+# --- Worker (satu detektor per proses) ---
+_worker = {}
+
+def _init_worker(options, frames_done):
+    cv2.setNumThreads(1)  # paralelisme dari jumlah proses; decode & resize cukup satu thread per worker
+    cfg = Config()
+    camera_cfg = next((c for c in cfg.get_camera_configs() if c["name"] == options["camera"]), None) if options["camera"] else cfg.get_camera_configs()[0]
+    if camera_cfg is None:
+        raise ValueError(f"Kamera '{options['camera']}' tidak ada di Config")
+    camera = CameraSource(camera_cfg["name"], camera_cfg["video_source"], camera_cfg["homography_matrix_path"], camera_cfg["selected_area_points_path"])
+    if not camera.is_ready():
+        raise RuntimeError(f"Kalibrasi kamera '{camera.name}' tidak lengkap")
+    model = load_detector(options["model"], cfg.DETECTOR_BACKEND, options["threads"], names={0: cfg.TARGET_CLASS_NAME})
+    tiled_detector = None
+    if options["tiled"]:
+        from tiled_inference import TiledDetector
+        tiled_detector = TiledDetector(cfg.TILE_SIZE, cfg.TILE_OVERLAP, cfg.TILE_NMS_IOU, cfg.TILED_INCLUDE_FULL_FRAME)
+    target_ids = [idx for idx, name in model.names.items() if name.lower() == cfg.TARGET_CLASS_NAME.lower()]
+    _worker.update(cfg=cfg, camera=camera, model=model, tiled_detector=tiled_detector, target_ids=target_ids,
+                   options=options, frames_done=frames_done)
+
+def _extract(result):
+    keep = np.isin(result.cls, _worker["target_ids"])
+    return result.xyxy[keep], result.conf[keep]
+
+def _detect(frames):
+    if _worker["tiled_detector"] is not None:
+        detections = _worker["tiled_detector"].detect(_worker["model"], frames, [_worker["camera"]] * len(frames), _extract, conf=_worker["options"]["conf"])
+        return [d["xyxy"] for d in detections]
+    return [_extract(result)[0] for result in _worker["model"].predict(frames, conf=_worker["options"]["conf"])]
+
+def output_columns(cfg):
+    num_cols, num_rows = grid_shape(cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y)
+    cells = [f"cell_{c}_{r}" for r in range(num_rows) for c in range(num_cols)]
+    return ["video", "frame_index", "time_s", "timestamp", "detections", "chickens_in_roi_count", "alerts"] + cells
+
+def _frame_row(chunk, index, frame, xyxy):
+    cfg, camera, options = _worker["cfg"], _worker["camera"], _worker["options"]
+    _, test_points, center_points = box_reference_points(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+    calibration = camera.calibration_for(frame.shape)
+    in_roi = points_in_roi_mask(test_points, calibration["roi_mask"])
+    x_world, y_world = project_to_world(center_points[in_roi], calibration["homography"], cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M)
+    density = compute_grid_density(x_world, y_world, cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y, cfg.MAX_AYAM_PER_METER_PERSEGI)
+    time_s = index / chunk["fps"]
+    row = {
+        "video": chunk["key"],
+        "frame_index": index,
+        "time_s": round(time_s, 3),
+        "timestamp": (options["start_time"] + timedelta(seconds=time_s)).isoformat() if options["start_time"] else "",
+        "detections": len(xyxy),
+        "chickens_in_roi_count": int(in_roi.sum()),
+        "alerts": len(density["alerts"])
+    }
+    counts = density["counts"]
+    for r in range(counts.shape[0]):
+        for c in range(counts.shape[1]):
+            row[f"cell_{c}_{r}"] = int(counts[r, c])
+    return row
+
+def process_chunk(chunk):
+    """Decode-ahead + inferensi per batch untuk satu potongan; hasil ditulis ke file potongan. Mengembalikan ringkasan."""
+    options = _worker["options"]
+    started = time.perf_counter()
+    reader = DecodeAhead(chunk["video"], chunk["start"], chunk["end"], chunk["stride"], options["max_width"])
+    rows, batch = [], []
+
+    def flush():
+        if reader.source_size is not None:
+            _worker["camera"].source_frame_size = reader.source_size  # kalibrasi diskalakan jika frame diperkecil
+        for (index, frame), xyxy in zip(batch, _detect([frame for _, frame in batch])):
+            rows.append(_frame_row(chunk, index, frame, xyxy))
+        with _worker["frames_done"].get_lock():
+            _worker["frames_done"].value += len(batch)
+        batch.clear()
+
+    for item in reader:
+        batch.append(item)
+        if len(batch) >= options["batch"]:
+            flush()
+    if batch:
+        flush()
+    path = chunk_output_path(options["out"], chunk, options["format"])
+    write_rows(path, rows, output_columns(_worker["cfg"]), options["format"])
+    return {"chunk": chunk, "path": path, "frames": len(rows), "seconds": time.perf_counter() - started}
+
+def _progress_loop(frames_done, total_frames, started, stop_event):
+    while not stop_event.wait(2.0):
+        done = frames_done.value
+        elapsed = time.perf_counter() - started
+        fps = done / elapsed if elapsed > 0 else 0.0
+        eta = (total_frames - done) / fps if fps > 0 else float("inf")
+        print(f"[Batch] {done}/{total_frames} frame ({100 * done / max(total_frames, 1):.1f}%) | {fps:.1f} frame/s | ETA {eta / 60:.1f} menit", flush=True)
+
+def record_history(history_db, cfg, rows_by_video):
+    """Isi riwayat lokal (/api/history) dari hasil batch; membutuhkan kolom timestamp (--start-time)."""
+    from history_store import HistoryStore
+    history = HistoryStore(history_db, cfg.HISTORY_RETENTION_DAYS, cfg.HISTORY_MAX_POINTS)
+    num_cols, num_rows = grid_shape(cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y)
+    recorded = 0
+    for camera_name, rows in rows_by_video:
+        for row in rows:
+            counts = [[int(row[f"cell_{c}_{r}"]) for c in range(num_cols)] for r in range(num_rows)]
+            history.record_cycle(datetime.fromisoformat(row["timestamp"]),
+                                 {camera_name: {"chickens_in_roi_count": int(row["chickens_in_roi_count"]), "grid_counts": counts}})
+            recorded += 1
+    history.close()
+    return recorded
+
+if __name__ == "__main__":
+    cfg = Config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="file video atau folder berisi video")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(cfg.TEMP_PLOT_DIR), "batch_out"))
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="parquet membutuhkan pandas + pyarrow")
+    parser.add_argument("--model", default=cfg.YOLO_MODEL_PATH_SMALL)
+    parser.add_argument("--camera", default=None, help="nama kamera di Config untuk kalibrasi (default: kamera pertama)")
+    parser.add_argument("--conf", type=float, default=0.2)
+    parser.add_argument("--stride", type=int, default=1, help="proses 1 dari setiap N frame")
+    parser.add_argument("--batch", type=int, default=8, help="frame per panggilan detektor")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="jumlah proses inferensi")
+    parser.add_argument("--threads", type=int, default=2, help="thread inferensi per worker (DETECTOR_NUM_THREADS)")
+    parser.add_argument("--chunk-frames", type=int, default=3000, help="frame sumber per potongan (satuan resume)")
+    parser.add_argument("--max-width", type=int, default=cfg.FRAME_DECODE_MAX_WIDTH, help="perkecil frame saat decode")
+    parser.add_argument("--tiled", action="store_true", default=cfg.TILED_INFERENCE_ENABLED, help="inferensi ber-tile seperti siklus pemetaan")
+    parser.add_argument("--start-time", default=None, help="waktu rekam frame 0 (ISO 8601), untuk kolom timestamp")
+    parser.add_argument("--history-db", default=None, help="isi juga riwayat lokal (HistoryStore) dari hasil batch; butuh --start-time")
+    args = parser.parse_args()
+    if args.history_db and not args.start_time:
+        parser.error("--history-db membutuhkan --start-time")
+
+    try:
+        videos = list_videos(args.inputs)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.start_time and len(videos) > 1:
+        parser.error("--start-time hanya berlaku untuk satu video")
+    chunks = plan_chunks(videos, args.chunk_frames, max(1, args.stride))
+    pending = [chunk for chunk in chunks if not os.path.exists(chunk_output_path(args.out, chunk, args.format))]
+    for _, key in videos:
+        os.makedirs(video_output_dir(args.out, key), exist_ok=True)
+    total_frames = sum(len(range(c["start"], c["end"], c["stride"])) for c in pending)
+    print(f"[Batch] {len(videos)} video, {len(chunks)} potongan ({len(chunks) - len(pending)} sudah selesai, dilanjutkan), "
+          f"{total_frames} frame untuk diproses dengan {args.workers} worker x {args.threads} thread.")
+
+    options = {"model": args.model, "camera": args.camera, "conf": args.conf, "batch": args.batch, "threads": args.threads,
+               "max_width": args.max_width, "tiled": args.tiled, "out": args.out, "format": args.format,
+               "start_time": datetime.fromisoformat(args.start_time) if args.start_time else None}
+    ctx = mp.get_context("spawn")  # aman untuk runtime inferensi yang tidak fork-safe (torch, OpenVINO)
+    frames_done = ctx.Value("q", 0)
+    started = time.perf_counter()
+    stop_progress = threading.Event()
+    threading.Thread(target=_progress_loop, args=(frames_done, total_frames, started, stop_progress), daemon=True).start()
+    pool = None
+    try:
+        if args.workers <= 1:
+            _init_worker(options, frames_done)
+            results = map(process_chunk, pending)
+        else:
+            pool = ctx.Pool(args.workers, initializer=_init_worker, initargs=(options, frames_done))
+            results = pool.imap_unordered(process_chunk, pending)
+        for result in results:
+            chunk = result["chunk"]
+            print(f"[Batch] {chunk['key']} frame {chunk['start']}-{chunk['end']}: "
+                  f"{result['frames']} frame dalam {result['seconds']:.1f} s -> {result['path']}", flush=True)
+    except KeyboardInterrupt:
+        print("\n[Batch] Dihentikan; jalankan perintah yang sama untuk melanjutkan dari potongan terakhir.")
+        sys.exit(1)
+    finally:
+        stop_progress.set()
+        if pool is not None:
+            pool.terminate()
+    elapsed = time.perf_counter() - started
+    print(f"[Batch] Selesai: {frames_done.value} frame dalam {elapsed:.1f} s ({frames_done.value / max(elapsed, 1e-9):.1f} frame/s).")
+
+    rows_by_video = []
+    for video, key in videos:
+        if not any(c["video"] == video for c in chunks):
+            continue
+        merged_path = merge_video_chunks(args.out, key, args.format)
+        print(f"[Batch] Hasil {key}: {merged_path}")
+        if args.history_db:
+            rows_by_video.append((args.camera or cfg.get_camera_configs()[0]["name"], read_rows(merged_path, args.format)))
+    if args.history_db:
+        print(f"[Batch] {record_history(args.history_db, cfg, rows_by_video)} baris ditambahkan ke riwayat {args.history_db}.")
@@ -0,0 +1,107 @@
+# benchmarks/bench_detector_backends.py
+"""Latensi, throughput, waktu import/muat, dan RSS tiap backend detektor pada frame yang sama.
+
+Setiap model dijalankan di proses terpisah agar waktu import (mis. torch) dan RSS tidak saling tercampur.
+
+Jalankan dari root repo:
+  python benchmarks/bench_detector_backends.py D:\\Downloads\\v8n.pt D:\\Downloads\\v8n.onnx D:\\Downloads\\v8n_int8.onnx D:\\Downloads\\v8n_openvino_model
+  [--video "D:\\Downloads\\Ayam Panjang.mp4"] [--frames 30] [--batch 2]
+"""
+import argparse, json, os, subprocess, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def rss_mb():
+    """RSS proses saat ini dalam MB (psutil jika ada; jika tidak, /proc di Linux)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    return float("nan")
+
+def load_frames(video_path, num_frames):
+    import cv2
+    import numpy as np
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < num_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8) for _ in range(num_frames)]
+    return frames
+
+def run_worker(model_path, backend, video_path, num_frames, batch, num_threads):
+    import numpy as np
+    from detector_backends import load_detector, resolve_backend
+    frames = load_frames(video_path, num_frames)
+    rss_before = rss_mb()
+    import_start = time.perf_counter()
+    detector = load_detector(model_path, backend, num_threads)
+    load_s = time.perf_counter() - import_start
+    rss_loaded = rss_mb()
+
+    detector.predict(frames[:batch], conf=0.25)  # pemanasan
+    latencies, detections = [], 0
+    for i in range(0, len(frames), batch):
+        chunk = frames[i:i + batch]
+        t0 = time.perf_counter()
+        results = detector.predict(chunk, conf=0.25)
+        latencies.append((time.perf_counter() - t0) / len(chunk))
+        detections += sum(len(r) for r in results)
+    lat = np.array(latencies) * 1000
+    return {
+        "model": model_path,
+        "backend": resolve_backend(model_path, backend),
+        "import_load_s": round(load_s, 2),
+        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+        "fps": round(1000 / float(lat.mean()), 1),
+        "rss_model_mb": round(rss_loaded - rss_before, 0),
+        "rss_peak_mb": round(rss_mb(), 0),
+        "detections_per_frame": round(detections / len(frames), 1)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("models", nargs="+")
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.models[0], args.backend, args.video, args.frames, args.batch, args.threads)))
+        sys.exit(0)
+
+    rows = []
+    for model_path in args.models:
+        command = [sys.executable, os.path.abspath(__file__), model_path, "--worker", "--backend", args.backend,
+                   "--frames", str(args.frames), "--batch", str(args.batch), "--threads", str(args.threads)]
+        if args.video:
+            command += ["--video", args.video]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"[{model_path}] gagal:\n{completed.stderr.strip()[-2000:]}")
+            continue
+        rows.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(f"{'model':<40} | {'backend':<11} | {'muat s':>6} | {'p50 ms':>7} | {'p95 ms':>7} | {'fps':>6} | {'RSS model MB':>12} | {'RSS MB':>7} | {'det/frame':>9}")
+    for row in rows:
+        print(f"{os.path.basename(row['model'].rstrip(os.sep)):<40} | {row['backend']:<11} | {row['import_load_s']:>6} | {row['p50_ms']:>7} | {row['p95_ms']:>7} | {row['fps']:>6} | {row['rss_model_mb']:>12} | {row['rss_peak_mb']:>7} | {row['detections_per_frame']:>9}")
@@ -0,0 +1,66 @@
+# benchmarks/bench_frame_handoff.py
+"""Benchmark serah-terima frame reader -> analyzer: pola lama (frame.copy() di reader & get_latest_frame) vs FrameSlotRing.
+
+Decoder disimulasikan dengan mengisi buffer frame (biaya tulis memori setara decode); reader berjalan
+secepat mungkin sementara analyzer mengambil satu frame setiap FRAMES_PER_ANALYSIS frame (25 fps kamera, analisis 1 Hz).
+
+Jalankan dari root repo:  python benchmarks/bench_frame_handoff.py
+"""
+import os, sys, threading, time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_slots import FrameSlotRing
+
+SOURCE_FPS = 25
+FRAMES_PER_ANALYSIS = SOURCE_FPS  # STREAM_PROCESSING_INTERVAL_S = 1.0
+NUM_FRAMES = 250
+
+def fake_decode(seq, shape, out=None):
+    """Seperti cap.read(): mengisi buffer yang diberikan, atau mengalokasikan array baru jika tidak ada."""
+    if out is None or out.shape != shape:
+        out = np.empty(shape, dtype=np.uint8)
+    out.fill(seq & 0xFF)
+    return True, out
+
+def run_legacy(shape):
+    state = {"latest": None, "bytes_copied": 0, "copies": 0}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    for seq in range(1, NUM_FRAMES + 1):
+        ret, frame = fake_decode(seq, shape)
+        with lock:
+            state["latest"] = frame.copy()
+            state["bytes_copied"] += frame.nbytes
+            state["copies"] += 1
+        if seq % FRAMES_PER_ANALYSIS == 0:
+            # get_latest_frame() lama: salinan lagi untuk analyzer
+            with lock:
+                analysis_frame = state["latest"].copy()
+                state["bytes_copied"] += analysis_frame.nbytes
+                state["copies"] += 1
+    return time.perf_counter() - start, state["copies"], state["bytes_copied"]
+
+def run_ring(shape):
+    ring = FrameSlotRing(4)
+    start = time.perf_counter()
+    for seq in range(1, NUM_FRAMES + 1):
+        slot = ring.begin_write()
+        buffer = ring.slot_buffer(slot) if slot is not None else None
+        ret, frame = fake_decode(seq, shape, buffer)
+        if slot is not None:
+            ring.commit_write(slot, frame)
+        if seq % FRAMES_PER_ANALYSIS == 0:
+            # Analyzer tetap butuh salinan writable karena menggambar kotak deteksi
+            ring.copy_latest()
+    stats = ring.stats()
+    return time.perf_counter() - start, stats["copies"], stats["bytes_copied"]
+
+if __name__ == "__main__":
+    print(f"{'resolusi':<10} | {'lama ms/frame':>13} | {'ring ms/frame':>13} | {'salinan lama':>12} | {'salinan ring':>12} | {'hemat MB/s @25fps':>17}")
+    for name, (width, height) in (("720p", (1280, 720)), ("1080p", (1920, 1080)), ("4K", (3840, 2160))):
+        shape = (height, width, 3)
+        t_old, copies_old, bytes_old = run_legacy(shape)
+        t_new, copies_new, bytes_new = run_ring(shape)
+        saved_mb_s = (bytes_old - bytes_new) / NUM_FRAMES * SOURCE_FPS / 1e6
+        print(f"{name:<10} | {t_old / NUM_FRAMES * 1000:>13.2f} | {t_new / NUM_FRAMES * 1000:>13.2f} | {copies_old:>12} | {copies_new:>12} | {saved_mb_s:>17.0f}")
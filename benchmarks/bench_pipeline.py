@@ -0,0 +1,330 @@
+# benchmarks/bench_pipeline.py
+"""Benchmark pipeline analisis per tahap (terisolasi) dan ujung-ke-ujung, dengan perbandingan terhadap baseline.
+
+Tahap: frame_read, analyze_annotate (_analyze_and_annotate_frames), process_detections, density_plot,
+temperature_heatmap, mjpeg_encode (FrameBroadcastHub), mjpeg_encode_480 (varian ?width=480&quality=50),
+upload (FakeSupabaseHandler lokal), motion_score (MotionGate), serta live_tick (baca -> analisis -> encode) dan
+mapping_cycle (_run_mapping_on_frames + upload) sebagai ujung-ke-ujung.
+Setiap tahap dijalankan di proses terpisah agar RSS puncak & CPU tidak saling tercampur.
+
+Sumber frame: --video klip rekaman, atau frame sintetis yang ditulis dulu ke klip MJPG sementara (frame_read
+tetap men-decode video sungguhan). Detektor sintetis (box acak deterministik) dipakai kecuali --model diberikan.
+Kalibrasi, Supabase, dan direktori kerja dibuat di folder sementara; tidak ada yang menyentuh jaringan.
+
+Jalankan dari root repo:
+  python benchmarks/bench_pipeline.py [--video "D:\\Downloads\\Ayam Panjang.mp4"] [--model D:\\Downloads\\v8n.onnx] [--iterations 50] [--out hasil.json]
+  python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline_pipeline.json
+  python benchmarks/bench_pipeline.py --baseline benchmarks/baseline_pipeline.json [--tolerance 0.15]   # exit 1 jika ada regresi
+"""
+import argparse, json, os, platform, subprocess, sys, tempfile, time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_detector_backends import rss_mb
+
+STAGES = ["frame_read", "analyze_annotate", "process_detections", "density_plot", "temperature_heatmap",
+          "mjpeg_encode", "mjpeg_encode_480", "upload", "live_tick", "motion_score", "mapping_cycle"]
+COMPARED_METRICS = ("p50_ms", "p95_ms")
+NOISE_FLOOR_MS = 0.5  # selisih di bawah ini tidak dianggap regresi
+
+class SyntheticDetector:
+    """Pengganti detektor: jumlah box tetap per gambar, posisi acak deterministik, keluaran Detections."""
+    backend_name = "synthetic"
+
+    def __init__(self, target_class_name, boxes_per_image=60, seed=0):
+        import numpy as np
+        self.names = {0: target_class_name}
+        self.boxes_per_image = boxes_per_image
+        self._rng = np.random.default_rng(seed)
+
+    def predict(self, images, conf=0.25, imgsz=None):
+        import numpy as np
+        from detector_backends import Detections
+        results = []
+        for image in images:
+            height, width = image.shape[:2]
+            n = self.boxes_per_image
+            size = 0.04 * width
+            x = self._rng.uniform(0, width - size, n)
+            y = self._rng.uniform(0, height - size, n)
+            xyxy = np.stack([x, y, x + size, y + size], axis=1).astype(np.float32)
+            results.append(Detections(xyxy, self._rng.uniform(conf, 1.0, n).astype(np.float32), np.zeros(n, dtype=np.int64)))
+        return results
+
+def write_synthetic_clip(path, num_frames, width, height):
+    """Klip MJPG dengan latar gradien & persegi bergerak, agar decode & encode JPEG mendekati frame kandang."""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(0)
+    base = np.zeros((height, width, 3), dtype=np.uint8)
+    base[..., 0] = np.linspace(40, 120, width, dtype=np.uint8)[None, :]
+    base[..., 1] = np.linspace(60, 140, height, dtype=np.uint8)[:, None]
+    base[..., 2] = 90
+    blobs = rng.uniform(0, 1, (80, 2)) * [width, height]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (width, height))
+    for i in range(num_frames):
+        frame = base.copy()
+        for bx, by in (blobs + i * 2) % [width, height]:
+            cv2.ellipse(frame, (int(bx), int(by)), (int(0.02 * width), int(0.012 * width)), 0, 0, 360, (230, 230, 220), -1)
+        writer.write(frame)
+    writer.release()
+
+def write_calibration(work_dir, width, height, world_w, world_h):
+    """ROI persegi (5% dari tepi) yang dipetakan homografi ke seluruh area lantai."""
+    import cv2
+    import numpy as np
+    roi = np.array([[0.05 * width, 0.05 * height], [0.95 * width, 0.05 * height], [0.95 * width, 0.95 * height], [0.05 * width, 0.95 * height]], dtype=np.float32)
+    world = np.array([[0, 0], [world_w, 0], [world_w, world_h], [0, world_h]], dtype=np.float32)
+    homography_path, roi_path = os.path.join(work_dir, "homography.npy"), os.path.join(work_dir, "roi.npy")
+    np.save(homography_path, cv2.getPerspectiveTransform(roi, world))
+    np.save(roi_path, roi.astype(np.int32))
+    return homography_path, roi_path
+
+def build_context(args, work_dir):
+    """Analyzer lengkap dengan kalibrasi, Supabase palsu, dan detektor (sintetis/model) di direktori sementara."""
+    import cv2
+    from config import Config
+    from fake_supabase import FakeSupabaseHandler
+    from chicken_analyzer import ChickenDensityAnalyzer
+    from mjpeg_streamer import FrameBroadcastHub
+
+    video = args.video
+    if not video:
+        video = os.path.join(work_dir, "synthetic.avi")
+        write_synthetic_clip(video, 50, args.width, args.height)
+    cap = cv2.VideoCapture(video)
+    ok, first_frame = cap.read()
+    cap.release()
+    if not ok:
+        raise RuntimeError(f"Tidak ada frame yang terbaca dari {video}")
+
+    config = Config()
+    config.CAMERAS = None
+    config.VIDEO_SOURCE = video
+    config.HOMOGRAPHY_MATRIX_PATH, config.SELECTED_AREA_POINTS_PATH = write_calibration(
+        work_dir, first_frame.shape[1], first_frame.shape[0], config.REAL_WORLD_WIDTH_M, config.REAL_WORLD_HEIGHT_M)
+    config.OUTBOX_ENABLED = False  # tahap upload diukur langsung (sinkron) terhadap Supabase palsu
+    config.HISTORY_ENABLED = False
+    config.SAVE_DEBUG_ARTIFACTS = False
+    config.TEMP_PLOT_DIR = os.path.join(work_dir, "plots")
+    config.CALIBRATION_CACHE_DIR = os.path.join(work_dir, "calibration_cache")
+    supabase = FakeSupabaseHandler(os.path.join(work_dir, "supabase"), latency_s=args.upload_latency)
+    analyzer = ChickenDensityAnalyzer(config, supabase, None, defer_model_loading=True)
+    if args.model:
+        from detector_backends import load_detector
+        analyzer.yolo_model_n = analyzer.yolo_model_s = load_detector(args.model, config.DETECTOR_BACKEND, config.DETECTOR_NUM_THREADS, names={0: config.TARGET_CLASS_NAME})
+    else:
+        analyzer.yolo_model_n = analyzer.yolo_model_s = SyntheticDetector(config.TARGET_CLASS_NAME, args.boxes)
+    analyzer.models_loaded.set()
+    return {"config": config, "analyzer": analyzer, "camera": analyzer.primary_camera, "supabase": supabase,
+            "hub": FrameBroadcastHub(config.MJPEG_JPEG_QUALITY), "video": video, "frame": first_frame}
+
+class ClipReader:
+    """Baca klip berulang seperti pembaca kamera: decode langsung ke slot FrameSlotRing, kembali ke awal di akhir klip."""
+    def __init__(self, camera, video):
+        import cv2
+        self.cv2, self.camera, self.video = cv2, camera, video
+        self.cap = cv2.VideoCapture(video)
+
+    def read(self):
+        ring = self.camera.frame_ring
+        slot = ring.begin_write()
+        buffer = ring.slot_buffer(slot) if slot is not None else None
+        ok, frame = self.cap.read(buffer) if buffer is not None else self.cap.read()
+        if not ok:
+            self.cap.release()
+            self.cap = self.cv2.VideoCapture(self.video)
+            ok, frame = self.cap.read(buffer) if buffer is not None else self.cap.read()
+        if slot is None:
+            ring.write_copy(frame)
+        elif ok:
+            ring.commit_write(slot, frame)
+        else:
+            ring.abort_write(slot)
+        return ring.copy_latest()[1]
+
+def stage_operation(stage, ctx):
+    """Fungsi tanpa argumen yang menjalankan satu iterasi tahap."""
+    analyzer, camera, frame, config = ctx["analyzer"], ctx["camera"], ctx["frame"], ctx["config"]
+    timestamp = datetime.now()
+    detections = analyzer._extract_target_boxes(analyzer.yolo_model_s, analyzer.yolo_model_s.predict([frame], conf=0.2)[0])
+    detections = {"xyxy": detections[0], "conf": detections[1]}
+    _, world_coords, _ = analyzer._process_detections(frame.copy(), detections, camera)
+    density_result = analyzer._compute_density(world_coords, analyzer._cell_area(camera, frame.shape))
+    sensor_data = ctx["supabase"].get_latest_temperature_data()
+
+    if stage == "frame_read":
+        reader = ClipReader(camera, ctx["video"])
+        return reader.read
+    if stage == "analyze_annotate":
+        return lambda: analyzer._analyze_and_annotate_frames([frame.copy()], [camera])
+    if stage == "process_detections":
+        return lambda: analyzer._process_detections(frame.copy(), detections, camera)
+    if stage == "density_plot":
+        return lambda: analyzer._create_density_plot(world_coords, density_result, timestamp)
+    if stage == "temperature_heatmap":
+        return lambda: analyzer._create_temperature_heatmap(timestamp, sensor_data)
+    if stage == "mjpeg_encode":
+        annotated = analyzer._analyze_and_annotate_frames([frame.copy()], [camera])[0]
+        return lambda: ctx["hub"]._encode(annotated)
+    if stage == "mjpeg_encode_480":
+        from mjpeg_streamer import StreamVariant
+        annotated = analyzer._analyze_and_annotate_frames([frame.copy()], [camera])[0]
+        variant = StreamVariant(width=480, quality=50)
+        return lambda: variant.encode(annotated)
+    if stage == "upload":
+        counter = iter(range(10 ** 9))
+        def upload():
+            i = next(counter)
+            artifacts = {
+                "heatmap": analyzer._artifact(config.BUCKET_HEATMAP_NAME, analyzer._create_temperature_heatmap(timestamp, sensor_data), f"heatmap_{i}.png", "image/png"),
+                "snapshot": analyzer._artifact(config.BUCKET_SNAPSHOT_NAME, ctx["snapshot_jpg"], f"snapshot_{i}.jpg", "image/jpeg"),
+                "plot": analyzer._artifact(config.BUCKET_PLOT_NAME, ctx["plot_png"], f"plot_{i}.png", "image/png")
+            }
+            rows = [{"row": {"chickens_in_roi_count": 0, "grid_density_data": density_result["grid_data"]},
+                     "url_fields": {"source_screenshot_url": "snapshot", "density_plot_url": "plot", "heatmap_plot_url": "heatmap"},
+                     "required": ["source_screenshot_url", "density_plot_url"]}]
+            analyzer._publish(artifacts, rows)
+        # Artefak dibuat sekali di luar pengukuran; yang diukur hanya upload + insert (heatmap ikut karena murah & ter-cache)
+        import cv2
+        ctx["snapshot_jpg"] = cv2.imencode(".jpg", frame)[1].tobytes()
+        ctx["plot_png"] = analyzer._create_density_plot(world_coords, density_result, timestamp)
+        return upload
+    if stage == "live_tick":
+        reader = ClipReader(camera, ctx["video"])
+        def live_tick():
+            annotated = analyzer._analyze_and_annotate_frames([reader.read()], [camera])[0]
+            ctx["hub"]._encode(annotated)
+        return live_tick
+    if stage == "motion_score":
+        # Biaya gerbang gerak per tick (yang menggantikan inferensi saat kandang tenang)
+        from motion_gate import MotionGate
+        gate, reader = MotionGate(score_width=config.MOTION_SCORE_WIDTH), ClipReader(camera, ctx["video"])
+        roi_mask = camera.calibration_for(frame.shape)["roi_mask"]
+        def motion_score():
+            gate.score(reader.read(), roi_mask)
+            gate.record(gate.decide(gate.last_score))
+        return motion_score
+    if stage == "mapping_cycle":
+        return lambda: analyzer._run_mapping_on_frames([camera], [frame])
+    raise ValueError(f"Tahap tidak dikenal: {stage}")
+
+def run_stage(stage, args):
+    """Dijalankan di proses worker: pemanasan, lalu ukur latensi, CPU, dan RSS per iterasi."""
+    import contextlib, io
+    import numpy as np
+    with tempfile.TemporaryDirectory() as work_dir:
+        with contextlib.redirect_stdout(io.StringIO()):  # print pipeline tidak ikut mengotori hasil
+            ctx = build_context(args, work_dir)
+            operation = stage_operation(stage, ctx)
+            for _ in range(args.warmup):
+                operation()
+        rss_start = rss_mb()
+        rss_peak = rss_start
+        latencies = []
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.iterations):
+                t0 = time.perf_counter()
+                operation()
+                latencies.append(time.perf_counter() - t0)
+                rss_peak = max(rss_peak, rss_mb())
+        cpu_s, wall_s = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    lat = np.array(latencies) * 1000
+    return {
+        "iterations": len(latencies),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+        "mean_ms": round(float(lat.mean()), 3),
+        "throughput_per_s": round(len(lat) / (lat.sum() / 1000), 1),
+        "cpu_percent": round(100 * cpu_s / wall_s, 1),  # > 100 berarti lebih dari satu core terpakai
+        "rss_start_mb": round(rss_start, 1),
+        "rss_peak_mb": round(rss_peak, 1)
+    }
+
+def environment_info(args):
+    import cv2
+    import numpy as np
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "video": args.video or f"sintetis {args.width}x{args.height}",
+        "model": args.model or f"sintetis ({args.boxes} box)",
+        "iterations": args.iterations,
+        "upload_latency_s": args.upload_latency
+    }
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Daftar (tahap, metrik, baseline, sekarang, rasio, regresi?) untuk tahap yang ada di kedua hasil."""
+    rows = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            ratio = current[metric] / previous[metric] if previous[metric] else float("inf")
+            regression = ratio > 1 + tolerance and current[metric] - previous[metric] > NOISE_FLOOR_MS
+            rows.append((stage, metric, previous[metric], current[metric], ratio, regression))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", default=None, help="klip rekaman; tanpa ini dipakai frame sintetis")
+    parser.add_argument("--model", default=None, help="model detektor sungguhan (.pt/.onnx/OpenVINO); tanpa ini detektor sintetis")
+    parser.add_argument("--stages", default=",".join(STAGES), help="tahap dipisah koma")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--boxes", type=int, default=60, help="box per frame untuk detektor sintetis")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--upload-latency", type=float, default=0.0, help="latensi simulasi per upload ke Supabase palsu (detik)")
+    parser.add_argument("--out", default=None, help="tulis hasil JSON ke file ini")
+    parser.add_argument("--baseline", default=None, help="bandingkan dengan hasil JSON sebelumnya")
+    parser.add_argument("--save-baseline", default=None, help="simpan hasil sebagai baseline baru")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="kenaikan relatif p50/p95 yang masih diterima")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_stage(args.worker, args)))
+        sys.exit(0)
+
+    results = {"meta": environment_info(args), "stages": {}}
+    for stage in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--worker", stage], capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"[{stage}] gagal:\n{completed.stderr.strip()[-2000:]}")
+            continue
+        results["stages"][stage] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    print(f"{'tahap':<20} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'ops/s':>7} | {'CPU %':>6} | {'RSS puncak MB':>13}")
+    for stage, row in results["stages"].items():
+        print(f"{stage:<20} | {row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f} | {row['p99_ms']:>8.2f} | {row['throughput_per_s']:>7} | {row['cpu_percent']:>6} | {row['rss_peak_mb']:>13}")
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Hasil ditulis ke {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare_with_baseline(results, baseline, args.tolerance)
+        print(f"\nDibandingkan dengan baseline {args.baseline} (commit {baseline.get('meta', {}).get('git_commit')}, toleransi {args.tolerance:.0%}):")
+        for stage, metric, previous, current, ratio, regression in comparison:
+            print(f"  {stage:<20} {metric:<7} {previous:>9.2f} -> {current:>9.2f} ms ({ratio - 1:+.0%}){'  <-- REGRESI' if regression else ''}")
+        if any(row[-1] for row in comparison):
+            sys.exit(1)
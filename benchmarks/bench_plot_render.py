@@ -0,0 +1,85 @@
+# benchmarks/bench_plot_render.py
+"""Benchmark waktu render per siklus: pyplot lama (figure baru + bbox_inches='tight') vs plot_renderer.
+
+Jalankan dari root repo:  python benchmarks/bench_plot_render.py
+"""
+import io, os, sys, time
+from datetime import datetime
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from scipy.interpolate import griddata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from density import compute_grid_density
+from plot_renderer import DensityPlotRenderer, TemperatureHeatmapRenderer
+
+def legacy_density_plot(cfg, world_coords, density_result, timestamp):
+    """Salinan gaya render lama: figure pyplot baru setiap siklus, disimpan dengan bbox_inches='tight'."""
+    x_coords, y_coords = world_coords
+    counts, density = density_result['counts'], density_result['density']
+    plt.figure(figsize=(10, 10))
+    ax = plt.gca()
+    ax.set_facecolor('whitesmoke')
+    ax.add_patch(plt.Rectangle((0, 0), cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, facecolor='skyblue', alpha=0.2, edgecolor='none'))
+    for r, c in zip(*np.nonzero(counts)):
+        plt.text((c + 0.5) * cfg.GRID_SIZE_X, (r + 0.5) * cfg.GRID_SIZE_Y, f"{counts[r, c]}\n({density[r, c]:.1f}/m²)", ha='center', va='center', fontsize=10, color='blue', weight='bold')
+    for alert in density_result['alerts']:
+        ax.add_patch(plt.Rectangle((alert['grid_x'] * cfg.GRID_SIZE_X, alert['grid_y'] * cfg.GRID_SIZE_Y), cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y, facecolor='red', alpha=0.4, edgecolor='none'))
+    plt.scatter(x_coords, y_coords, c='red', s=50, edgecolors='black', label='Posisi Ayam (Dalam ROI)')
+    plt.xlim(-0.1, cfg.REAL_WORLD_WIDTH_M + 0.1)
+    plt.ylim(-0.1, cfg.REAL_WORLD_HEIGHT_M + 0.1)
+    plt.title(f"Kepadatan Ayam (ROI) @ {timestamp.strftime('%Y-%m-%d %H:%M:%S')}", fontsize=14)
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.legend()
+    ax.set_aspect('equal', 'box')
+    buf = io.BytesIO()
+    plt.savefig(buf, bbox_inches='tight', dpi=150)
+    plt.close()
+    return buf.getvalue()
+
+def legacy_heatmap(grid_z, points, timestamp):
+    plt.figure(figsize=(8, 7))
+    plt.imshow(grid_z.T, extent=(0, 3, 0, 3), origin='lower', cmap='hot', interpolation='bicubic')
+    plt.colorbar().set_label('Temperature (°C)')
+    plt.scatter(points[:, 0], points[:, 1], c='blue', s=150, edgecolors='white', label='Sensors')
+    plt.legend()
+    plt.title(f"Temperature Heatmap at {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
+    buf = io.BytesIO()
+    plt.savefig(buf, bbox_inches='tight')
+    plt.close()
+    return buf.getvalue()
+
+def time_it(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return np.median(samples) * 1000
+
+if __name__ == "__main__":
+    cfg = Config()
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, cfg.REAL_WORLD_WIDTH_M, 150), rng.uniform(0, cfg.REAL_WORLD_HEIGHT_M, 150)
+    density_result = compute_grid_density(x, y, cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y, cfg.MAX_AYAM_PER_METER_PERSEGI)
+    points = np.array(list(cfg.SENSOR_COORDINATES.values()), dtype=np.float64)
+    grid_x, grid_y = np.mgrid[0:cfg.REAL_WORLD_WIDTH_M:100j, 0:cfg.REAL_WORLD_HEIGHT_M:100j]
+    grid_z = griddata(points, rng.uniform(28, 34, len(points)), (grid_x, grid_y), method='cubic')
+    now = datetime.now()
+
+    density_renderer = DensityPlotRenderer(cfg)
+    heatmap_renderer = TemperatureHeatmapRenderer(cfg)
+    density_renderer.render((x, y), density_result, now)  # pemanasan: latar statis dibuat di sini
+    heatmap_renderer.render(grid_z, points, None, now)
+
+    repeat = 10
+    rows = [
+        ("density plot", time_it(lambda: legacy_density_plot(cfg, (x, y), density_result, now), repeat), time_it(lambda: density_renderer.render((x, y), density_result, now), repeat)),
+        ("heatmap suhu", time_it(lambda: legacy_heatmap(grid_z, points, now), repeat), time_it(lambda: heatmap_renderer.render(grid_z, points, None, now), repeat)),
+    ]
+    print(f"{'plot':<14} | {'pyplot (ms)':>11} | {'renderer (ms)':>13} | speedup")
+    for name, t_old, t_new in rows:
+        print(f"{name:<14} | {t_old:>11.1f} | {t_new:>13.1f} | {t_old / t_new:>5.1f}x")
@@ -0,0 +1,60 @@
+# benchmarks/bench_process_detections.py
+"""Micro-benchmark: loop per-deteksi lama vs jalur tervektorisasi di detection_geometry.
+
+Jalankan dari root repo:  python benchmarks/bench_process_detections.py
+"""
+import os, sys, time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detection_geometry import build_roi_mask, box_reference_points, points_in_roi_mask, project_to_world
+
+FRAME_SHAPE = (1080, 1920, 3)
+WORLD_W, WORLD_H = 3.0, 3.0
+ROI = np.float32([[400, 200], [1500, 200], [1800, 1000], [100, 1000]])
+HOMOGRAPHY, _ = cv2.findHomography(ROI, np.float32([[0, WORLD_H], [WORLD_W, WORLD_H], [WORLD_W, 0], [0, 0]]))
+
+def make_boxes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, FRAME_SHAPE[1] - 40, n)
+    y1 = rng.uniform(0, FRAME_SHAPE[0] - 40, n)
+    return np.stack([x1, y1, x1 + rng.uniform(15, 40, n), y1 + rng.uniform(15, 40, n)], axis=1).astype(np.float32)
+
+def legacy_loop(xyxy):
+    """Salinan logika _process_detections sebelum divektorisasi (tanpa menggambar)."""
+    x_world, y_world, in_roi_count = [], [], 0
+    for det in xyxy.tolist():
+        x1, y1, x2, y2 = map(int, det)
+        center_x, center_y, bottom_y = (x1 + x2) / 2, (y1 + y2) / 2, float(y2)
+        if cv2.pointPolygonTest(ROI, (center_x, bottom_y), False) >= 0:
+            in_roi_count += 1
+            pt_world = cv2.perspectiveTransform(np.float32([[center_x, center_y]]).reshape(1, 1, 2), HOMOGRAPHY)
+            x_world.append(np.clip(pt_world[0][0][0], 0, WORLD_W))
+            y_world.append(np.clip(pt_world[0][0][1], 0, WORLD_H))
+    return x_world, y_world, in_roi_count
+
+def vectorized(xyxy, roi_mask):
+    _, test_points, center_points = box_reference_points(xyxy)
+    in_roi = points_in_roi_mask(test_points, roi_mask)
+    x_world, y_world = project_to_world(center_points[in_roi], HOMOGRAPHY, WORLD_W, WORLD_H)
+    return x_world, y_world, int(in_roi.sum())
+
+def time_it(fn, *args, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    roi_mask = build_roi_mask(ROI, FRAME_SHAPE)  # dibuat sekali per resolusi, di luar pengukuran
+    print(f"{'N':>7} | {'loop (ms)':>10} | {'vektor (ms)':>11} | {'speedup':>7} | hitungan ROI")
+    for n in (100, 1_000, 10_000):
+        xyxy = make_boxes(n)
+        legacy_count = legacy_loop(xyxy)[2]
+        fast_count = vectorized(xyxy, roi_mask)[2]
+        t_loop = time_it(legacy_loop, xyxy, repeat=5 if n >= 10_000 else 20)
+        t_vec = time_it(vectorized, xyxy, roi_mask)
+        print(f"{n:>7} | {t_loop * 1000:>10.3f} | {t_vec * 1000:>11.3f} | {t_loop / t_vec:>6.1f}x | {legacy_count} vs {fast_count}")
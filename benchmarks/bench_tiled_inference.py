@@ -0,0 +1,112 @@
+# benchmarks/bench_tiled_inference.py
+"""Recall vs latensi model 's': frame penuh (640 px) vs beberapa konfigurasi inferensi ber-tile, pada rekaman video.
+
+Ground truth (opsional) berupa file label YOLO per frame: <labels_dir>/frame_<index 6 digit>.txt
+berisi "cls cx cy w h" ternormalisasi. Tanpa label, hasil tile terkecil/overlap terbesar dipakai sebagai
+referensi sehingga recall yang dilaporkan bersifat relatif.
+
+Jalankan dari root repo:
+  python benchmarks/bench_tiled_inference.py --video "D:\\Downloads\\Ayam Panjang.mp4" --frames 20 [--labels dir_label]
+"""
+import argparse, os, sys, time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from camera import CameraSource
+from detection_geometry import box_reference_points, points_in_roi_mask
+from tiled_inference import TiledDetector
+from tracking import iou_matrix, greedy_match
+from detector_backends import load_detector
+
+CONFIGS = [(None, None), (960, 0.1), (640, 0.2), (512, 0.25), (416, 0.3)]  # (None, None) = frame penuh
+
+def read_frames(video_path, num_frames, stride):
+    cap = cv2.VideoCapture(video_path)
+    frames, index = [], 0
+    while len(frames) < num_frames:
+        ok = cap.grab()
+        if not ok:
+            break
+        if index % stride == 0:
+            ok, frame = cap.retrieve()
+            if ok:
+                frames.append((index, frame))
+        index += 1
+    cap.release()
+    return frames
+
+def load_labels(labels_dir, frame_index, frame_shape):
+    path = os.path.join(labels_dir, f"frame_{frame_index:06d}.txt")
+    if not os.path.exists(path):
+        return None
+    rows = np.loadtxt(path, ndmin=2)
+    if rows.size == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+    height, width = frame_shape[:2]
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    return np.column_stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]).astype(np.float32)
+
+def in_roi(camera, frame_shape, xyxy):
+    _, test_points, _ = box_reference_points(xyxy)
+    return xyxy[points_in_roi_mask(test_points, camera.get_roi_mask(frame_shape))]
+
+def recall(pred, truth, iou_threshold=0.5):
+    if len(truth) == 0:
+        return 1.0
+    return len(greedy_match(iou_matrix(truth, pred), iou_threshold)) / len(truth)
+
+if __name__ == "__main__":
+    cfg = Config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", default=cfg.VIDEO_SOURCE)
+    parser.add_argument("--model", default=cfg.YOLO_MODEL_PATH_SMALL)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--stride", type=int, default=25, help="ambil 1 dari setiap N frame")
+    parser.add_argument("--labels", default=None)
+    args = parser.parse_args()
+
+    model = load_detector(args.model, cfg.DETECTOR_BACKEND, cfg.DETECTOR_NUM_THREADS, names={0: cfg.TARGET_CLASS_NAME})
+    camera = CameraSource("bench", args.video, cfg.HOMOGRAPHY_MATRIX_PATH, cfg.SELECTED_AREA_POINTS_PATH)
+    frames = read_frames(args.video, args.frames, args.stride)
+    if not frames:
+        sys.exit(f"Tidak ada frame yang terbaca dari {args.video}")
+
+    def extract(result):
+        target_ids = [idx for idx, name in model.names.items() if name.lower() == cfg.TARGET_CLASS_NAME.lower()]
+        keep = np.isin(result.cls, target_ids)
+        return result.xyxy[keep], result.conf[keep]
+
+    model.predict([frames[0][1]], conf=0.2)  # pemanasan
+    outputs = {}
+    for tile_size, overlap in CONFIGS:
+        latencies, detections = [], []
+        for _, frame in frames:
+            start = time.perf_counter()
+            if tile_size is None:
+                xyxy, _ = extract(model.predict([frame], conf=0.2)[0])
+                crops = 1
+            else:
+                detector = TiledDetector(tile_size, overlap, cfg.TILE_NMS_IOU, include_full_frame=True)
+                xyxy = detector.detect(model, [frame], [camera], extract, conf=0.2)[0]['xyxy']
+                crops = detector.last_stats["crops"]
+            latencies.append(time.perf_counter() - start)
+            detections.append(in_roi(camera, frame.shape, xyxy))
+        outputs[(tile_size, overlap)] = (latencies, detections, crops)
+
+    reference_key = CONFIGS[-1]
+    print(f"Ground truth: {'label ' + args.labels if args.labels else 'relatif terhadap tile %s/overlap %s' % reference_key}")
+    print(f"{'mode':<18} | {'crop':>4} | {'p50 ms':>8} | {'p95 ms':>8} | {'ayam/frame':>10} | {'recall':>6}")
+    for key, (latencies, detections, crops) in outputs.items():
+        recalls = []
+        for (frame_index, frame), pred in zip(frames, detections):
+            truth = load_labels(args.labels, frame_index, frame.shape) if args.labels else None
+            if truth is None:
+                truth = outputs[reference_key][1][len(recalls)]
+            else:
+                truth = in_roi(camera, frame.shape, truth)
+            recalls.append(recall(pred, truth))
+        name = "frame penuh" if key[0] is None else f"tile {key[0]} ov {key[1]}"
+        lat = np.array(latencies) * 1000
+        print(f"{name:<18} | {crops:>4} | {np.percentile(lat, 50):>8.0f} | {np.percentile(lat, 95):>8.0f} | {np.mean([len(d) for d in detections]):>10.1f} | {np.mean(recalls):>6.2f}")
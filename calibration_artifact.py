@@ -0,0 +1,214 @@
+# calibration_artifact.py
+"""
+Artefak kalibrasi per kamera & resolusi, dibuat sekali lalu di-memory-map saat startup:
+  - roi_mask      (H, W) uint8        : bitmask ROI pada resolusi inferensi
+  - cell_index    (H, W) int16/int32  : indeks sel grid datar (gy * jumlah_kolom + gx) untuk setiap piksel,
+                                        -1 jika proyeksi piksel itu tidak valid (di atas horizon)
+  - cell_area_m2  (baris, kolom)      : luas lantai sebenarnya tiap sel (bagian sel di dalam area lantai & ROI)
+  - birdseye_map1/2                   : peta remap fixed-point untuk tampilan bird's-eye (warpPerspective terhitung)
+Setiap artefak disimpan di folder <kamera>_<key>; key diturunkan dari versi format, homografi, ROI, geometri
+lantai, dan resolusi, sehingga kalibrasi baru otomatis menghasilkan artefak baru (yang lama dibersihkan).
+"""
+import hashlib, json, math, os, shutil, tempfile
+import cv2
+import numpy as np
+from density import grid_shape
+from detection_geometry import build_roi_mask
+
+ARTIFACT_VERSION = 1
+_ARRAYS = ("roi_mask", "cell_index", "cell_area_m2", "birdseye_map1", "birdseye_map2")
+_AREA_SAMPLES_PER_CELL = 50  # sampel per sisi sel saat menghitung luas sel yang tercakup ROI
+
+def floor_geometry(config):
+    """Geometri lantai dari Config yang ikut menentukan isi artefak."""
+    return {
+        "width_m": float(config.REAL_WORLD_WIDTH_M),
+        "height_m": float(config.REAL_WORLD_HEIGHT_M),
+        "grid_size_x": float(config.GRID_SIZE_X),
+        "grid_size_y": float(config.GRID_SIZE_Y),
+        "birdseye_width_px": int(config.BIRDSEYE_WIDTH_PX)
+    }
+
+def calibration_id(homography, roi_polygon, geometry):
+    """Sidik kalibrasi pada resolusi asli (file homografi & ROI + geometri lantai + versi format)."""
+    digest = hashlib.sha1(f"v{ARTIFACT_VERSION}|{json.dumps(geometry, sort_keys=True)}".encode())
+    digest.update(np.ascontiguousarray(homography, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(roi_polygon, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+def _artifact_key(calib_id, frame_shape):
+    return hashlib.sha1(f"{calib_id}|{frame_shape[0]}x{frame_shape[1]}".encode()).hexdigest()[:16]
+
+
+class CalibrationArtifact:
+    """Array artefak (ndarray biasa saat baru dibuat, np.memmap read-only saat dimuat dari cache)."""
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.roi_mask = arrays["roi_mask"]
+        self.cell_index = arrays["cell_index"]
+        self.cell_area_m2 = arrays["cell_area_m2"]
+        self.birdseye_map1 = arrays["birdseye_map1"]
+        self.birdseye_map2 = arrays["birdseye_map2"]
+
+    @property
+    def frame_shape(self):
+        return tuple(self.meta["frame_shape"])
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in _ARRAYS}
+
+    def cells_at(self, points):
+        """Indeks sel datar untuk titik piksel (N,2) dengan satu gather; -1 di luar frame atau proyeksi tidak valid."""
+        if len(points) == 0:
+            return np.zeros(0, dtype=np.int64)
+        height, width = self.cell_index.shape
+        xs = np.floor(points[:, 0]).astype(np.int64)
+        ys = np.floor(points[:, 1]).astype(np.int64)
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        cells = np.full(len(points), -1, dtype=np.int64)
+        cells[inside] = self.cell_index[ys[inside], xs[inside]]
+        return cells
+
+    def effective_cell_area(self, min_fraction=0.25):
+        """
+        Luas sel untuk pembagi kepadatan: luas sebenarnya, tetapi tidak kurang dari min_fraction x luas sel penuh
+        agar sel tepi yang hanya tersentuh sedikit oleh ROI tidak menghasilkan kepadatan semu yang ekstrem.
+        """
+        full_area = self.meta["geometry"]["grid_size_x"] * self.meta["geometry"]["grid_size_y"]
+        return np.maximum(self.cell_area_m2, min_fraction * full_area)
+
+    def birdseye(self, frame):
+        """Tampilan bird's-eye lantai (utara = atas frame kalibrasi) dengan garis grid sel."""
+        view = cv2.remap(frame, self.birdseye_map1, self.birdseye_map2, cv2.INTER_LINEAR)
+        geometry = self.meta["geometry"]
+        scale = self.meta["birdseye_px_per_m"]
+        height, width = view.shape[:2]
+        for i in range(1, math.ceil(geometry["width_m"] / geometry["grid_size_x"])):
+            x = int(round(i * geometry["grid_size_x"] * scale))
+            cv2.line(view, (x, 0), (x, height - 1), (255, 255, 255), 1)
+        for i in range(1, math.ceil(geometry["height_m"] / geometry["grid_size_y"])):
+            y = int(round(height - i * geometry["grid_size_y"] * scale))
+            cv2.line(view, (0, y), (width - 1, y), (255, 255, 255), 1)
+        return view
+
+
+def _pixel_cell_index(homography, frame_shape, geometry, block_rows=256):
+    """Proyeksikan setiap piksel ke dunia (per blok baris agar memori sementara kecil) lalu ambil sel grid-nya."""
+    height, width = frame_shape[:2]
+    num_cols, num_rows = grid_shape(geometry["width_m"], geometry["height_m"], geometry["grid_size_x"], geometry["grid_size_y"])
+    cell_index = np.empty((height, width), dtype=np.int16 if num_cols * num_rows < np.iinfo(np.int16).max else np.int32)
+    h = np.asarray(homography, dtype=np.float64)
+    xs = np.arange(width, dtype=np.float64)
+    for y0 in range(0, height, block_rows):
+        px, py = np.meshgrid(xs, np.arange(y0, min(height, y0 + block_rows), dtype=np.float64))
+        w = h[2, 0] * px + h[2, 1] * py + h[2, 2]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            world_x = (h[0, 0] * px + h[0, 1] * py + h[0, 2]) / w
+            world_y = (h[1, 0] * px + h[1, 1] * py + h[1, 2]) / w
+        valid = (w > 0) & np.isfinite(world_x) & np.isfinite(world_y)
+        # Sama seperti project_to_world + compute_grid_density: koordinat dipotong ke area lantai, tepi masuk sel terakhir
+        gx = np.clip(np.floor(np.clip(np.nan_to_num(world_x), 0, geometry["width_m"]) / geometry["grid_size_x"]), 0, num_cols - 1)
+        gy = np.clip(np.floor(np.clip(np.nan_to_num(world_y), 0, geometry["height_m"]) / geometry["grid_size_y"]), 0, num_rows - 1)
+        cell_index[y0:y0 + len(px)] = np.where(valid, gy * num_cols + gx, -1)
+    return cell_index
+
+def _cell_floor_area(homography, roi_polygon, geometry):
+    """Luas (m²) tiap sel yang berada di dalam area lantai DAN di dalam ROI yang diproyeksikan ke dunia."""
+    num_cols, num_rows = grid_shape(geometry["width_m"], geometry["height_m"], geometry["grid_size_x"], geometry["grid_size_y"])
+    samples = _AREA_SAMPLES_PER_CELL
+    scale_x, scale_y = samples / geometry["grid_size_x"], samples / geometry["grid_size_y"]
+    roi_world = cv2.perspectiveTransform(np.asarray(roi_polygon, dtype=np.float64).reshape(-1, 1, 2), np.asarray(homography, dtype=np.float64)).reshape(-1, 2)
+    roi_world = np.clip(roi_world, 0, [geometry["width_m"], geometry["height_m"]])
+    raster = np.zeros((num_rows * samples, num_cols * samples), dtype=np.uint8)
+    shift = 4  # koordinat subpiksel untuk fillPoly
+    points = np.round(roi_world * [scale_x, scale_y] * (1 << shift)).astype(np.int32).reshape(-1, 1, 2)
+    cv2.fillPoly(raster, [points], 1, lineType=cv2.LINE_8, shift=shift)
+    raster[:, int(round(geometry["width_m"] * scale_x)):] = 0
+    raster[int(round(geometry["height_m"] * scale_y)):, :] = 0
+    covered = raster.reshape(num_rows, samples, num_cols, samples).sum(axis=(1, 3), dtype=np.int64)
+    return covered * (geometry["grid_size_x"] * geometry["grid_size_y"] / (samples * samples))
+
+def _birdseye_maps(homography, geometry):
+    """Peta remap output bird's-eye -> piksel kamera; dunia y=tinggi lantai (tepi atas frame kalibrasi) di baris 0."""
+    scale = geometry["birdseye_width_px"] / geometry["width_m"]
+    out_w, out_h = geometry["birdseye_width_px"], max(1, int(round(geometry["height_m"] * scale)))
+    world_to_view = np.array([[scale, 0, 0], [0, -scale, geometry["height_m"] * scale], [0, 0, 1]], dtype=np.float64)
+    view_to_pixel = np.linalg.inv(world_to_view @ np.asarray(homography, dtype=np.float64))
+    u, v = np.meshgrid(np.arange(out_w, dtype=np.float32), np.arange(out_h, dtype=np.float32))
+    source = cv2.perspectiveTransform(np.stack([u, v], axis=-1).reshape(-1, 1, 2), view_to_pixel).reshape(out_h, out_w, 2)
+    map1, map2 = cv2.convertMaps(source[..., 0].astype(np.float32), source[..., 1].astype(np.float32), cv2.CV_16SC2)
+    return map1, map2, scale
+
+def build_artifact(homography, roi_polygon, frame_shape, geometry, calib_id):
+    """Hitung semua array artefak untuk satu resolusi (homografi & ROI sudah dalam koordinat resolusi itu)."""
+    birdseye_map1, birdseye_map2, birdseye_scale = _birdseye_maps(homography, geometry)
+    arrays = {
+        "roi_mask": build_roi_mask(roi_polygon, frame_shape),
+        "cell_index": _pixel_cell_index(homography, frame_shape, geometry),
+        "cell_area_m2": _cell_floor_area(homography, roi_polygon, geometry),
+        "birdseye_map1": birdseye_map1,
+        "birdseye_map2": birdseye_map2
+    }
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "calibration_id": calib_id,
+        "key": _artifact_key(calib_id, frame_shape),
+        "frame_shape": [int(frame_shape[0]), int(frame_shape[1])],
+        "geometry": geometry,
+        "birdseye_px_per_m": birdseye_scale
+    }
+    return CalibrationArtifact(arrays, meta)
+
+def save_artifact(cache_dir, camera_name, artifact):
+    """Tulis ke folder sementara lalu rename (atomik); artefak kalibrasi lama kamera ini dihapus."""
+    os.makedirs(cache_dir, exist_ok=True)
+    target = os.path.join(cache_dir, f"{camera_name}_{artifact.meta['key']}")
+    if not os.path.isdir(target):
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp_", dir=cache_dir)
+        os.chmod(tmp_dir, 0o755)  # mkdtemp membuat folder 0700
+        for name, array in artifact.arrays().items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(artifact.meta, f, indent=1)
+        try:
+            os.replace(tmp_dir, target)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # proses lain lebih dulu menyimpan artefak yang sama
+    _prune(cache_dir, camera_name, artifact.meta["calibration_id"])
+    return target
+
+def _camera_dirs(cache_dir, camera_name):
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return []
+    prefix = f"{camera_name}_"
+    return [os.path.join(cache_dir, entry) for entry in os.listdir(cache_dir)
+            if entry.startswith(prefix) and len(entry) == len(prefix) + 16]
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _prune(cache_dir, camera_name, calib_id):
+    for directory in _camera_dirs(cache_dir, camera_name):
+        meta = _read_meta(directory)
+        if meta is None or meta.get("version") != ARTIFACT_VERSION or meta.get("calibration_id") != calib_id:
+            shutil.rmtree(directory, ignore_errors=True)
+
+def load_artifacts(cache_dir, camera_name, calib_id):
+    """Muat (memory-map, read-only) semua artefak kamera yang cocok dengan kalibrasi saat ini: {(tinggi, lebar): artefak}."""
+    artifacts = {}
+    for directory in _camera_dirs(cache_dir, camera_name):
+        meta = _read_meta(directory)
+        if meta is None or meta.get("version") != ARTIFACT_VERSION or meta.get("calibration_id") != calib_id:
+            continue
+        try:
+            arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS}
+        except (OSError, ValueError) as e:
+            print(f"[{camera_name}] Artefak kalibrasi {directory} rusak, akan dibuat ulang: {e}")
+            continue
+        artifact = CalibrationArtifact(arrays, meta)
+        artifacts[artifact.frame_shape] = artifact
+    return artifacts
@@ -2,6 +2,7 @@
 import cv2
 import numpy as np
 from config import Config
+from calibration_artifact import build_artifact, calibration_id, floor_geometry, save_artifact
 
 class Calibrator:
     """Kelas untuk menangani proses kalibrasi interaktif."""
@@ -31,6 +32,19 @@ class Calibrator:
             current_drawing = cv2.addWeighted(overlay, 0.3, current_drawing, 0.7, 0)
         display_img[:] = current_drawing[:]
 
+    def _save_calibration_artifact(self, homography_matrix, roi_polygon, frame_shape):
+        """Bangun artefak kalibrasi untuk resolusi frame referensi agar analyzer tidak perlu membuatnya saat startup."""
+        cache_dir = self.config.CALIBRATION_CACHE_DIR
+        if not cache_dir:
+            return
+        try:
+            geometry = floor_geometry(self.config)
+            artifact = build_artifact(homography_matrix, roi_polygon, frame_shape, geometry, calibration_id(homography_matrix, roi_polygon, geometry))
+            path = save_artifact(cache_dir, self.config.get_camera_configs()[0]["name"], artifact)
+            print(f"✅ Artefak kalibrasi disimpan di: {path}")
+        except Exception as e:
+            print(f"⚠️ Gagal membuat artefak kalibrasi (akan dibuat saat analyzer berjalan): {e}")
+
     def run_calibration(self):
         print(f"Mencoba mengambil frame referensi dari: {self.config.VIDEO_SOURCE}...")
         cap = cv2.VideoCapture(self.config.VIDEO_SOURCE)
@@ -64,6 +78,7 @@ class Calibrator:
                 if homography_matrix is not None:
                     np.save(self.config.HOMOGRAPHY_MATRIX_PATH, homography_matrix); print(f"✅ Matriks Homografi disimpan di: {self.config.HOMOGRAPHY_MATRIX_PATH}")
                     np.save(self.config.SELECTED_AREA_POINTS_PATH, src_pts_original_res.astype(np.int32)); print(f"✅ Titik Area (ROI) disimpan di: {self.config.SELECTED_AREA_POINTS_PATH}")
+                    self._save_calibration_artifact(homography_matrix, src_pts_original_res.astype(np.int32).astype(np.float32), frame.shape)
                     print("\nKalibrasi berhasil! Menutup window..."); cv2.destroyAllWindows(); return True
                 else: print("❌ Gagal menghitung matriks homografi. Coba lagi.")
         cv2.destroyAllWindows()
@@ -0,0 +1,308 @@
+# camera.py
+import cv2
+import numpy as np
+import os, random, threading, time
+from collections import deque
+from calibration_artifact import build_artifact, calibration_id, load_artifacts, save_artifact
+from detection_geometry import build_roi_mask
+from frame_slots import FrameSlotRing
+from metrics import DECODE_SECONDS
+
+class CameraSource:
+    """Menyimpan state satu kamera: sumber video, data kalibrasi, frame terbaru, dan frame anotasi."""
+    def __init__(self, name, video_source, homography_matrix_path, selected_area_points_path, frame_ring_slots=4,
+                 decode_mode="on_demand", decode_max_width=None, reconnect_backoff_base_s=2.0, reconnect_backoff_max_s=60.0,
+                 floor_geometry=None, calibration_cache_dir=None):
+        self.name = name
+        self.video_source = video_source
+        self.homography_matrix_path = homography_matrix_path
+        self.selected_area_points_path = selected_area_points_path
+
+        self.homography_matrix = self._load_numpy_file(homography_matrix_path)
+        self.roi_polygon_coords = self._load_numpy_file(selected_area_points_path, dtype=np.float32)
+
+        # Frame mentah dari sumber: ring slot yang dialokasikan sekali, di-decode langsung tanpa salinan
+        self.frame_ring = FrameSlotRing(frame_ring_slots)
+        self.latest_annotated_frame = None
+        self.annotated_at = None  # time.monotonic() frame anotasi terbaru
+        self.latest_density = None  # hasil kepadatan dari model nano (live), dihaluskan jika pelacakan aktif
+        self.tracker = None           # IoUTracker, diisi analyzer jika TRACKING_ENABLED
+        self.density_smoother = None  # SmoothedDensityGrid pasangannya
+        self.motion_gate = None       # MotionGate, diisi analyzer jika MOTION_GATING_ENABLED
+        self.last_overlays = []       # box & label deteksi terakhir, digambar ulang saat deteksi dilewati
+        self.last_counts = None       # hitungan grid deteksi terakhir (untuk grid halus saat deteksi dilewati)
+        self.annotation_lock = threading.Lock()
+        # Callback yang dipanggil setiap ada frame anotasi baru (mis. hub MJPEG)
+        self.annotated_frame_listeners = []
+
+        self.selected_area_points = None
+        self.load_calibration_data()
+        self._calibration_cache = {}
+
+        # Artefak kalibrasi (lookup sel per piksel, luas sel, peta bird's-eye); None jika geometri lantai tidak diberikan
+        self.floor_geometry = floor_geometry
+        self.calibration_cache_dir = calibration_cache_dir
+        self.calibration_id = None
+        self._artifacts = {}
+        if floor_geometry is not None and self.is_ready():
+            self.calibration_id = calibration_id(self.homography_matrix, self.roi_polygon_coords, floor_geometry)
+            if calibration_cache_dir:
+                self._artifacts = load_artifacts(calibration_cache_dir, name, self.calibration_id)
+                if self._artifacts:
+                    print(f"[{self.name}] Artefak kalibrasi dimuat (memory-map) untuk resolusi: {sorted(self._artifacts)}")
+
+        # --- Pembaca video ---
+        # "always": decode setiap frame; "on_demand": selalu grab() agar stream tetap terkini,
+        # tetapi retrieve() (decode) hanya jika ada konsumen yang meminta frame baru.
+        self.decode_mode = decode_mode
+        self.decode_max_width = decode_max_width  # None = resolusi asli; selain itu frame diperkecil saat decode
+        self.reconnect_backoff_base_s = reconnect_backoff_base_s
+        self.reconnect_backoff_max_s = reconnect_backoff_max_s
+        self.source_frame_size = None  # (lebar, tinggi) asli dari sumber, acuan skala kalibrasi
+        self._frame_requested = threading.Event()
+        self._decode_scratch = None
+        self._stats_lock = threading.Lock()
+        self._decode_latencies = deque(maxlen=100)
+        self.reader_stats = {
+            "connected": False,
+            "frames_grabbed": 0,
+            "frames_decoded": 0,
+            "frames_skipped": 0,   # di-grab tapi tidak di-decode karena tidak diminta
+            "frames_dropped": 0,   # di-grab tapi semua slot frame sedang dipinjam
+            "reconnects": 0,
+            "current_backoff_s": 0.0
+        }
+
+    def _load_numpy_file(self, path, dtype=None):
+        try:
+            if path and os.path.exists(path):
+                return np.load(path).astype(dtype) if dtype else np.load(path)
+        except Exception as e:
+            print(f"[{self.name}] Error fatal saat memuat file kalibrasi {path}: {e}")
+        return None
+
+    def load_calibration_data(self):
+        try:
+            if self.selected_area_points_path and os.path.exists(self.selected_area_points_path):
+                self.selected_area_points = np.load(self.selected_area_points_path)
+                if self.selected_area_points.ndim == 2:
+                    self.selected_area_points = self.selected_area_points.reshape((-1, 1, 2))
+                print(f"[{self.name}] Titik area kalibrasi berhasil dimuat dari {self.selected_area_points_path}")
+            else:
+                self.selected_area_points = None
+        except Exception as e:
+            print(f"[{self.name}] Error memuat titik area kalibrasi: {e}")
+            self.selected_area_points = None
+
+    def calibration_for(self, frame_shape):
+        """
+        Kalibrasi (bitmask ROI, poligon ROI, titik area, homografi) untuk resolusi frame tertentu.
+        File kalibrasi dibuat pada resolusi asli sumber; frame yang diperkecil saat decode memakai versi yang diskalakan.
+        Dibuat sekali per resolusi lalu disimpan.
+        """
+        key = tuple(frame_shape[:2])
+        calibration = self._calibration_cache.get(key)
+        if calibration is None:
+            scale = frame_shape[1] / self.source_frame_size[0] if self.source_frame_size else 1.0
+            roi_polygon = self.roi_polygon_coords * scale if self.roi_polygon_coords is not None else None
+            homography = self.homography_matrix
+            if homography is not None and scale != 1.0:
+                # titik frame kecil p -> titik asli p/scale -> dunia nyata
+                homography = homography @ np.diag([1.0 / scale, 1.0 / scale, 1.0])
+            area_points = self.selected_area_points
+            if area_points is not None and scale != 1.0:
+                area_points = np.round(area_points * scale).astype(area_points.dtype)
+            artifact = self._artifact_for(key, homography, roi_polygon)
+            if artifact is not None:
+                roi_mask = artifact.roi_mask
+            else:
+                roi_mask = build_roi_mask(roi_polygon, frame_shape) if roi_polygon is not None else None
+            calibration = {
+                "roi_mask": roi_mask,
+                "roi_polygon": roi_polygon,
+                "area_points": area_points,
+                "homography": homography,
+                "artifact": artifact
+            }
+            self._calibration_cache[key] = calibration
+        return calibration
+
+    def _artifact_for(self, frame_shape, homography, roi_polygon):
+        """Artefak kalibrasi untuk resolusi ini: dari cache disk jika ada, selain itu dibuat lalu disimpan."""
+        if self.calibration_id is None:
+            return None
+        artifact = self._artifacts.get(frame_shape)
+        if artifact is None:
+            start = time.perf_counter()
+            artifact = build_artifact(homography, roi_polygon, frame_shape, self.floor_geometry, self.calibration_id)
+            print(f"[{self.name}] Artefak kalibrasi {frame_shape[1]}x{frame_shape[0]} dibuat dalam {time.perf_counter() - start:.2f} s")
+            if self.calibration_cache_dir:
+                try:
+                    save_artifact(self.calibration_cache_dir, self.name, artifact)
+                except OSError as e:
+                    print(f"[{self.name}] Gagal menyimpan artefak kalibrasi: {e}")
+            self._artifacts[frame_shape] = artifact
+        return artifact
+
+    def birdseye_view(self, frame):
+        """Frame yang di-warp ke tampilan bird's-eye lantai; frame asli jika artefak kalibrasi tidak tersedia."""
+        artifact = self.calibration_for(frame.shape)["artifact"]
+        return artifact.birdseye(frame) if artifact is not None else frame
+
+    def get_roi_mask(self, frame_shape):
+        """Bitmask ROI untuk resolusi frame tertentu, dibuat sekali lalu disimpan."""
+        return self.calibration_for(frame_shape)["roi_mask"]
+
+    def is_ready(self):
+        return self.homography_matrix is not None and self.roi_polygon_coords is not None
+
+    def _is_live_source(self):
+        return isinstance(self.video_source, int) or str(self.video_source).lower().startswith(("rtsp://", "rtmp://", "http://", "https://", "udp://", "tcp://"))
+
+    def _reconnect_delay(self, attempt):
+        """Backoff eksponensial dengan jitter penuh, dibatasi reconnect_backoff_max_s."""
+        delay = min(self.reconnect_backoff_max_s, self.reconnect_backoff_base_s * (2 ** (attempt - 1)))
+        return random.uniform(delay / 2, delay)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.reader_stats[key] += amount
+
+    def read_video_source_thread(self):
+        print(f"[Frame Reader:{self.name}] Thread pembaca video dimulai (mode decode: {self.decode_mode}).")
+        cap = None
+        failed_attempts = 0
+        frame_interval = 0.0
+        next_grab_time = 0.0
+        while True:
+            try:
+                if cap is None or not cap.isOpened():
+                    if cap: cap.release()
+                    cap = None
+                    with self._stats_lock:
+                        self.reader_stats["connected"] = False
+                    if failed_attempts:
+                        delay = self._reconnect_delay(failed_attempts)
+                        with self._stats_lock:
+                            self.reader_stats["current_backoff_s"] = round(delay, 2)
+                            self.reader_stats["reconnects"] += 1
+                        print(f"[Frame Reader:{self.name}] Mencoba lagi dalam {delay:.1f} detik (percobaan ke-{failed_attempts})...")
+                        time.sleep(delay)
+                    print(f"[Frame Reader:{self.name}] Membuka koneksi ke {self.video_source}...")
+                    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
+                    cap = cv2.VideoCapture(self.video_source, cv2.CAP_FFMPEG)
+                    if not cap.isOpened():
+                        print(f"[Frame Reader:{self.name}] Gagal membuka koneksi.")
+                        failed_attempts += 1
+                        continue
+                    # Stream langsung sudah berjalan sesuai kecepatan kamera; file video diputar sesuai FPS-nya
+                    fps = cap.get(cv2.CAP_PROP_FPS)
+                    frame_interval = 1.0 / fps if not self._is_live_source() and fps and fps > 0 else 0.0
+                    next_grab_time = time.monotonic()
+
+                if frame_interval:
+                    next_grab_time += frame_interval
+                    time.sleep(max(0.0, next_grab_time - time.monotonic()))
+
+                # grab() hanya mengambil paket & memajukan stream; decode (retrieve) dilakukan jika diperlukan
+                if not cap.grab():
+                    print(f"[Frame Reader:{self.name}] Frame tidak terbaca, koneksi mungkin terputus. Mencoba lagi...")
+                    cap.release()
+                    failed_attempts += 1
+                    continue
+                failed_attempts = 0
+                with self._stats_lock:
+                    self.reader_stats["connected"] = True
+                    self.reader_stats["current_backoff_s"] = 0.0
+                    self.reader_stats["frames_grabbed"] += 1
+
+                if self.decode_mode == "on_demand" and not self._frame_requested.is_set():
+                    self._count("frames_skipped")
+                    continue
+                self._frame_requested.clear()
+                if not self._decode_grabbed_frame(cap):
+                    print(f"[Frame Reader:{self.name}] Gagal men-decode frame. Mencoba lagi...")
+                    cap.release()
+                    failed_attempts += 1
+            except Exception as e:
+                print(f"[Frame Reader:{self.name}] Error: {e}")
+                if cap: cap.release()
+                failed_attempts += 1
+
+    def _decode_grabbed_frame(self, cap):
+        """Decode frame yang sudah di-grab langsung ke slot bebas di ring (diperkecil jika decode_max_width diset)."""
+        slot = self.frame_ring.begin_write()
+        if slot is None:
+            self._count("frames_dropped")
+            return True
+        start = time.perf_counter()
+        buffer = self.frame_ring.slot_buffer(slot)
+        downscale = self.decode_max_width is not None and (self.source_frame_size is None or self.source_frame_size[0] > self.decode_max_width)
+        try:
+            if downscale:
+                ret, full_frame = cap.retrieve(self._decode_scratch) if self._decode_scratch is not None else cap.retrieve()
+                if ret:
+                    self._decode_scratch = full_frame
+                    height, width = full_frame.shape[:2]
+                    self.source_frame_size = (width, height)
+                    target_size = (self.decode_max_width, int(round(height * self.decode_max_width / width)))
+                    if width <= self.decode_max_width:
+                        frame = full_frame.copy()
+                    elif buffer is not None and buffer.shape[1::-1] == target_size:
+                        frame = cv2.resize(full_frame, target_size, dst=buffer, interpolation=cv2.INTER_AREA)
+                    else:
+                        frame = cv2.resize(full_frame, target_size, interpolation=cv2.INTER_AREA)
+            else:
+                ret, frame = cap.retrieve(buffer) if buffer is not None else cap.retrieve()
+                if ret:
+                    self.source_frame_size = (frame.shape[1], frame.shape[0])
+        except Exception:
+            self.frame_ring.abort_write(slot)
+            raise
+        if not ret:
+            self.frame_ring.abort_write(slot)
+            return False
+        self.frame_ring.commit_write(slot, frame)
+        latency = time.perf_counter() - start
+        with self._stats_lock:
+            self.reader_stats["frames_decoded"] += 1
+            self._decode_latencies.append(latency)
+        DECODE_SECONDS.observe(latency, camera=self.name)
+        return True
+
+    def request_frame(self):
+        """Minta reader men-decode frame berikutnya (mode on_demand); tidak berpengaruh di mode always."""
+        self._frame_requested.set()
+
+    def get_reader_stats(self):
+        with self._stats_lock:
+            stats = dict(self.reader_stats)
+            latencies = sorted(self._decode_latencies)
+        stats["decode_mode"] = self.decode_mode
+        stats["source_frame_size"] = self.source_frame_size
+        if latencies:
+            stats["decode_latency_ms_avg"] = round(sum(latencies) / len(latencies) * 1000, 2)
+            stats["decode_latency_ms_p95"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2)
+        return stats
+
+    def get_latest_frame(self):
+        """Salinan writable frame terbaru (untuk yang akan menggambar di atasnya)."""
+        return self.frame_ring.copy_latest()[1]
+
+    def borrow_latest_frame(self, newer_than=None, timeout=None):
+        """Context manager yang meminjamkan frame terbaru sebagai view read-only tanpa salinan, berikut seq-nya."""
+        return self.frame_ring.borrow(newer_than=newer_than, timeout=timeout)
+
+    def borrow_fresh_frame(self, timeout=2.0):
+        """Seperti borrow_latest_frame, tetapi meminta & menunggu frame yang baru di-decode (jatuh ke frame terakhir jika timeout)."""
+        seq = self.frame_ring.latest_seq
+        self.request_frame()
+        self.frame_ring.wait_for_newer(seq, timeout=timeout)
+        return self.frame_ring.borrow()
+
+    def set_annotated_frame(self, annotated_frame):
+        with self.annotation_lock:
+            self.latest_annotated_frame = annotated_frame
+            self.annotated_at = time.monotonic()
+        for listener in self.annotated_frame_listeners:
+            listener(annotated_frame)
@@ -0,0 +1,182 @@
+# cascade.py
+"""
+Kaskade nano -> small: model nano tetap berjalan di setiap tick, model 's' hanya dipanggil untuk region frame
+tempat nano ragu (banyak box di pita confidence rendah, sel yang mendekati MAX_AYAM_PER_METER_PERSEGI, atau box
+yang saling tumpang tindih berat). Deteksi model 's' menggantikan deteksi nano di dalam region tersebut.
+"""
+import math, threading, time
+from collections import Counter
+import cv2
+import numpy as np
+
+def pairwise_max_iou(xyxy):
+    """IoU terbesar setiap box terhadap box lain (N,); 0 jika hanya ada satu box."""
+    n = len(xyxy)
+    if n < 2:
+        return np.zeros(n, dtype=np.float32)
+    boxes = np.asarray(xyxy, dtype=np.float32)
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    areas = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+    iou = intersection / np.maximum(areas[:, None] + areas[None, :] - intersection, 1e-6)
+    np.fill_diagonal(iou, 0.0)
+    return iou.max(axis=1)
+
+def _centers_in(xyxy, region):
+    x0, y0, x1, y1 = region
+    cx, cy = (xyxy[:, 0] + xyxy[:, 2]) / 2, (xyxy[:, 1] + xyxy[:, 3]) / 2
+    return (cx >= x0) & (cx < x1) & (cy >= y0) & (cy < y1)
+
+def merge_region_detections(xyxy, conf, regions, region_detections):
+    """
+    Deteksi nano yang titik tengahnya di dalam salah satu region dibuang dan diganti deteksi model 's' region itu
+    (sudah dalam koordinat frame). Box model 's' yang titik tengahnya di luar region-nya (margin crop) diabaikan.
+    Mengembalikan (xyxy, conf, jumlah box nano yang diganti, jumlah box model 's' yang ditambahkan).
+    """
+    xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+    keep = np.ones(len(xyxy), dtype=bool)
+    merged_boxes, merged_conf = [], []
+    for index, (region, (small_xyxy, small_conf)) in enumerate(zip(regions, region_detections)):
+        keep &= ~_centers_in(xyxy, region)
+        inside = _centers_in(small_xyxy, region)
+        # Region boleh bersinggungan; box di area yang sudah ditangani region sebelumnya tidak dihitung dua kali
+        for earlier in regions[:index]:
+            inside &= ~_centers_in(small_xyxy, earlier)
+        merged_boxes.append(small_xyxy[inside])
+        merged_conf.append(small_conf[inside])
+    added = sum(len(boxes) for boxes in merged_boxes)
+    merged_boxes.insert(0, xyxy[keep])
+    merged_conf.insert(0, np.asarray(conf, dtype=np.float32)[keep])
+    merged_xyxy = np.concatenate(merged_boxes).astype(np.float32).reshape(-1, 4)
+    return merged_xyxy, np.concatenate(merged_conf).astype(np.float32), int(np.count_nonzero(~keep)), added
+
+
+class CascadePolicy:
+    """
+    Menentukan kapan & di mana model 's' dipanggil, sekaligus mencatat laporan eskalasi per kamera.
+    low_conf..high_conf: pita confidence "ragu"; near_limit_ratio: fraksi kapasitas sel (MAX_AYAM x luas sel);
+    min_interval_s: jarak minimum antar eskalasi per kamera agar biaya tetap mendekati model nano saja.
+    """
+    def __init__(self, low_conf=0.15, high_conf=0.45, min_flagged_boxes=3, near_limit_ratio=0.8, overlap_iou=0.5,
+                 region_padding_px=32, max_region_fraction=0.6, min_interval_s=5.0):
+        self.low_conf = low_conf
+        self.high_conf = high_conf
+        self.min_flagged_boxes = min_flagged_boxes
+        self.near_limit_ratio = near_limit_ratio
+        self.overlap_iou = overlap_iou
+        self.region_padding_px = region_padding_px
+        self.max_region_fraction = max_region_fraction
+        self.min_interval_s = min_interval_s
+        self._last_escalation_at = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def flag_boxes(self, xyxy, conf, box_cells, cell_capacity):
+        """
+        box_cells: indeks sel datar tiap box (-1 jika di luar ROI); cell_capacity: jumlah ayam maksimum per sel
+        (skalar, atau matriks (baris, kolom) jika luas sel berbeda-beda).
+        Mengembalikan (mask box yang perlu dicek ulang, daftar alasan yang terpicu).
+        """
+        flagged = np.zeros(len(xyxy), dtype=bool)
+        reasons = []
+        if not len(xyxy):
+            return flagged, reasons
+        band = (conf >= self.low_conf) & (conf < self.high_conf)
+        if np.count_nonzero(band) >= self.min_flagged_boxes:
+            flagged |= band
+            reasons.append("low_confidence")
+        in_roi = box_cells >= 0
+        capacity = np.asarray(cell_capacity, dtype=np.float64).ravel()
+        if in_roi.any() and (capacity > 0).all():
+            counts = np.bincount(box_cells[in_roi])
+            box_capacity = capacity[box_cells[in_roi]] if capacity.size > 1 else capacity[0]
+            near_limit = np.zeros(len(xyxy), dtype=bool)
+            near_limit[in_roi] = counts[box_cells[in_roi]] >= self.near_limit_ratio * box_capacity
+            if near_limit.any():
+                flagged |= near_limit
+                reasons.append("near_limit")
+        overlapping = pairwise_max_iou(xyxy) >= self.overlap_iou
+        if np.count_nonzero(overlapping) >= self.min_flagged_boxes:
+            flagged |= overlapping
+            reasons.append("overlap")
+        return flagged, reasons
+
+    def regions(self, xyxy, flagged, frame_shape, scale=8):
+        """
+        Box yang ditandai (diberi padding) dikelompokkan lewat komponen terhubung pada mask 1/scale resolusi;
+        satu region persegi (x0, y0, x1, y1) per kelompok, atau seluruh frame jika gabungannya terlalu luas.
+        """
+        height, width = frame_shape[:2]
+        mask = np.zeros((math.ceil(height / scale), math.ceil(width / scale)), dtype=np.uint8)
+        pad = self.region_padding_px
+        for x1, y1, x2, y2 in np.asarray(xyxy, dtype=np.float32)[flagged].tolist():
+            cv2.rectangle(mask, (int((x1 - pad) // scale), int((y1 - pad) // scale)), (int((x2 + pad) // scale), int((y2 + pad) // scale)), 1, -1)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        regions = [(max(0, x * scale), max(0, y * scale), min(width, (x + w) * scale), min(height, (y + h) * scale))
+                   for x, y, w, h, _ in stats[1:].tolist()]
+        if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions) >= self.max_region_fraction * width * height:
+            return [(0, 0, width, height)]
+        return regions
+
+    def crop_box(self, region, frame_shape):
+        """Crop untuk model 's' = region + margin konteks, agar ayam di tepi region tetap terdeteksi utuh."""
+        height, width = frame_shape[:2]
+        pad = self.region_padding_px
+        x0, y0, x1, y1 = region
+        return max(0, x0 - pad), max(0, y0 - pad), min(width, x1 + pad), min(height, y1 + pad)
+
+    # --- Penjadwalan & laporan ---
+    def _camera_stats(self, camera_name):
+        return self._stats.setdefault(camera_name, {
+            "frames_checked": 0, "frames_triggered": 0, "escalations": 0, "skipped_rate_limit": 0, "skipped_busy": 0,
+            "regions": 0, "escalated_area_fraction": 0.0, "small_model_s": 0.0, "nano_boxes_replaced": 0,
+            "small_boxes_added": 0, "reasons": Counter()
+        })
+
+    def due(self, camera_name, now=None):
+        now = time.monotonic() if now is None else now
+        last = self._last_escalation_at.get(camera_name)
+        return last is None or now - last >= self.min_interval_s
+
+    def record_check(self, camera_name, reasons, skipped=None):
+        """Catat satu frame yang dicek; skipped = "rate_limit" / "busy" jika alasan terpicu tetapi tidak dieskalasi."""
+        with self._lock:
+            stats = self._camera_stats(camera_name)
+            stats["frames_checked"] += 1
+            if reasons:
+                stats["frames_triggered"] += 1
+                stats["reasons"].update(reasons)
+            if skipped:
+                stats[f"skipped_{skipped}"] += 1
+
+    def record_escalation(self, camera_name, regions, frame_shape, small_model_s, nano_replaced, small_added, now=None):
+        self._last_escalation_at[camera_name] = time.monotonic() if now is None else now
+        frame_area = float(frame_shape[0] * frame_shape[1]) or 1.0
+        with self._lock:
+            stats = self._camera_stats(camera_name)
+            stats["escalations"] += 1
+            stats["regions"] += len(regions)
+            stats["escalated_area_fraction"] += sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions) / frame_area
+            stats["small_model_s"] += small_model_s
+            stats["nano_boxes_replaced"] += nano_replaced
+            stats["small_boxes_added"] += small_added
+
+    def stats(self):
+        """Laporan per kamera: seberapa sering eskalasi terpicu & dijalankan, alasannya, dan biayanya."""
+        report = {}
+        with self._lock:
+            for camera_name, stats in self._stats.items():
+                checked, escalations = stats["frames_checked"], stats["escalations"]
+                report[camera_name] = dict(
+                    stats, reasons=dict(stats["reasons"]),
+                    trigger_rate=round(stats["frames_triggered"] / checked, 3) if checked else 0.0,
+                    escalation_rate=round(escalations / checked, 3) if checked else 0.0,
+                    mean_area_fraction=round(stats["escalated_area_fraction"] / escalations, 3) if escalations else None,
+                    mean_small_model_s=round(stats["small_model_s"] / escalations, 4) if escalations else None,
+                    escalated_area_fraction=round(stats["escalated_area_fraction"], 3),
+                    small_model_s=round(stats["small_model_s"], 3)
+                )
+        return report
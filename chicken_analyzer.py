@@ -1,168 +1,506 @@
 # chicken_analyzer.py (VERSI SUDAH DIPERBAIKI)
 
 import cv2
-from ultralytics import YOLO
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import math, os
+import os
+from contextlib import ExitStack
 from datetime import datetime, timezone
 from config import Config
 from supabase_handler import SupabaseHandler
 from telegram_notifier import TelegramNotifier
+from camera import CameraSource
+from calibration_artifact import floor_geometry
+from outbox import PublishOutbox
+from density import compute_grid_density, cell_indices, grid_shape, SmoothedDensityGrid
+from tracking import IoUTracker
+from tiled_inference import TiledDetector
+from temperature import interpolator_for
+from history_store import HistoryStore
+from motion_gate import MotionGate, DETECT, REUSE
+from cascade import CascadePolicy, merge_region_detections
+from metrics import INFERENCE_SECONDS, ANALYSIS_TICK_SECONDS, ANALYSIS_FRAMES, ANALYSIS_FPS, ANALYSIS_TARGET_FPS, ANALYSIS_DECISIONS, CASCADE_ESCALATIONS, TILED_CROPS, MAPPING_PHASE_SECONDS, MAPPING_CYCLES
+from detector_backends import load_detector, resolve_backend
+from detection_geometry import box_reference_points, points_in_roi_mask, project_to_world, draw_detections
 import threading
 import time
 
 class ChickenDensityAnalyzer:
     """Otak dari aplikasi: memuat model, memproses gambar, dan analisis."""
-    def __init__(self, config: Config, supabase_handler: SupabaseHandler, notifier: TelegramNotifier):
+    def __init__(self, config: Config, supabase_handler: SupabaseHandler, notifier: TelegramNotifier, event_bus=None, defer_model_loading=False, startup_profile=None):
         self.config = config
         self.supabase_handler = supabase_handler
         self.notifier = notifier
+        self.event_bus = event_bus  # opsional: push hasil ke dashboard (SSE)
+        self.startup_profile = startup_profile
         
-        print("Memuat model YOLOv8n untuk Live Stream...")
-        self.yolo_model_n = self._load_yolo_model(config.YOLO_MODEL_PATH_NANO)
-        print("Memuat model YOLOv8s untuk Analisis Kepadatan...")
-        self.yolo_model_s = self._load_yolo_model(config.YOLO_MODEL_PATH_SMALL)
+        # Kedua model dimuat paralel; dengan defer_model_loading=True pemuatan dimulai lewat start_model_loading()
+        # agar web server & pembaca frame bisa jalan lebih dulu.
+        self.yolo_model_n = None
+        self.yolo_model_s = None
+        self.density_worker = None  # InferenceWorkerPool jika model 's' dijalankan di proses terpisah
+        self.model_status = {
+            "model_nano": {"path": config.YOLO_MODEL_PATH_NANO, "status": "pending"},
+            "model_small": {"path": config.YOLO_MODEL_PATH_SMALL, "status": "pending"}
+        }
+        self.models_loaded = threading.Event()
+        self.analyzer_started_at = None
+        self.last_analysis_at = None
+        self.last_mapping_at = None
+        self._early_mapping_due_at = None
+        self._early_mapping_lock = threading.Lock()
+        if not defer_model_loading:
+            self.start_model_loading().join()
         
-        self.homography_matrix = self._load_numpy_file(config.HOMOGRAPHY_MATRIX_PATH)
-        self.roi_polygon_coords = self._load_numpy_file(config.SELECTED_AREA_POINTS_PATH, dtype=np.float32)
-        
-        self.latest_frame_from_source = None
-        self.latest_annotated_frame = None
-        self.source_lock = threading.Lock()
-        self.annotation_lock = threading.Lock()
+        # Setiap kamera punya kalibrasi dan slot frame sendiri, model hanya dimuat sekali
+        # Pengaturan pembaca dari Config bisa ditimpa per kamera lewat entri CAMERAS
+        reader_defaults = {
+            "frame_ring_slots": config.FRAME_RING_SLOTS,
+            "decode_mode": config.FRAME_DECODE_MODE,
+            "decode_max_width": config.FRAME_DECODE_MAX_WIDTH,
+            "reconnect_backoff_base_s": config.RECONNECT_BACKOFF_BASE_S,
+            "reconnect_backoff_max_s": config.RECONNECT_BACKOFF_MAX_S,
+            "floor_geometry": floor_geometry(config),
+            "calibration_cache_dir": config.CALIBRATION_CACHE_DIR
+        }
+        camera_configs = config.get_camera_configs()
+        # Entri CAMERAS boleh berisi "motion": {...} untuk menimpa pengaturan MotionGate kamera itu (mis. cpu_budget)
+        motion_overrides = [camera_cfg.pop("motion", {}) for camera_cfg in camera_configs]
+        self.cameras = [CameraSource(**dict(reader_defaults, **camera_cfg)) for camera_cfg in camera_configs]
+        self.cameras_by_name = {camera.name: camera for camera in self.cameras}
+        # Penjadwal adaptif: model nano hanya dijalankan ulang jika ada gerak di ROI
+        if config.MOTION_GATING_ENABLED:
+            motion_defaults = {
+                "min_interval_s": config.MOTION_MIN_INTERVAL_S,
+                "max_interval_s": config.MOTION_MAX_INTERVAL_S,
+                "force_detect_s": config.MOTION_FORCE_DETECT_S,
+                "motion_threshold": config.MOTION_THRESHOLD,
+                "scene_change_threshold": config.MOTION_SCENE_CHANGE_THRESHOLD,
+                "cpu_budget": config.MOTION_CPU_BUDGET,
+                "score_width": config.MOTION_SCORE_WIDTH,
+                "pixel_threshold": config.MOTION_PIXEL_THRESHOLD
+            }
+            for camera, overrides in zip(self.cameras, motion_overrides):
+                camera.motion_gate = MotionGate(**dict(motion_defaults, **overrides))
+        # Pelacak & grid kepadatan halus per kamera, diperbarui dari deteksi model nano di setiap tick
+        if config.TRACKING_ENABLED:
+            for camera in self.cameras:
+                camera.tracker = IoUTracker(config.TRACK_IOU_THRESHOLD, config.TRACK_HIGH_CONF, config.TRACK_MAX_MISSED, config.TRACK_MIN_HITS)
+                camera.density_smoother = SmoothedDensityGrid(
+                    config.REAL_WORLD_WIDTH_M, config.REAL_WORLD_HEIGHT_M, config.GRID_SIZE_X, config.GRID_SIZE_Y,
+                    config.MAX_AYAM_PER_METER_PERSEGI, config.DENSITY_SMOOTHING_TIME_CONSTANT_S, config.DENSITY_ALERT_SUSTAIN_S
+                )
+        self.primary_camera = self.cameras[0]
+        self.multi_camera = len(self.cameras) > 1
+
+        self.tiled_detector = None
+        if config.TILED_INFERENCE_ENABLED:
+            self.tiled_detector = TiledDetector(config.TILE_SIZE, config.TILE_OVERLAP, config.TILE_NMS_IOU, config.TILED_INCLUDE_FULL_FRAME)
 
-        self.selected_area_points = None
-        self.load_calibration_data()
+        # Kaskade: model 's' dipanggil dari thread live hanya untuk region tempat model nano ragu
+        self.cascade = None
+        if config.CASCADE_ENABLED:
+            self.cascade = CascadePolicy(
+                config.CASCADE_LOW_CONF, config.CASCADE_HIGH_CONF, config.CASCADE_MIN_FLAGGED_BOXES, config.CASCADE_NEAR_LIMIT_RATIO,
+                config.CASCADE_OVERLAP_IOU, config.CASCADE_REGION_PADDING_PX, config.CASCADE_MAX_REGION_FRACTION, config.CASCADE_MIN_INTERVAL_S
+            )
+        # Model 's' dipakai bergantian oleh siklus pemetaan & kaskade; kaskade melewatkan frame jika sedang dipakai
+        self._small_model_lock = threading.Lock()
+
+        # Figure plot dibuat sekali saat pertama dipakai (matplotlib tidak di-import saat startup);
+        # tiap siklus hanya memperbarui artist yang berubah
+        self._density_renderer = None
+        self._heatmap_renderer = None
         
-        os.makedirs(config.TEMP_PLOT_DIR, exist_ok=True)
+        if config.SAVE_DEBUG_ARTIFACTS:
+            os.makedirs(config.TEMP_PLOT_DIR, exist_ok=True)
+
+        # Tahap publikasi asinkron: upload & insert tidak lagi menahan thread penjadwal
+        self.outbox = None
+        if config.OUTBOX_ENABLED:
+            self.outbox = PublishOutbox(
+                config.OUTBOX_DIR, supabase_handler, num_workers=config.OUTBOX_UPLOAD_WORKERS, max_pending_jobs=config.OUTBOX_MAX_PENDING_JOBS,
+                insert_batch_size=config.OUTBOX_INSERT_BATCH_SIZE, backoff_base_s=config.OUTBOX_BACKOFF_BASE_S,
+                backoff_max_s=config.OUTBOX_BACKOFF_MAX_S, max_attempts=config.OUTBOX_MAX_ATTEMPTS
+            )
+            self.outbox.inserted_listeners.append(self._notify_mapping_rows)
+        # Riwayat lokal per siklus untuk grafik /api/history tanpa query ke Supabase
+        self.history = HistoryStore(config.HISTORY_DB_PATH, config.HISTORY_RETENTION_DAYS, config.HISTORY_MAX_POINTS) if config.HISTORY_ENABLED else None
+        # Callback yang dipanggil dengan baris density_mappings terbaru setelah tersimpan (mis. cache dashboard)
+        self.mapping_listeners = []
 
-    def _load_yolo_model(self, model_path):
+    def _load_yolo_model(self, model_path, component=None, in_worker=False):
+        """
+        Muat detektor dengan backend dari Config (ultralytics / onnxruntime / openvino, atau 'auto' dari ekstensi file).
+        in_worker=True: model dimuat di proses worker (InferenceWorkerPool) dan yang dikembalikan adalah proxy-nya.
+        """
+        status = self.model_status.get(component, {})
+        start = time.perf_counter()
         try:
             if os.path.exists(model_path):
-                print(f"Model YOLO berhasil dimuat dari: {model_path}")
-                return YOLO(model_path)
+                status["status"] = "loading"
+                backend = resolve_backend(model_path, self.config.DETECTOR_BACKEND)
+                status["backend"] = backend
+                if in_worker:
+                    model = self.density_worker = self._start_density_worker(model_path, backend)
+                    status["workers"] = self.config.DENSITY_WORKER_COUNT
+                else:
+                    model = load_detector(model_path, backend, self.config.DETECTOR_NUM_THREADS, names={0: self.config.TARGET_CLASS_NAME})
+                status["status"], status["load_s"] = "ready", round(time.perf_counter() - start, 2)
+                print(f"Model YOLO berhasil dimuat dari: {model_path} (backend: {backend}, {status['load_s']} detik)")
+                return model
+            status["status"] = "missing"
+            print(f"File model YOLO tidak ditemukan: {model_path}")
         except Exception as e:
+            status["status"], status["error"] = "failed", str(e)
             print(f"Error fatal saat memuat model YOLO dari {model_path}: {e}")
         return None
 
+    def _start_density_worker(self, model_path, backend):
+        """Model 's' di proses sendiri agar siklus pemetaan tidak menghambat stream live (GIL & core)."""
+        from inference_worker import InferenceWorkerPool
+        return InferenceWorkerPool(
+            model_path, backend, self.config.DENSITY_WORKER_THREADS or self.config.DETECTOR_NUM_THREADS,
+            names={0: self.config.TARGET_CLASS_NAME}, num_workers=self.config.DENSITY_WORKER_COUNT,
+            cpu_affinity=self.config.DENSITY_WORKER_CPU_AFFINITY, nice=self.config.DENSITY_WORKER_NICE,
+            request_timeout_s=self.config.DENSITY_WORKER_TIMEOUT_S, load_timeout_s=self.config.DENSITY_WORKER_LOAD_TIMEOUT_S
+        ).start()
+
+    def close(self):
+        """Hentikan proses worker model & lepaskan shared memory-nya."""
+        if self.density_worker is not None:
+            self.density_worker.close()
+
+    def start_model_loading(self):
+        """Muat model nano & small secara paralel di thread latar; mengembalikan thread koordinatornya."""
+        def load(component, attribute, model_path, label):
+            start = time.perf_counter()
+            print(f"Memuat model {label}...")
+            setattr(self, attribute, self._load_yolo_model(model_path, component, in_worker=component == "model_small" and self.config.DENSITY_WORKER_ENABLED))
+            if self.startup_profile is not None:
+                self.startup_profile.record(f"muat {label}", start, time.perf_counter() - start)
+
+        def load_all():
+            loaders = [
+                threading.Thread(target=load, args=("model_nano", "yolo_model_n", self.config.YOLO_MODEL_PATH_NANO, "YOLOv8n untuk Live Stream"), daemon=True),
+                threading.Thread(target=load, args=("model_small", "yolo_model_s", self.config.YOLO_MODEL_PATH_SMALL, "YOLOv8s untuk Analisis Kepadatan"), daemon=True)
+            ]
+            for loader in loaders: loader.start()
+            for loader in loaders: loader.join()
+            self.models_loaded.set()
+
+        coordinator = threading.Thread(target=load_all, daemon=True)
+        coordinator.start()
+        return coordinator
+
+    @property
+    def density_renderer(self):
+        if self._density_renderer is None:
+            from plot_renderer import DensityPlotRenderer
+            self._density_renderer = DensityPlotRenderer(self.config)
+        return self._density_renderer
+
+    @property
+    def heatmap_renderer(self):
+        if self._heatmap_renderer is None:
+            from plot_renderer import TemperatureHeatmapRenderer
+            self._heatmap_renderer = TemperatureHeatmapRenderer(self.config, resolution=self.config.TEMPERATURE_GRID_RESOLUTION)
+        return self._heatmap_renderer
+
     def _read_video_source_thread(self):
-        print("[Frame Reader] Thread pembaca video dimulai.")
-        cap = None
-        while True:
-            try:
-                if cap is None or not cap.isOpened():
-                    print(f"[Frame Reader] Membuka koneksi ke {self.config.VIDEO_SOURCE}...")
-                    if cap: cap.release()
-                    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
-                    cap = cv2.VideoCapture(self.config.VIDEO_SOURCE, cv2.CAP_FFMPEG)
-                    time.sleep(2)
-                    if not cap.isOpened():
-                        print("[Frame Reader] Gagal membuka koneksi. Mencoba lagi dalam 5 detik...")
-                        time.sleep(5)
-                        continue
-
-                ret, frame = cap.read()
-                if ret:
-                    with self.source_lock:
-                        self.latest_frame_from_source = frame.copy()
-                else:
-                    print("[Frame Reader] Frame tidak terbaca, koneksi mungkin terputus. Mencoba lagi...")
-                    cap.release()
-                    cap = None
-                    time.sleep(2)
-                time.sleep(0.01)
-            except Exception as e:
-                print(f"[Frame Reader] Error: {e}")
-                time.sleep(5)
+        # Kompatibilitas mode satu kamera; untuk multi kamera jalankan read_video_source_thread tiap kamera
+        self.primary_camera.read_video_source_thread()
 
     def process_rtsp_stream_for_mjpeg(self):
-        print(f"[Analyzer] Thread analisis dimulai dengan interval {self.config.STREAM_PROCESSING_INTERVAL_S} detik.")
+        print(f"[Analyzer] Thread analisis dimulai dengan interval {self.config.STREAM_PROCESSING_INTERVAL_S} detik untuk {len(self.cameras)} kamera.")
+        last_seqs = {camera.name: 0 for camera in self.cameras}
+        self.analyzer_started_at = time.time()
+        last_tick_end, achieved_fps = None, None
         while True:
             loop_start_time = time.time()
             
-            current_frame = None
-            with self.source_lock:
-                if self.latest_frame_from_source is not None:
-                    current_frame = self.latest_frame_from_source.copy()
+            # Kumpulkan frame BARU dari semua kamera lalu proses dalam SATU panggilan YOLO.
+            # Frame yang sudah dianotasi tidak diproses ulang; salinan hanya dibuat untuk frame yang akan digambari.
+            # Di mode on_demand pembaca hanya men-decode setelah diminta, jadi minta dulu lalu tunggu (maks. 0.5 detik total).
+            for camera in self.cameras:
+                camera.request_frame()
+            deadline = time.time() + 0.5
+            cameras, frames = [], []
+            for camera in self.cameras:
+                seq, current_frame = camera.frame_ring.copy_latest(newer_than=last_seqs[camera.name], timeout=max(0.0, deadline - time.time()))
+                if current_frame is not None:
+                    last_seqs[camera.name] = seq
+                    cameras.append(camera)
+                    frames.append(current_frame)
 
-            if current_frame is None:
-                time.sleep(0.5)
+            if not frames:
                 continue
 
-            annotated_frame = self._analyze_and_annotate_frame(current_frame)
-            with self.annotation_lock:
-                self.latest_annotated_frame = annotated_frame
+            if self.yolo_model_n is None:
+                # Model nano belum siap (masih dimuat): stream tetap menampilkan video mentah
+                annotated_frames = frames
+                for frame in frames:
+                    cv2.putText(frame, "Model sedang dimuat..." if not self.models_loaded.is_set() else "Model live tidak tersedia", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 165, 255), 2)
+            elif self.config.MOTION_GATING_ENABLED:
+                annotated_frames = self._analyze_gated_frames(frames, cameras)
+            else:
+                annotated_frames = self._analyze_and_annotate_frames(frames, cameras)
+            for camera, annotated_frame in zip(cameras, annotated_frames):
+                camera.set_annotated_frame(annotated_frame)
+            self.last_analysis_at = time.time()
+            for camera in cameras:
+                ANALYSIS_FRAMES.inc(camera=camera.name)
 
             processing_time = time.time() - loop_start_time
-            sleep_duration = self.config.STREAM_PROCESSING_INTERVAL_S - processing_time
+            ANALYSIS_TICK_SECONDS.observe(processing_time)
+            if last_tick_end is not None and self.last_analysis_at > last_tick_end:
+                instant_fps = 1.0 / (self.last_analysis_at - last_tick_end)
+                achieved_fps = instant_fps if achieved_fps is None else 0.8 * achieved_fps + 0.2 * instant_fps
+                ANALYSIS_FPS.set(round(achieved_fps, 3))
+            last_tick_end = self.last_analysis_at
+            interval_s = self._next_tick_interval()
+            ANALYSIS_TARGET_FPS.set(round(1.0 / interval_s, 3) if interval_s > 0 else 0.0)
+            sleep_duration = interval_s - processing_time
             if sleep_duration > 0:
                 time.sleep(sleep_duration)
 
-    def _analyze_and_annotate_frame(self, frame):
+    def _next_tick_interval(self):
+        """
+        Interval tick berikutnya: tetap (STREAM_PROCESSING_INTERVAL_S) atau yang tercepat di antara MotionGate kamera.
+        Kamera yang intervalnya lebih panjang tetap memakai ulang deteksi terakhir di tick itu (MotionGate.decide).
+        """
+        gates = [camera.motion_gate for camera in self.cameras if camera.motion_gate is not None]
+        if not gates or self.yolo_model_n is None:
+            return self.config.STREAM_PROCESSING_INTERVAL_S
+        return min(gate.interval_s for gate in gates)
+
+    def _analyze_gated_frames(self, frames, cameras):
+        """Model nano hanya untuk kamera yang skor geraknya menuntut deteksi; sisanya memakai ulang deteksi terakhir."""
+        now = time.monotonic()
+        decisions = []
+        for frame, camera in zip(frames, cameras):
+            gate = camera.motion_gate
+            score = gate.score(frame, camera.calibration_for(frame.shape)["roi_mask"])
+            if gate.last_scene_change:
+                self.request_early_mapping(f"perubahan adegan besar di kamera {camera.name} ({score:.0%} ROI berubah)")
+            decisions.append(gate.decide(score, now))
+
+        detect_indices = [i for i, decision in enumerate(decisions) if decision == DETECT]
+        inference_s = 0.0
+        if detect_indices:
+            start = time.perf_counter()
+            self._analyze_and_annotate_frames([frames[i] for i in detect_indices], [cameras[i] for i in detect_indices])
+            # Biaya penuh batch dibebankan ke setiap kamera yang ikut: itulah waktu tick yang benar-benar terpakai
+            inference_s = time.perf_counter() - start
+        for frame, camera, decision in zip(frames, cameras, decisions):
+            if decision == REUSE:
+                # Adegan praktis tidak berubah: grid halus diberi hitungan terakhir agar tetap segar untuk pemetaan
+                if camera.density_smoother is not None and camera.last_counts is not None:
+                    camera.latest_density = camera.density_smoother.update(camera.last_counts)
+                self._draw_overlays(frame, camera, camera.last_overlays)
+            camera.motion_gate.record(decision, inference_s if decision == DETECT else 0.0)
+            ANALYSIS_DECISIONS.inc(camera=camera.name, decision=decision)
+        return frames
+
+    def _draw_overlays(self, frame, camera, overlays):
+        for (x1, y1, x2, y2), label in overlays:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            if label:
+                cv2.putText(frame, label, (x1, max(12, y1 - 4)), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
+        area_points = camera.calibration_for(frame.shape)["area_points"]
+        if area_points is not None:
+            cv2.polylines(frame, [area_points], isClosed=True, color=(255, 0, 0), thickness=2)
+
+    def request_early_mapping(self, reason):
+        """Majukan siklus pemetaan; loop penjadwal menjalankannya setelah MOTION_MAPPING_DELAY_S (agar grid halus menyusul)."""
+        with self._early_mapping_lock:
+            if self._early_mapping_due_at is not None:
+                return
+            if self.last_mapping_at is not None and time.time() - self.last_mapping_at < self.config.MOTION_MAPPING_COOLDOWN_S:
+                return
+            self._early_mapping_due_at = time.time() + self.config.MOTION_MAPPING_DELAY_S
+        print(f"[Analyzer] Siklus pemetaan dimajukan: {reason}.")
+
+    def early_mapping_due(self):
+        return self._early_mapping_due_at is not None and time.time() >= self._early_mapping_due_at
+
+    def _analyze_and_annotate_frame(self, frame, camera=None):
+        return self._analyze_and_annotate_frames([frame], [camera or self.primary_camera])[0]
+
+    def _analyze_and_annotate_frames(self, frames, cameras):
         target_width = 640
-        frame_for_yolo = frame
-        if frame.shape[1] > target_width:
-            aspect_ratio = frame.shape[1] / frame.shape[0]
-            target_height = int(target_width / aspect_ratio)
-            frame_for_yolo = cv2.resize(frame, (target_width, target_height))
+        frames_for_yolo = []
+        for frame in frames:
+            frame_for_yolo = frame
+            if frame.shape[1] > target_width:
+                aspect_ratio = frame.shape[1] / frame.shape[0]
+                target_height = int(target_width / aspect_ratio)
+                frame_for_yolo = cv2.resize(frame, (target_width, target_height))
+            frames_for_yolo.append(frame_for_yolo)
         
-        # Gunakan model NANO untuk live view
-        results = self.yolo_model_n(frame_for_yolo, conf=0.4, verbose=False, half=True, device='cpu')
-
-        if results and results[0].boxes:
-            for box in results[0].boxes:
-                # === PERBAIKAN #1 DI SINI ===
-                if self.yolo_model_n.names[int(box.cls[0].item())].lower() == self.config.TARGET_CLASS_NAME.lower():
-                    x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                    if frame.shape[1] > target_width:
-                        scale_x = frame.shape[1] / frame_for_yolo.shape[1]
-                        scale_y = frame.shape[0] / frame_for_yolo.shape[0]
-                        x1, y1, x2, y2 = int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-        if self.selected_area_points is not None:
-            cv2.polylines(frame, [self.selected_area_points], isClosed=True, color=(255, 0, 0), thickness=2)
-
-        return frame
-
-    def load_calibration_data(self):
-        try:
-            if self.config.SELECTED_AREA_POINTS_PATH and os.path.exists(self.config.SELECTED_AREA_POINTS_PATH):
-                self.selected_area_points = np.load(self.config.SELECTED_AREA_POINTS_PATH)
-                if self.selected_area_points.ndim == 2:
-                    self.selected_area_points = self.selected_area_points.reshape((-1, 1, 2))
-                print(f"Titik area kalibrasi berhasil dimuat dari {self.config.SELECTED_AREA_POINTS_PATH}")
+        # Gunakan model NANO untuk live view, satu batch untuk semua kamera.
+        # Saat pelacakan aktif, deteksi lemah juga diminta agar track yang tertutup sebagian tetap tersambung.
+        # Kaskade butuh box di pita "ragu" (mulai CASCADE_LOW_CONF); box nano di bawah live_conf dibuang lagi setelahnya.
+        tracking = self.config.TRACKING_ENABLED
+        cascade = self.cascade is not None and self.yolo_model_s is not None
+        live_conf = self.config.TRACK_LOW_CONF if tracking else 0.4
+        detect_conf = min(self.config.CASCADE_LOW_CONF, live_conf) if cascade else live_conf
+        with INFERENCE_SECONDS.time(model="nano"):
+            results = self.yolo_model_n.predict(frames_for_yolo, conf=detect_conf)
+
+        for frame, frame_for_yolo, result, camera in zip(frames, frames_for_yolo, results, cameras):
+            xyxy, conf = self._extract_target_boxes(self.yolo_model_n, result)
+            if frame.shape[1] > target_width:
+                scale_x = frame.shape[1] / frame_for_yolo.shape[1]
+                scale_y = frame.shape[0] / frame_for_yolo.shape[0]
+                # Tetap float32 (sama dengan box yang tidak diskalakan); dibulatkan ke int hanya saat menggambar overlay
+                xyxy = xyxy * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+            if cascade:
+                xyxy, conf = self._refine_with_small_model(frame, camera, xyxy, conf, min_conf=live_conf)
+            if tracking:
+                # Kepadatan dari track (bukan deteksi mentah), dihaluskan terhadap waktu
+                tracks, world_coords = self._update_tracks(camera, frame.shape, xyxy, conf)
+                camera.last_counts = self._compute_density(world_coords)['counts']
+                camera.density_smoother.set_cell_area(self._cell_area(camera, frame.shape))
+                camera.latest_density = camera.density_smoother.update(camera.last_counts)
+                camera.last_overlays = [(tuple(track.box.astype(np.int32).tolist()), f"#{track.track_id}") for track in tracks if track.missed == 0]
             else:
-                self.selected_area_points = None
-        except Exception as e:
-            print(f"Error memuat titik area kalibrasi: {e}")
-            self.selected_area_points = None
+                # Kepadatan cepat dari model nano di setiap tick, tanpa menunggu siklus pemetaan
+                _, world_coords, _ = self._process_detections(frame, {'xyxy': xyxy}, camera, draw=False)
+                camera.latest_density = self._compute_density(world_coords, self._cell_area(camera, frame.shape))
+                camera.last_overlays = [(tuple(box), None) for box in xyxy.astype(np.int32).tolist()]
+            self._draw_overlays(frame, camera, camera.last_overlays)
+
+        return frames
 
-    def _load_numpy_file(self, path, dtype=None):
+    def _box_cells(self, camera, frame_shape, xyxy):
+        """Indeks sel grid datar untuk setiap box (-1 jika titik ujinya di luar ROI)."""
+        cfg = self.config
+        _, test_points, center_points = box_reference_points(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        calibration = camera.calibration_for(frame_shape)
+        in_roi = points_in_roi_mask(test_points, calibration["roi_mask"])
+        if calibration["artifact"] is not None:
+            # Lookup sel per piksel dari artefak kalibrasi: satu gather, tanpa proyeksi homografi
+            cells = calibration["artifact"].cells_at(center_points)
+            cells[~in_roi] = -1
+            return cells
+        x_world, y_world = project_to_world(center_points[in_roi], calibration["homography"], cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M)
+        gx, gy = cell_indices(x_world, y_world, cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y)
+        num_cols, _ = grid_shape(cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y)
+        cells = np.full(len(in_roi), -1, dtype=np.int64)
+        cells[in_roi] = gy * num_cols + gx
+        return cells
+
+    def _refine_with_small_model(self, frame, camera, xyxy, conf, min_conf=0.0):
+        """
+        Kaskade: region tempat model nano ragu dideteksi ulang dengan model 's', hasilnya menggantikan box nano di region itu.
+        Semua box nano ikut menentukan eskalasi, tetapi hanya box nano dengan conf >= min_conf yang dikembalikan
+        (hitungan live sama seperti tanpa kaskade selama tidak ada yang dieskalasi).
+        """
+        cfg, policy = self.config, self.cascade
+        cell_area = self._cell_area(camera, frame.shape)
+        cell_capacity = cfg.MAX_AYAM_PER_METER_PERSEGI * (cfg.GRID_SIZE_X * cfg.GRID_SIZE_Y if cell_area is None else cell_area)
+        flagged, reasons = policy.flag_boxes(xyxy, conf, self._box_cells(camera, frame.shape, xyxy), cell_capacity)
+        confident = conf >= min_conf
+        if not reasons:
+            policy.record_check(camera.name, reasons)
+            return xyxy[confident], conf[confident]
+        if not policy.due(camera.name):
+            policy.record_check(camera.name, reasons, skipped="rate_limit")
+            return xyxy[confident], conf[confident]
+        if not self._small_model_lock.acquire(blocking=False):
+            # Siklus pemetaan sedang memakai model 's'; stream live tidak ikut menunggu
+            policy.record_check(camera.name, reasons, skipped="busy")
+            return xyxy[confident], conf[confident]
         try:
-            if os.path.exists(path):
-                return np.load(path).astype(dtype) if dtype else np.load(path)
+            regions = policy.regions(xyxy, flagged, frame.shape)
+            crop_boxes = [policy.crop_box(region, frame.shape) for region in regions]
+            start = time.perf_counter()
+            with INFERENCE_SECONDS.time(model="small_cascade"):
+                results = self.yolo_model_s.predict([frame[y0:y1, x0:x1] for x0, y0, x1, y1 in crop_boxes], conf=0.2)
+            small_model_s = time.perf_counter() - start
         except Exception as e:
-            print(f"Error fatal saat memuat file kalibrasi {path}: {e}")
-        return None
+            print(f"[{camera.name}] Error saat eskalasi kaskade ke model 's': {e}")
+            policy.record_check(camera.name, reasons)
+            return xyxy[confident], conf[confident]
+        finally:
+            self._small_model_lock.release()
+
+        region_detections = []
+        for (x0, y0, _, _), result in zip(crop_boxes, results):
+            small_xyxy, small_conf = self._extract_target_boxes(self.yolo_model_s, result)
+            region_detections.append((small_xyxy + np.array([x0, y0, x0, y0], dtype=np.float32), small_conf))
+        merged_xyxy, merged_conf, nano_replaced, small_added = merge_region_detections(xyxy[confident], conf[confident], regions, region_detections)
+        policy.record_check(camera.name, reasons)
+        policy.record_escalation(camera.name, regions, frame.shape, small_model_s, nano_replaced, small_added)
+        for reason in reasons:
+            CASCADE_ESCALATIONS.inc(camera=camera.name, reason=reason)
+        return merged_xyxy, merged_conf
+
+    def _update_tracks(self, camera, frame_shape, xyxy, conf):
+        """Perbarui pelacak kamera lalu proyeksikan track pasti (termasuk yang sesaat tertutup) ke koordinat dunia."""
+        tracks = camera.tracker.update(xyxy, conf)
+        track_boxes = np.array([track.box for track in tracks], dtype=np.float32).reshape(-1, 4)
+        _, test_points, center_points = box_reference_points(track_boxes)
+        calibration = camera.calibration_for(frame_shape)
+        in_roi = points_in_roi_mask(test_points, calibration["roi_mask"])
+        x_world, y_world = project_to_world(center_points[in_roi], calibration["homography"], self.config.REAL_WORLD_WIDTH_M, self.config.REAL_WORLD_HEIGHT_M)
+        world_iter = iter(zip(x_world.tolist(), y_world.tolist()))
+        camera.tracker.set_world_positions(tracks, [next(world_iter) if inside else None for inside in in_roi.tolist()])
+        return tracks, (x_world, y_world)
+
+    def _extract_target_boxes(self, model, result):
+        """Ambil box kelas target dari Detections sebagai array (N,4) xyxy dan (N,) conf."""
+        if result is None or not len(result):
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+        target_ids = [idx for idx, name in model.names.items() if name.lower() == self.config.TARGET_CLASS_NAME.lower()]
+        keep = np.isin(result.cls, target_ids)
+        return np.asarray(result.xyxy[keep], dtype=np.float32), np.asarray(result.conf[keep], dtype=np.float32)
 
     def is_ready(self):
-        return all([self.yolo_model_s is not None, self.yolo_model_n is not None, self.homography_matrix is not None, self.roi_polygon_coords is not None])
-    def _create_temperature_heatmap(self, timestamp):
+        return all([self.yolo_model_s is not None, self.yolo_model_n is not None] + [camera.is_ready() for camera in self.cameras])
+
+    def readiness(self):
+        """Status per komponen untuk endpoint readiness; 'ready' True jika model & semua kamera siap."""
+        cameras = {}
+        for camera in self.cameras:
+            reader = camera.get_reader_stats()
+            cameras[camera.name] = {
+                "calibrated": camera.is_ready(),
+                "connected": reader["connected"],
+                "has_frame": camera.frame_ring.latest_seq > 0,
+                "frames_decoded": reader["frames_decoded"],
+                "reconnects": reader["reconnects"]
+            }
+        components = {
+            "models": {name: dict(status) for name, status in self.model_status.items()},
+            "cameras": cameras,
+            "analyzer": {
+                "running": self.analyzer_started_at is not None,
+                "last_analysis_age_s": round(time.time() - self.last_analysis_at, 1) if self.last_analysis_at else None,
+                "motion_gating": {camera.name: camera.motion_gate.stats() for camera in self.cameras if camera.motion_gate is not None},
+                "cascade": self.cascade.stats() if self.cascade is not None else None
+            },
+            "outbox": {"enabled": self.outbox is not None, "running": self.outbox is not None and self.outbox.is_running()},
+            "density_worker": dict(self.density_worker.stats(), enabled=True) if self.density_worker is not None else {"enabled": False}
+        }
+        ready = (all(status["status"] == "ready" for status in self.model_status.values())
+                 and all(camera["calibrated"] and camera["has_frame"] for camera in cameras.values()))
+        return {"ready": ready, "components": components}
+    def _create_temperature_heatmap(self, timestamp, sensor_data=None):
         """
-        Mengambil data suhu, melakukan interpolasi, dan membuat gambar heatmap.
+        Mengambil data suhu (jika belum diberikan), melakukan interpolasi, dan membuat gambar heatmap (bytes PNG, None jika data kurang).
         """
         print("Membuat plot heatmap suhu...")
         
-        sensor_data = self.supabase_handler.get_latest_temperature_data()
+        if sensor_data is None:
+            sensor_data = self.supabase_handler.get_latest_temperature_data()
         
+        if sensor_data and self.event_bus is not None:
+            self.event_bus.publish_if_changed("temperature", sensor_data)
+
         if not sensor_data or len(sensor_data) < 3:
             print("Data suhu tidak cukup untuk membuat heatmap.")
-            # ... (kode untuk membuat placeholder jika data kurang) ...
-            return "path/to/placeholder.png" # Ganti dengan path placeholder jika perlu
+            return None
 
         points, values = [], []
         for data in sensor_data:
@@ -174,170 +512,242 @@ class ChickenDensityAnalyzer:
         points = np.array(points)
         values = np.array(values)
         
-        from scipy.interpolate import griddata
-        grid_x, grid_y = np.mgrid[0:self.config.REAL_WORLD_WIDTH_M:100j, 0:self.config.REAL_WORLD_HEIGHT_M:100j]
-        grid_z = griddata(points, values, (grid_x, grid_y), method='cubic')
+        # Triangulasi & bobot dihitung sekali per tata letak sensor; tiap pembaruan hanya perkalian matriks sparse
+        interpolator = interpolator_for(points, self.config.REAL_WORLD_WIDTH_M, self.config.REAL_WORLD_HEIGHT_M,
+                                        self.config.TEMPERATURE_GRID_RESOLUTION, self.config.TEMPERATURE_INTERPOLATION_METHOD,
+                                        self.config.TEMPERATURE_FILL_OUTSIDE_HULL)
+        grid_x, grid_y = interpolator.grid_x, interpolator.grid_y
+        grid_z = interpolator.interpolate(values)
 
-        plt.figure(figsize=(8, 7))
-        
-        # Gunakan colormap 'hot' seperti di contoh
-        plt.imshow(grid_z.T, extent=(0,3,0,3), origin='lower', cmap='hot', interpolation='bicubic')
-        
-        cbar = plt.colorbar()
-        cbar.set_label('Temperature (°C)')
-        
-        # Plot titik-titik sensor dengan labelnya
-        scatter_sensors = plt.scatter(points[:, 0], points[:, 1], c='blue', s=150, edgecolors='white', label='Sensors')
-        
-        # Cari dan plot titik terpanas
+        # Cari titik terpanas
+        heatspot = None
         try:
             max_temp_idx = np.unravel_index(np.nanargmax(grid_z), grid_z.shape)
-            heatspot_x = grid_x[max_temp_idx[0], 0]
-            heatspot_y = grid_y[0, max_temp_idx[1]]
-            scatter_heatspot = plt.scatter(heatspot_x, heatspot_y, c='green', marker='X', s=250, edgecolors='white', linewidth=2, label='Heatspot Center')
-            plt.legend(handles=[scatter_sensors, scatter_heatspot])
+            heatspot = (grid_x[max_temp_idx[0], 0], grid_y[0, max_temp_idx[1]])
         except (ValueError, IndexError):
             print("Tidak bisa menemukan titik terpanas, kemungkinan semua nilai NaN.")
-            plt.legend(handles=[scatter_sensors])
-        
-        plt.title(f"Temperature Heatmap at {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
-        plt.xlabel("X Coordinate (m)")
-        plt.ylabel("Y Coordinate (m)")
-        
-        plot_path = os.path.join(self.config.TEMP_PLOT_DIR, f"heatmap_plot_{timestamp.strftime('%Y%m%d_%H%M%S')}.png")
-        plt.savefig(plot_path, bbox_inches='tight')
-        plt.close()
-        
+
+        png_bytes = self.heatmap_renderer.render(grid_z, points, heatspot, timestamp)
         print("Plot heatmap suhu berhasil dibuat.")
-        return plot_path
+        return png_bytes
 
     # === PERBAIKAN #2: FUNGSI INI DIRAPIKAN TOTAL ===
     def run_mapping_cycle(self):
-        # Tambahkan print ini untuk debugging, untuk memastikan fungsi yang benar dipanggil
-        print("\n>>> DEBUG: Memulai run_mapping_cycle. Akan menggunakan model 's'.")
+        with self._early_mapping_lock:
+            self.last_mapping_at = time.time()
+            self._early_mapping_due_at = None
 
-        if not self.yolo_model_s:
+        if not self.yolo_model_s and not all(self._smoothed_density_ready(camera) for camera in self.cameras):
             print("Model YOLOv8s tidak siap, siklus dibatalkan.")
+            MAPPING_CYCLES.inc(result="model_not_ready")
             return
         
-        # 1. Ambil frame terbaru dari thread pembaca.
-        frame = None
-        with self.source_lock:
-            if self.latest_frame_from_source is not None:
-                frame = self.latest_frame_from_source.copy()
-
-        if frame is None:
-            print("Gagal mengambil snapshot dari stream. Siklus dihentikan.")
-            return
-        
-        # 2. Lakukan deteksi AKURAT langsung pada frame yang sudah didapat.
-        print(">>> DEBUG: Memanggil self.yolo_model_s untuk deteksi...")
-        detections = []
-        try:
-            results = self.yolo_model_s(frame, conf=0.2, verbose=False) 
-            if results and results[0].boxes:
-                for box in results[0].boxes:
-                    if self.yolo_model_s.names[int(box.cls[0].item())].lower() == self.config.TARGET_CLASS_NAME.lower():
-                        detections.append({'xyxy': box.xyxy[0].tolist(), 'conf': float(box.conf[0].item())})
-        except Exception as e:
-            print(f"Error saat deteksi YOLOv8s: {e}")
-        
-        print(f"Deteksi dengan YOLOv8s selesai, ditemukan {len(detections)} ayam.")
+        # 1. Pinjam frame terbaru setiap kamera (view read-only, tanpa salinan) selama siklus berjalan.
+        with ExitStack() as borrowed, MAPPING_PHASE_SECONDS.time(phase="total"):
+            cameras, frames = [], []
+            for camera in self.cameras:
+                _, frame = borrowed.enter_context(camera.borrow_fresh_frame())
+                if frame is None:
+                    print(f"[{camera.name}] Gagal mengambil snapshot dari stream, kamera dilewati.")
+                    continue
+                cameras.append(camera)
+                frames.append(frame)
+
+            if not frames:
+                print("Gagal mengambil snapshot dari stream. Siklus dihentikan.")
+                MAPPING_CYCLES.inc(result="no_frames")
+                return
+            try:
+                self._run_mapping_on_frames(cameras, frames)
+            except Exception:
+                MAPPING_CYCLES.inc(result="error")
+                raise
+            MAPPING_CYCLES.inc(result="ok")
+
+    def _run_mapping_on_frames(self, cameras, frames):
+        # 2. Kamera dengan data pelacakan live yang masih segar memakai grid halus & track-nya langsung;
+        #    sisanya dideteksi AKURAT dengan model 's' dalam satu batch.
+        detections_per_frame = [None] * len(frames)
+        density_results = [None] * len(frames)
+        model_indices = []
+        for i, camera in enumerate(cameras):
+            if self._smoothed_density_ready(camera):
+                tracks = camera.tracker.confirmed_tracks()
+                detections_per_frame[i] = {
+                    'xyxy': np.array([track['box'] for track in tracks], dtype=np.float32).reshape(-1, 4),
+                    'conf': np.array([track['conf'] for track in tracks], dtype=np.float32)
+                }
+                density_results[i] = camera.density_smoother.result()
+            else:
+                model_indices.append(i)
+
+        if model_indices and self.yolo_model_s:
+            for i in model_indices:
+                detections_per_frame[i] = {'xyxy': np.zeros((0, 4), dtype=np.float32), 'conf': np.zeros(0, dtype=np.float32)}
+            try:
+                with MAPPING_PHASE_SECONDS.time(phase="detect"):
+                    detections = self._detect_density_model([frames[i] for i in model_indices], [cameras[i] for i in model_indices])
+                for i, frame_detections in zip(model_indices, detections):
+                    detections_per_frame[i] = frame_detections
+            except Exception as e:
+                print(f"Error saat deteksi YOLOv8s: {e}")
+        elif model_indices:
+            print("Model YOLOv8s tidak siap, kamera tanpa data pelacakan dilewati.")
+            keep = [i for i in range(len(frames)) if i not in model_indices]
+            cameras, frames = [cameras[i] for i in keep], [frames[i] for i in keep]
+            detections_per_frame, density_results = [detections_per_frame[i] for i in keep], [density_results[i] for i in keep]
         
         # 3. Sisa fungsi berjalan seperti biasa untuk membuat plot dan upload.
         current_ts = datetime.now()
         ts_str = current_ts.strftime("%Y%m%d_%H%M%S")
-        
-        annotated_image, world_coords, in_roi_count = self._process_detections(frame.copy(), detections)
-        plot_path, grid_data, high_density_alerts = self._create_density_plot(world_coords, current_ts)
-        #plot heatmap suhu
-        heatmap_plot_path = self._create_temperature_heatmap(current_ts)
-        
-        annotated_img_path = os.path.join(self.config.TEMP_PLOT_DIR, f"annotated_snapshot_{ts_str}.jpg")
-        cv2.imwrite(annotated_img_path, annotated_image)
-        snapshot_url = self.supabase_handler.upload_file(self.config.BUCKET_SNAPSHOT_NAME, annotated_img_path, os.path.basename(annotated_img_path))
-        plot_url = self.supabase_handler.upload_file(self.config.BUCKET_PLOT_NAME, plot_path, os.path.basename(plot_path))
-        heatmap_url = self.supabase_handler.upload_file(self.config.BUCKET_HEATMAP_NAME, heatmap_plot_path, os.path.basename(heatmap_plot_path)) # Gunakan bucket 'heatmap'
-        if snapshot_url and plot_url:
-            db_data = {
-                "mapping_timestamp": current_ts.replace(tzinfo=timezone.utc).isoformat(),
-                "source_screenshot_url": snapshot_url,
-                "density_plot_url": plot_url,
-                "heatmap_plot_url": heatmap_url,
-                "chickens_in_roi_count": in_roi_count,
-                "grid_density_data": grid_data
-            }
-            self.supabase_handler.insert_mapping_data(db_data)
+
+        # Sensor suhu berlaku untuk seluruh kandang, jadi heatmap cukup dibuat & diunggah sekali per siklus
+        with MAPPING_PHASE_SECONDS.time(phase="heatmap"):
+            sensor_data = self.supabase_handler.get_latest_temperature_data()
+            artifacts = {'heatmap': self._artifact(self.config.BUCKET_HEATMAP_NAME, self._create_temperature_heatmap(current_ts, sensor_data), f"heatmap_plot_{ts_str}.png", "image/png")} # Gunakan bucket 'heatmap'
+        rows, density_summary = [], {}
+        with MAPPING_PHASE_SECONDS.time(phase="render"):
+            for camera, frame, detections, density_result in zip(cameras, frames, detections_per_frame, density_results):
+                if density_result is None:
+                    print(f"[{camera.name}] Deteksi dengan YOLOv8s selesai, ditemukan {len(detections['xyxy'])} ayam.")
+                else:
+                    print(f"[{camera.name}] Memakai kepadatan halus dari pelacakan live, {len(detections['xyxy'])} track aktif.")
+                rows.append(self._build_camera_mapping(camera, frame, detections, current_ts, artifacts, density_summary, density_result))
+
+        if self.history is not None:
+            try:
+                self.history.record_cycle(current_ts, density_summary, sensor_data)
+            except Exception as e:
+                print(f"Error menyimpan riwayat lokal: {e}")
+        # Angka kepadatan langsung dikirim ke dashboard; URL gambar menyusul lewat event 'mapping' setelah tersimpan
+        if self.event_bus is not None:
+            self.event_bus.publish("density", {"timestamp": current_ts.isoformat(), "cameras": density_summary})
+        with MAPPING_PHASE_SECONDS.time(phase="publish"):
+            self._publish(artifacts, rows)
+        print("--- Siklus Pemetaan (v8s) Selesai ---")
+
+    def _artifact(self, bucket_name, data, file_name, content_type):
+        """Artefak siap unggah di memori; salinan ke TEMP_PLOT_DIR hanya dibuat di mode debug."""
+        if data is not None and self.config.SAVE_DEBUG_ARTIFACTS:
+            debug_path = os.path.join(self.config.TEMP_PLOT_DIR, file_name)
+            try:
+                with open(debug_path, 'wb') as f:
+                    f.write(data)
+            except OSError as e: print(f"Error menyimpan artefak debug '{debug_path}': {e}")
+        return {'bucket': bucket_name, 'data': data, 'file_name': file_name, 'content_type': content_type}
+
+    def _detect_density_model(self, frames, cameras):
+        """Deteksi model 's' untuk beberapa frame: satu batch frame penuh, atau satu batch tile ROI jika mode tile aktif."""
+        with self._small_model_lock:
+            return self._detect_density_model_locked(frames, cameras)
+
+    def _detect_density_model_locked(self, frames, cameras):
+        if self.tiled_detector is not None:
+            with INFERENCE_SECONDS.time(model="small_tiled"):
+                detections = self.tiled_detector.detect(self.yolo_model_s, frames, cameras, lambda result: self._extract_target_boxes(self.yolo_model_s, result), conf=0.2)
+            TILED_CROPS.inc(self.tiled_detector.last_stats["crops"])
+            return detections
+        with INFERENCE_SECONDS.time(model="small"):
+            results = self.yolo_model_s.predict(frames, conf=0.2)
+        detections = []
+        for result in results:
+            xyxy, conf = self._extract_target_boxes(self.yolo_model_s, result)
+            detections.append({'xyxy': xyxy, 'conf': conf})
+        return detections
+
+    def _smoothed_density_ready(self, camera):
+        return (self.config.MAPPING_USE_SMOOTHED_DENSITY and camera.density_smoother is not None
+                and camera.density_smoother.is_fresh(self.config.SMOOTHED_DENSITY_MAX_AGE_S, self.config.DENSITY_SMOOTHING_TIME_CONSTANT_S))
+
+    def _build_camera_mapping(self, camera, frame, detections, current_ts, artifacts, density_summary, density_result=None):
+        """
+        Membuat snapshot & plot kepadatan satu kamera, lalu mengembalikan spesifikasi baris DB-nya.
+        density_result diisi jika kepadatan sudah tersedia (grid halus dari pelacakan); jika None dihitung dari detections.
+        """
+        ts_str = current_ts.strftime("%Y%m%d_%H%M%S")
+        # Nama file diberi prefix kamera agar tidak saling menimpa di bucket pada mode multi kamera
+        file_prefix = f"{camera.name}_" if self.multi_camera else ""
+
+        # frame adalah view pinjaman read-only; salinan hanya dibuat di sini karena snapshot perlu digambari
+        annotated_image, world_coords, in_roi_count = self._process_detections(frame.copy(), detections, camera)
+        if density_result is None:
+            density_result = self._compute_density(world_coords, self._cell_area(camera, frame.shape))
+        grid_data, high_density_alerts = density_result['grid_data'], density_result['alerts']
+        density_summary[camera.name] = {
+            "chickens_in_roi_count": in_roi_count,
+            "grid_counts": density_result['counts'].tolist(),
+            "alerts": high_density_alerts
+        }
+
+        (flag, snapshot_jpg) = cv2.imencode(".jpg", annotated_image)
+        artifacts[f'snapshot_{camera.name}'] = self._artifact(self.config.BUCKET_SNAPSHOT_NAME, snapshot_jpg.tobytes() if flag else None, f"{file_prefix}annotated_snapshot_{ts_str}.jpg", "image/jpeg")
+        artifacts[f'plot_{camera.name}'] = self._artifact(self.config.BUCKET_PLOT_NAME, self._create_density_plot(world_coords, density_result, current_ts), f"{file_prefix}density_plot_{ts_str}.png", "image/png")
+
+        db_data = {
+            "mapping_timestamp": current_ts.replace(tzinfo=timezone.utc).isoformat(),
+            "chickens_in_roi_count": in_roi_count,
+            "grid_density_data": grid_data
+        }
+        if self.multi_camera:
+            # Mode multi kamera membutuhkan kolom 'camera_name' di tabel density_mappings
+            db_data["camera_name"] = camera.name
         if high_density_alerts:
             # ... (notifikasi telegram tidak berubah)
             pass
-        for f_path in [annotated_img_path, plot_path, heatmap_plot_path]:
-            if f_path and os.path.exists(f_path):
-                try: os.remove(f_path)
-                except OSError as e: print(f"Error menghapus file sementara '{f_path}': {e}")
+        return {
+            'row': db_data,
+            'url_fields': {"source_screenshot_url": f'snapshot_{camera.name}', "density_plot_url": f'plot_{camera.name}', "heatmap_plot_url": 'heatmap'},
+            # Seperti sebelumnya, baris hanya disimpan jika snapshot & plot kepadatan berhasil diunggah
+            'required': ["source_screenshot_url", "density_plot_url"]
+        }
 
-        print("--- Siklus Pemetaan (v8s) Selesai ---")
+    def _publish(self, artifacts, rows):
+        """Serahkan artefak & baris ke outbox (asinkron), atau unggah langsung jika outbox dimatikan."""
+        if self.outbox is not None:
+            self.outbox.enqueue(artifacts, rows)
+            return
+        urls = {key: self.supabase_handler.upload_bytes(a['bucket'], a['data'], a['file_name'], a['content_type'])["url"] if a['data'] is not None else None
+                for key, a in artifacts.items()}
+        for spec in rows:
+            db_data = dict(spec['row'])
+            for field, key in spec['url_fields'].items():
+                db_data[field] = urls.get(key)
+            if all(db_data[field] for field in spec['required']):
+                if self.supabase_handler.insert_mapping_data(db_data):
+                    self._notify_mapping_listeners(db_data)
 
+    def _notify_mapping_rows(self, rows):
+        """Listener outbox: setiap baris dalam batch yang ter-insert diteruskan, sama seperti jalur sinkron."""
+        for db_row in rows:
+            self._notify_mapping_listeners(db_row)
 
-    def _process_detections(self, image_to_draw, detections):
-        # ... (fungsi ini tidak berubah) ...
-        x_world, y_world, in_roi_count = [], [], 0
-        pts_for_polylines = np.array(self.roi_polygon_coords, dtype=np.int32).reshape((-1, 1, 2))
-        cv2.polylines(image_to_draw, [pts_for_polylines], isClosed=True, color=(255, 0, 0), thickness=3)
-        for det in detections:
-            x1, y1, x2, y2 = map(int, det['xyxy'])
-            cv2.rectangle(image_to_draw, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            center_x, center_y, bottom_y = (x1 + x2) / 2, (y1 + y2) / 2, float(y2)
-            point_to_test = (center_x, bottom_y)
-            if cv2.pointPolygonTest(self.roi_polygon_coords, point_to_test, False) >= 0:
-                in_roi_count += 1
-                pt_pixel = np.float32([[center_x, center_y]]).reshape(1, 1, 2)
-                pt_world = cv2.perspectiveTransform(pt_pixel, self.homography_matrix)
-                if pt_world is not None:
-                    xw, yw = pt_world[0][0][0], pt_world[0][0][1]
-                    x_world.append(np.clip(xw, 0, self.config.REAL_WORLD_WIDTH_M))
-                    y_world.append(np.clip(yw, 0, self.config.REAL_WORLD_HEIGHT_M))
-                    cv2.circle(image_to_draw, (int(center_x), int(bottom_y)), 5, (0, 255, 0), -1)
-            else:
-                cv2.circle(image_to_draw, (int(center_x), int(bottom_y)), 5, (0, 0, 255), -1)
-        return image_to_draw, (x_world, y_world), in_roi_count
+    def _notify_mapping_listeners(self, db_row):
+        for listener in self.mapping_listeners:
+            try: listener(db_row)
+            except Exception as e: print(f"Error pada listener pemetaan: {e}")
 
-    def _create_density_plot(self, world_coords, timestamp):
-        # ... (fungsi ini tidak berubah) ...
-        x_coords, y_coords = world_coords
+    def _process_detections(self, image_to_draw, detections, camera=None, draw=True):
+        """Filter ROI & proyeksi homografi sekaligus untuk semua deteksi ({'xyxy': (N,4), 'conf': (N,)})."""
+        camera = camera or self.primary_camera
+        boxes, test_points, center_points = box_reference_points(np.asarray(detections['xyxy'], dtype=np.float32).reshape(-1, 4))
+        calibration = camera.calibration_for(image_to_draw.shape)
+        in_roi = points_in_roi_mask(test_points, calibration["roi_mask"])
+        x_world, y_world = project_to_world(center_points[in_roi], calibration["homography"], self.config.REAL_WORLD_WIDTH_M, self.config.REAL_WORLD_HEIGHT_M)
+        if draw:
+            draw_detections(image_to_draw, boxes, test_points, in_roi, calibration["roi_polygon"])
+        return image_to_draw, (x_world, y_world), int(in_roi.sum())
+
+    def _cell_area(self, camera, frame_shape):
+        """Luas lantai sebenarnya per sel dari artefak kalibrasi (None = luas sel penuh)."""
+        artifact = camera.calibration_for(frame_shape)["artifact"]
+        return artifact.effective_cell_area(self.config.CALIBRATION_MIN_CELL_AREA_FRACTION) if artifact is not None else None
+
+    def _compute_density(self, world_coords, cell_area_m2=None):
         cfg = self.config
-        num_cols, num_rows = math.ceil(cfg.REAL_WORLD_WIDTH_M / cfg.GRID_SIZE_X), math.ceil(cfg.REAL_WORLD_HEIGHT_M / cfg.GRID_SIZE_Y)
-        counts_per_grid = {}
-        for xw, yw in zip(x_coords, y_coords):
-            gx, gy = math.floor(xw / cfg.GRID_SIZE_X), math.floor(yw / cfg.GRID_SIZE_Y)
-            counts_per_grid[(gx, gy)] = counts_per_grid.get((gx, gy), 0) + 1
-        grid_data_for_db = {f"{k[0]}_{k[1]}": v for k, v in counts_per_grid.items()}
-        high_density_alerts = []
-        plt.figure(figsize=(10, 10))
-        ax = plt.gca()
-        ax.set_facecolor('whitesmoke')
-        ax.add_patch(plt.Rectangle((0, 0), cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, facecolor='skyblue', alpha=0.2, edgecolor='none'))
-        for r in range(num_rows):
-            for c in range(num_cols):
-                count = counts_per_grid.get((c, r), 0)
-                grid_area = cfg.GRID_SIZE_X * cfg.GRID_SIZE_Y
-                density = count / grid_area if grid_area > 0 else 0
-                if count > 0:
-                    plt.text((c + 0.5) * cfg.GRID_SIZE_X, (r + 0.5) * cfg.GRID_SIZE_Y, f"{count}\n({density:.1f}/m²)", ha='center', va='center', fontsize=10, color='blue', weight='bold')
-                if density > cfg.MAX_AYAM_PER_METER_PERSEGI:
-                    ax.add_patch(plt.Rectangle((c * cfg.GRID_SIZE_X, r * cfg.GRID_SIZE_Y), cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y, facecolor='red', alpha=0.4, edgecolor='none'))
-                    high_density_alerts.append({'grid_x': c, 'grid_y': r, 'count': count, 'density': density})
-        if x_coords:
-            plt.scatter(x_coords, y_coords, c='red', s=50, edgecolors='black', label='Posisi Ayam (Dalam ROI)')
-        plt.xlim(-0.1, cfg.REAL_WORLD_WIDTH_M + 0.1)
-        plt.ylim(-0.1, cfg.REAL_WORLD_HEIGHT_M + 0.1)
-        plt.title(f"Kepadatan Ayam (ROI) @ {timestamp.strftime('%Y-%m-%d %H:%M:%S')} (Max {cfg.MAX_AYAM_PER_METER_PERSEGI}/m²)", fontsize=14)
-        plt.xlabel("Lebar Area (X - meter)", fontsize=12)
-        plt.ylabel("Kedalaman Area (Y - meter)", fontsize=12)
-        plt.grid(True, linestyle='--', alpha=0.6)
-        plt.legend()
-        ax.set_aspect('equal', 'box')
-        plot_path = os.path.join(cfg.TEMP_PLOT_DIR, f"density_plot_{timestamp.strftime('%Y%m%d_%H%M%S')}.png")
-        plt.savefig(plot_path, bbox_inches='tight', dpi=150)
-        plt.close()
-        return plot_path, grid_data_for_db, high_density_alerts
\ No newline at end of file
+        x_coords, y_coords = world_coords
+        return compute_grid_density(x_coords, y_coords, cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M, cfg.GRID_SIZE_X, cfg.GRID_SIZE_Y,
+                                    cfg.MAX_AYAM_PER_METER_PERSEGI, cell_area_m2)
+
+    def _create_density_plot(self, world_coords, density_result, timestamp):
+        """Render hasil compute_grid_density menjadi bytes PNG; tidak lagi menghitung apa pun sendiri."""
+        return self.density_renderer.render(world_coords, density_result, timestamp)
@@ -10,10 +10,21 @@ class Config:
         # --- Konfigurasi yang Tidak Rahasia ---
         self.YOLO_MODEL_PATH_SMALL = r"D:\Downloads\besti.pt"#"besti.pt/v8n.pt"
         self.YOLO_MODEL_PATH_NANO = r"D:\Downloads\v8n.pt"
+        # Backend inferensi CPU: "auto" (dari ekstensi: .pt -> ultralytics, .onnx -> onnxruntime, .xml/folder -> openvino),
+        # atau paksa "ultralytics" / "onnxruntime" / "openvino". Model INT8 hasil export_detector.py dipakai apa adanya.
+        self.DETECTOR_BACKEND = "auto"
+        self.DETECTOR_NUM_THREADS = 0 # 0 = default backend
         self.VIDEO_SOURCE = r"D:\Downloads\Ayam Panjang.mp4"#"rtsp://localhost:8554/mystream"#
         self.TARGET_CLASS_NAME = 'broiler'
         self.MJPEG_HOST = '0.0.0.0'
         self.MJPEG_PORT = 8080
+        self.MJPEG_JPEG_QUALITY = 70
+        self.MJPEG_MAX_CLIENTS = 20 # 0 = tanpa batas
+        # Varian stream per permintaan: /video_feed?width=480&quality=50&fps=5 (di-resize & di-encode sekali per frame per varian)
+        self.MJPEG_MAX_VARIANTS = 8 # per kamera; varian tanpa penonton yang paling lama tidak dipakai dibuang lebih dulu
+        self.MJPEG_MIN_WIDTH = 160
+        self.MJPEG_MAX_FPS = 30 # batas ?fps= per klien; 0 = tanpa batas
+        self.MJPEG_WEBSOCKET_ENABLED = True # /ws/video_feed..., butuh paket opsional flask-sock
         self.HOMOGRAPHY_MATRIX_PATH = r'D:\Downloads\normal_homography_matrix.npy'
         self.SELECTED_AREA_POINTS_PATH = r'D:\Downloads\normal_selected_area_points.npy'
         self.REAL_WORLD_WIDTH_M = 3.0
@@ -23,19 +34,152 @@ class Config:
         self.GRID_SIZE_Y = 1.0
         self.MAX_AYAM_PER_METER_PERSEGI = 12
         self.TEMP_PLOT_DIR = r"D:\Downloads\temp_files"
+        # Data lokal yang dibuat aplikasi (outbox, riwayat, cache kalibrasi); timpa dengan env CHICKEN_DATA_DIR
+        self.DATA_DIR = os.getenv("CHICKEN_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+        self.SAVE_DEBUG_ARTIFACTS = False # True = simpan juga salinan snapshot & plot ke TEMP_PLOT_DIR
+
+        # --- Artefak kalibrasi (lookup sel per piksel, luas sel sebenarnya, peta bird's-eye), dibuat sekali per resolusi ---
+        self.CALIBRATION_CACHE_DIR = os.path.join(self.DATA_DIR, "calibration_cache") # None = hanya di memori, dibuat ulang setiap start
+        self.CALIBRATION_MIN_CELL_AREA_FRACTION = 0.25 # luas sel tepi (sebagian di luar ROI) tidak dianggap lebih kecil dari ini x luas sel penuh
+        self.BIRDSEYE_ENABLED = True # stream /video_feed/<kamera>/birdseye
+        self.BIRDSEYE_WIDTH_PX = 800
+
         self.BUCKET_SNAPSHOT_NAME = "ssayam"
         self.BUCKET_PLOT_NAME = "plotayam"
         self.BUCKET_HEATMAP_NAME = "heatmap"
+
+        # --- Outbox publikasi (upload & insert asinkron yang tahan restart) ---
+        self.OUTBOX_ENABLED = True
+        self.OUTBOX_DIR = os.path.join(self.DATA_DIR, "outbox")
+        self.OUTBOX_UPLOAD_WORKERS = 3
+        self.OUTBOX_MAX_PENDING_JOBS = 500 # job tertua dibuang jika antrean melebihi batas ini
+        self.OUTBOX_INSERT_BATCH_SIZE = 20
+        self.OUTBOX_BACKOFF_BASE_S = 2.0
+        self.OUTBOX_BACKOFF_MAX_S = 300.0
+        self.OUTBOX_MAX_ATTEMPTS = 50 # per artefak (upload) & per job (insert), lalu ditandai gagal; 0 = coba terus tanpa batas
+        # --- Riwayat lokal kepadatan & suhu (/api/history) ---
+        self.HISTORY_ENABLED = True
+        self.HISTORY_DB_PATH = os.path.join(self.DATA_DIR, "history.sqlite")
+        self.HISTORY_RETENTION_DAYS = 90 # 0 = simpan selamanya
+        self.HISTORY_MAX_POINTS = 500 # bucket maksimum per seri; resolusi diperbesar otomatis untuk rentang panjang
+        # --- Observabilitas (/metrics format Prometheus, /debug/profile) ---
+        self.METRICS_ENABLED = True
+        self.PROFILER_ENABLED = False # /debug/profile?seconds=10 — aktifkan hanya saat investigasi
+        self.PROFILER_SAMPLE_INTERVAL_S = 0.01
+        # --- Cache dashboard (/api/dashboard_data) ---
+        self.DASHBOARD_MAPPING_TTL_S = 120.0 # juga langsung diperbarui setiap siklus pemetaan menyimpan baris baru
+        self.DASHBOARD_TEMPERATURE_TTL_S = 10.0
+        self.DASHBOARD_FAILURE_TTL_S = 5.0 # hasil gagal/kosong dari Supabase dipakai ulang selama ini agar Supabase yang mati tidak dibanjiri
+        # --- Push event dashboard (SSE /api/events) ---
+        self.EVENTS_RING_SIZE = 100 # event terakhir yang bisa di-replay lewat Last-Event-ID
+        self.EVENTS_HEARTBEAT_S = 15.0
+        # Dashboard berlangganan ke server SSE asyncio di port ini (event_server.py): satu thread untuk semua koneksi.
+        # None = pakai /api/events di server Flask, di mana setiap koneksi memegang satu thread Werkzeug.
+        self.EVENTS_ASYNC_PORT = 8081
+        self.EVENTS_ASYNC_MAX_SUBSCRIBERS = 2000
+        self.EVENTS_MAX_SUBSCRIBERS = 100 # batas /api/events di server Flask (thread per koneksi); di atas ini -> 503
+        # True = pakai Supabase palsu lokal (fake_supabase.py) untuk uji offline
+        self.USE_FAKE_SUPABASE = False
+        self.FAKE_SUPABASE_DIR = r"D:\Downloads\fake_supabase"
         self.SENSOR_COORDINATES = {
             'sensor_1': (0, 3),
             'sensor_2': (3, 3),
             'sensor_3': (3, 0),
             'sensor_4': (0, 0)
         }
-        self.STREAM_PROCESSING_INTERVAL_S = 1.0 
+        # Heatmap suhu: "cubic" (Clough-Tocher, sama dengan griddata semula), "linear" (barisentrik), atau "idw"
+        self.TEMPERATURE_INTERPOLATION_METHOD = "cubic"
+        # Area di luar convex hull sensor: "nan" (kosong), "nearest" (sensor terdekat), "idw", atau "mean"
+        self.TEMPERATURE_FILL_OUTSIDE_HULL = "nan"
+        self.TEMPERATURE_GRID_RESOLUTION = 100
+        self.STREAM_PROCESSING_INTERVAL_S = 1.0 # interval tetap jika MOTION_GATING_ENABLED = False
+        # --- Penjadwal adaptif berbasis gerak (model nano hanya dijalankan ulang jika ROI berubah) ---
+        self.MOTION_GATING_ENABLED = False # opt-in; False = tick tetap setiap STREAM_PROCESSING_INTERVAL_S
+        self.MOTION_MIN_INTERVAL_S = 0.5  # interval tick saat ada gerak
+        self.MOTION_MAX_INTERVAL_S = 3.0  # interval tick melambat bertahap sampai sini saat kandang tenang
+        self.MOTION_FORCE_DETECT_S = 15.0 # deteksi tetap dijalankan paling lambat setiap sekian detik
+        self.MOTION_THRESHOLD = 0.01      # fraksi piksel ROI yang berubah agar deteksi dijalankan ulang
+        self.MOTION_PIXEL_THRESHOLD = 12  # selisih grayscale minimum agar satu piksel dihitung berubah
+        self.MOTION_SCORE_WIDTH = 160     # lebar frame kecil untuk skor gerak
+        self.MOTION_CPU_BUDGET = 0.5      # fraksi waktu yang boleh dipakai inferensi per kamera ("motion" di CAMERAS untuk menimpa)
+        self.MOTION_SCENE_CHANGE_THRESHOLD = 0.25 # perubahan sebesar ini memajukan siklus pemetaan
+        self.MOTION_MAPPING_DELAY_S = 15.0 # jeda sebelum siklus yang dimajukan agar grid halus menyusul
+        self.MOTION_MAPPING_COOLDOWN_S = 60.0
+        # Jumlah slot frame per kamera (penulis + frame terbaru + peminjam analyzer/pemetaan)
+        self.FRAME_RING_SLOTS = 4
+        # "on_demand" = stream tetap di-grab, tetapi frame hanya di-decode saat diminta analyzer/pemetaan; "always" = decode semua frame
+        self.FRAME_DECODE_MODE = "on_demand"
+        self.FRAME_DECODE_MAX_WIDTH = None # mis. 1280 untuk memperkecil frame 4K saat decode (kalibrasi diskalakan otomatis)
+        self.RECONNECT_BACKOFF_BASE_S = 2.0
+        self.RECONNECT_BACKOFF_MAX_S = 60.0
+
+        # --- Pelacakan & kepadatan halus (dari deteksi model nano live) ---
+        self.TRACKING_ENABLED = False # opt-in: aktifkan setelah diverifikasi di kandang sendiri
+        self.TRACK_IOU_THRESHOLD = 0.3
+        self.TRACK_HIGH_CONF = 0.4 # deteksi di bawah ini hanya memperpanjang track yang sudah ada
+        self.TRACK_LOW_CONF = 0.1  # confidence minimum yang diminta dari model nano saat pelacakan aktif
+        self.TRACK_MAX_MISSED = 10 # jumlah frame analisis track dipertahankan tanpa deteksi (mis. tertutup ayam lain)
+        self.TRACK_MIN_HITS = 3
+        self.DENSITY_SMOOTHING_TIME_CONSTANT_S = 10.0
+        self.DENSITY_ALERT_SUSTAIN_S = 30.0 # alert hanya jika kepadatan halus melewati batas selama ini
+        # True = siklus pemetaan memakai grid halus & track (tanpa model 's') selama data live masih segar
+        self.MAPPING_USE_SMOOTHED_DENSITY = False # butuh TRACKING_ENABLED = True
+        self.SMOOTHED_DENSITY_MAX_AGE_S = 10.0
+
+        # --- Worker proses terpisah untuk model 's' (frame lewat shared memory, stream live tidak ikut tersendat) ---
+        self.DENSITY_WORKER_ENABLED = False # opt-in; False = model 's' dijalankan di proses utama seperti sebelumnya
+        self.DENSITY_WORKER_COUNT = 1
+        self.DENSITY_WORKER_THREADS = 0 # thread inferensi per worker; 0 = DETECTOR_NUM_THREADS
+        self.DENSITY_WORKER_CPU_AFFINITY = None # mis. [[2, 3]] = worker 0 hanya di core 2 & 3 (satu daftar per worker)
+        self.DENSITY_WORKER_NICE = 5 # turunkan prioritas worker agar thread live didahulukan (0 = tidak diubah)
+        self.DENSITY_WORKER_TIMEOUT_S = 60.0 # permintaan lebih lama dari ini: worker dianggap macet & dijalankan ulang
+        self.DENSITY_WORKER_LOAD_TIMEOUT_S = 300.0
+
+        # --- Kaskade nano -> small: model 's' hanya untuk region tempat model nano ragu (/api/cascade_stats) ---
+        self.CASCADE_ENABLED = False # opt-in
+        self.CASCADE_LOW_CONF = 0.15  # pita confidence "ragu": [LOW, HIGH); model nano diminta sampai LOW, box di bawah 0.4 hanya untuk kaskade
+        self.CASCADE_HIGH_CONF = 0.45
+        self.CASCADE_MIN_FLAGGED_BOXES = 3 # jumlah minimum box ragu / tumpang tindih agar eskalasi terpicu
+        self.CASCADE_NEAR_LIMIT_RATIO = 0.8 # sel dengan hitungan >= rasio ini x kapasitas sel (MAX_AYAM x luas sel) dicek ulang
+        self.CASCADE_OVERLAP_IOU = 0.5
+        self.CASCADE_REGION_PADDING_PX = 32
+        self.CASCADE_MAX_REGION_FRACTION = 0.6 # region lebih luas dari ini: seluruh frame dideteksi ulang
+        self.CASCADE_MIN_INTERVAL_S = 5.0 # jarak minimum antar eskalasi per kamera
+
+        # --- Inferensi ber-tile untuk model 's' (ayam jauh yang kecil di frame lebar) ---
+        self.TILED_INFERENCE_ENABLED = False
+        self.TILE_SIZE = 640
+        self.TILE_OVERLAP = 0.2 # fraksi tumpang tindih antar tile
+        self.TILE_NMS_IOU = 0.5
+        self.TILED_INCLUDE_FULL_FRAME = True # ikutkan juga frame penuh di batch yang sama
+
+        # --- Mode Multi Kamera ---
+        # None = mode satu kamera (memakai VIDEO_SOURCE & file kalibrasi di atas).
+        # Untuk beberapa kandang, isi list kamera bernama, contoh:
+        # self.CAMERAS = [
+        #     {"name": "kandang1", "video_source": "rtsp://10.0.0.11:8554/cam",
+        #      "homography_matrix_path": r"D:\Downloads\kandang1_homography_matrix.npy",
+        #      "selected_area_points_path": r"D:\Downloads\kandang1_selected_area_points.npy"},
+        # ]
+        self.CAMERAS = None
 
         # --- Konfigurasi Rahasia dibaca dari Environment Variables (.env) ---
         self.SUPABASE_URL = os.getenv("SUPABASE_URL")
         self.SUPABASE_KEY = os.getenv("SUPABASE_KEY")
         self.TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN") 
-        self.TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
\ No newline at end of file
+        self.TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+
+    def get_camera_configs(self):
+        """Daftar kamera yang dipakai; mode satu kamera diturunkan dari konfigurasi lama."""
+        if self.CAMERAS:
+            for camera in self.CAMERAS:
+                # "birdseye" sudah dipakai sebagai rute tetap /video_feed/birdseye
+                if camera.get("name") == "birdseye":
+                    raise ValueError("Nama kamera 'birdseye' dicadangkan untuk rute stream; pakai nama lain.")
+            return [dict(camera) for camera in self.CAMERAS]
+        return [{
+            "name": "default",
+            "video_source": self.VIDEO_SOURCE,
+            "homography_matrix_path": self.HOMOGRAPHY_MATRIX_PATH,
+            "selected_area_points_path": self.SELECTED_AREA_POINTS_PATH
+        }]
@@ -0,0 +1,129 @@
+# density.py
+"""Perhitungan kepadatan grid murni NumPy, terpisah dari rendering plot."""
+import math, threading, time
+import numpy as np
+
+def grid_shape(width_m, height_m, grid_size_x, grid_size_y):
+    """Jumlah (kolom, baris) grid yang menutupi area lantai."""
+    return math.ceil(width_m / grid_size_x), math.ceil(height_m / grid_size_y)
+
+def cell_indices(x_coords, y_coords, width_m, height_m, grid_size_x, grid_size_y):
+    """Indeks sel (gx, gy) untuk setiap titik dunia; titik tepat di tepi area masuk ke sel terakhir."""
+    num_cols, num_rows = grid_shape(width_m, height_m, grid_size_x, grid_size_y)
+    x = np.asarray(x_coords, dtype=np.float64).ravel()
+    y = np.asarray(y_coords, dtype=np.float64).ravel()
+    gx = np.clip(np.floor(x / grid_size_x).astype(np.int64), 0, num_cols - 1)
+    gy = np.clip(np.floor(y / grid_size_y).astype(np.int64), 0, num_rows - 1)
+    return gx, gy
+
+def per_area(counts, cell_area_m2):
+    """Bagi hitungan per sel dengan luasnya (skalar atau matriks (baris, kolom)); sel berluas 0 -> kepadatan 0."""
+    area = np.broadcast_to(np.asarray(cell_area_m2, dtype=np.float64), np.shape(counts))
+    return np.divide(counts, area, out=np.zeros(np.shape(counts), dtype=np.float64), where=area > 0)
+
+def compute_grid_density(x_coords, y_coords, width_m, height_m, grid_size_x, grid_size_y, max_per_m2, cell_area_m2=None):
+    """
+    Menghitung jumlah ayam per sel, kepadatan per m², dan daftar alert untuk ukuran grid apa pun.
+    Matriks berbentuk (baris, kolom) dengan indeks [gy, gx]; titik tepat di tepi area masuk ke sel terakhir.
+    cell_area_m2: luas lantai sebenarnya per sel (dari artefak kalibrasi); None = luas sel penuh untuk semua sel.
+    """
+    num_cols, num_rows = grid_shape(width_m, height_m, grid_size_x, grid_size_y)
+    gx, gy = cell_indices(x_coords, y_coords, width_m, height_m, grid_size_x, grid_size_y)
+    counts = np.bincount(gy * num_cols + gx, minlength=num_rows * num_cols).reshape(num_rows, num_cols)
+
+    density = per_area(counts, grid_size_x * grid_size_y if cell_area_m2 is None else cell_area_m2)
+
+    alert_rows, alert_cols = np.nonzero(density > max_per_m2)
+    alerts = [
+        {'grid_x': int(c), 'grid_y': int(r), 'count': int(counts[r, c]), 'density': float(density[r, c])}
+        for r, c in zip(alert_rows, alert_cols)
+    ]
+    occupied_rows, occupied_cols = np.nonzero(counts)
+    grid_data = {f"{c}_{r}": int(counts[r, c]) for r, c in zip(occupied_rows, occupied_cols)}
+
+    return {
+        'counts': counts,
+        'density': density,
+        'alerts': alerts,
+        'grid_data': grid_data,
+        'grid_size': (grid_size_x, grid_size_y),
+        'max_per_m2': max_per_m2
+    }
+
+
+class SmoothedDensityGrid:
+    """
+    Kepadatan per sel yang dihaluskan secara eksponensial terhadap waktu (bukan per frame).
+    Alert hanya muncul jika kepadatan halus melewati batas terus-menerus selama sustain_s detik.
+    """
+    def __init__(self, width_m, height_m, grid_size_x, grid_size_y, max_per_m2, time_constant_s=10.0, sustain_s=30.0):
+        self.num_cols, self.num_rows = grid_shape(width_m, height_m, grid_size_x, grid_size_y)
+        self.grid_size = (grid_size_x, grid_size_y)
+        self.grid_area = grid_size_x * grid_size_y
+        self.cell_area = self.grid_area  # skalar, atau matriks luas sebenarnya per sel lewat set_cell_area()
+        self.max_per_m2 = max_per_m2
+        self.time_constant_s = time_constant_s
+        self.sustain_s = sustain_s
+        self.smoothed_counts = np.zeros((self.num_rows, self.num_cols), dtype=np.float64)
+        self.exceed_since = np.full((self.num_rows, self.num_cols), np.nan)
+        self.updated_at = None
+        self.first_update_at = None
+        self._lock = threading.Lock()
+
+    def set_cell_area(self, cell_area_m2):
+        """Pakai luas lantai sebenarnya per sel (None = kembali ke luas sel penuh)."""
+        with self._lock:
+            self.cell_area = self.grid_area if cell_area_m2 is None else cell_area_m2
+
+    def update(self, counts, timestamp=None):
+        """Masukkan hitungan mentah satu frame; mengembalikan hasil berbentuk sama dengan compute_grid_density."""
+        now = time.time() if timestamp is None else timestamp
+        counts = np.asarray(counts, dtype=np.float64)
+        with self._lock:
+            if self.updated_at is None:
+                self.smoothed_counts = counts.copy()
+                self.first_update_at = now
+            else:
+                alpha = 1.0 - math.exp(-max(0.0, now - self.updated_at) / self.time_constant_s) if self.time_constant_s > 0 else 1.0
+                self.smoothed_counts += alpha * (counts - self.smoothed_counts)
+            self.updated_at = now
+
+            exceeding = per_area(self.smoothed_counts, self.cell_area) > self.max_per_m2
+            self.exceed_since[exceeding & np.isnan(self.exceed_since)] = now
+            self.exceed_since[~exceeding] = np.nan
+            return self._result_locked(now)
+
+    def is_fresh(self, max_age_s, min_history_s=0.0):
+        """True jika update terakhir belum lebih tua dari max_age_s dan riwayatnya minimal min_history_s (EMA sudah stabil)."""
+        with self._lock:
+            if self.updated_at is None:
+                return False
+            now = time.time()
+            return now - self.updated_at <= max_age_s and now - self.first_update_at >= min_history_s
+
+    def result(self):
+        with self._lock:
+            return self._result_locked(time.time())
+
+    def _result_locked(self, now):
+        counts = np.rint(self.smoothed_counts).astype(np.int64)
+        density = per_area(self.smoothed_counts, self.cell_area)
+        with np.errstate(invalid='ignore'):
+            sustained = now - self.exceed_since >= self.sustain_s
+        alert_rows, alert_cols = np.nonzero(sustained)
+        alerts = [
+            {'grid_x': int(c), 'grid_y': int(r), 'count': int(counts[r, c]), 'density': float(density[r, c]),
+             'sustained_s': float(now - self.exceed_since[r, c])}
+            for r, c in zip(alert_rows, alert_cols)
+        ]
+        occupied_rows, occupied_cols = np.nonzero(counts)
+        return {
+            'counts': counts,
+            'density': density,
+            'alerts': alerts,
+            'grid_data': {f"{c}_{r}": int(counts[r, c]) for r, c in zip(occupied_rows, occupied_cols)},
+            'grid_size': self.grid_size,
+            'max_per_m2': self.max_per_m2,
+            'smoothed': True,
+            'updated_at': self.updated_at
+        }
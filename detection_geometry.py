@@ -0,0 +1,49 @@
+# detection_geometry.py
+"""Operasi geometri deteksi yang divektorisasi: ROI, proyeksi homografi, dan penggambaran."""
+import cv2
+import numpy as np
+
+def build_roi_mask(roi_polygon_coords, frame_shape):
+    """Bitmask ROI (uint8, 1 = di dalam ROI) seukuran frame, termasuk garis tepinya."""
+    height, width = frame_shape[:2]
+    mask = np.zeros((height, width), dtype=np.uint8)
+    pts = np.array(roi_polygon_coords, dtype=np.int32).reshape((-1, 1, 2))
+    cv2.fillPoly(mask, [pts], 1)
+    cv2.polylines(mask, [pts], isClosed=True, color=1, thickness=1)
+    return mask
+
+def box_reference_points(xyxy):
+    """Dari box (N,4) terpotong ke int seperti sebelumnya: titik uji ROI (tengah-bawah) dan titik proyeksi (tengah)."""
+    boxes = xyxy.astype(np.int32)
+    center_x = (boxes[:, 0] + boxes[:, 2]) / 2
+    center_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    bottom_y = boxes[:, 3].astype(np.float64)
+    return boxes, np.stack([center_x, bottom_y], axis=1), np.stack([center_x, center_y], axis=1)
+
+def points_in_roi_mask(points, roi_mask):
+    """Satu kali lookup ke bitmask untuk semua titik (N,2). Titik di luar frame dianggap di luar ROI."""
+    if len(points) == 0:
+        return np.zeros(0, dtype=bool)
+    height, width = roi_mask.shape[:2]
+    xs = np.floor(points[:, 0]).astype(np.int64)
+    ys = np.floor(points[:, 1]).astype(np.int64)
+    inside_frame = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    result = np.zeros(len(points), dtype=bool)
+    result[inside_frame] = roi_mask[ys[inside_frame], xs[inside_frame]] > 0
+    return result
+
+def project_to_world(points, homography_matrix, world_width_m, world_height_m):
+    """Proyeksikan semua titik piksel (N,2) ke koordinat dunia dengan SATU panggilan perspectiveTransform."""
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    pts_world = cv2.perspectiveTransform(points.astype(np.float32).reshape(-1, 1, 2), homography_matrix).reshape(-1, 2)
+    return np.clip(pts_world[:, 0], 0, world_width_m), np.clip(pts_world[:, 1], 0, world_height_m)
+
+def draw_detections(image_to_draw, boxes, test_points, in_roi, roi_polygon_coords):
+    """Langkah opsional: gambar ROI, box, dan titik uji (hijau = dalam ROI, merah = di luar)."""
+    pts_for_polylines = np.array(roi_polygon_coords, dtype=np.int32).reshape((-1, 1, 2))
+    cv2.polylines(image_to_draw, [pts_for_polylines], isClosed=True, color=(255, 0, 0), thickness=3)
+    for (x1, y1, x2, y2), (px, py), inside in zip(boxes.tolist(), test_points.tolist(), in_roi.tolist()):
+        cv2.rectangle(image_to_draw, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.circle(image_to_draw, (int(px), int(py)), 5, (0, 255, 0) if inside else (0, 0, 255), -1)
+    return image_to_draw
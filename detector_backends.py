@@ -0,0 +1,251 @@
+# detector_backends.py
+"""
+Antarmuka detektor yang bisa diganti backend-nya (khusus CPU):
+  - "ultralytics": model .pt lewat ultralytics.YOLO (PyTorch)
+  - "onnxruntime": model .onnx hasil export (termasuk versi INT8/QDQ)
+  - "openvino":    model IR (.xml atau folder *_openvino_model, termasuk INT8)
+Untuk ONNX Runtime & OpenVINO, letterbox, normalisasi, decode output, dan NMS dikerjakan dengan NumPy,
+sehingga PyTorch/ultralytics tidak perlu di-import sama sekali.
+Semua backend mengembalikan Detections (array NumPy xyxy, conf, cls) dalam koordinat gambar masukan.
+"""
+import ast, os
+import cv2
+import numpy as np
+
+class Detections:
+    """Hasil deteksi satu gambar: xyxy (N,4) float32, conf (N,) float32, cls (N,) int64."""
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+def letterbox(image, new_shape, color=114):
+    """Resize dengan rasio tetap lalu pad ke new_shape (h, w); mengembalikan (gambar, rasio, (pad_x, pad_y))."""
+    height, width = image.shape[:2]
+    ratio = min(new_shape[0] / height, new_shape[1] / width)
+    resized_w, resized_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (new_shape[1] - resized_w) / 2, (new_shape[0] - resized_h) / 2
+    if (resized_w, resized_h) != (width, height):
+        image = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    canvas = np.full((new_shape[0], new_shape[1], 3), color, dtype=np.uint8)
+    canvas[top:top + resized_h, left:left + resized_w] = image
+    return canvas, ratio, (left, top)
+
+def to_input_tensor(images, out=None):
+    """BGR uint8 (N,H,W,3) -> RGB float32 (N,3,H,W) dalam rentang 0..1, ditulis ke `out` jika diberikan."""
+    batch = np.stack(images) if isinstance(images, (list, tuple)) else images
+    if out is None:
+        out = np.empty((batch.shape[0], 3, batch.shape[1], batch.shape[2]), dtype=np.float32)
+    np.multiply(batch[..., ::-1].transpose(0, 3, 1, 2), 1.0 / 255.0, out=out, casting='unsafe')
+    return out
+
+def nms(xyxy, scores, iou_threshold, max_det=300):
+    """NMS greedy murni NumPy; mengembalikan indeks yang dipertahankan, urut dari skor tertinggi."""
+    order = np.argsort(-scores, kind='stable')
+    x1, y1, x2, y2 = xyxy[:, 0], xyxy[:, 1], xyxy[:, 2], xyxy[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    keep = []
+    while order.size and len(keep) < max_det:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter = (np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+                 * np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None))
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+def decode_yolo_output(output, conf_threshold, iou_threshold, ratio, pad, image_shape, max_det=300):
+    """
+    Output kepala YOLOv8 satu gambar (4 + nc, anchors) -> Detections di koordinat gambar asli.
+    NMS per kelas memakai trik offset koordinat berdasarkan kelas.
+    """
+    predictions = output.T  # (anchors, 4 + nc)
+    class_scores = predictions[:, 4:]
+    cls = class_scores.argmax(axis=1)
+    conf = class_scores[np.arange(len(cls)), cls]
+    keep = conf >= conf_threshold
+    if not keep.any():
+        return Detections.empty()
+    boxes, conf, cls = predictions[keep, :4], conf[keep], cls[keep]
+    xyxy = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2, boxes[:, 0] + boxes[:, 2] / 2, boxes[:, 1] + boxes[:, 3] / 2])
+    offsets = cls[:, None].astype(np.float32) * 7680.0
+    kept = nms(xyxy + offsets, conf, iou_threshold, max_det)
+    xyxy, conf, cls = xyxy[kept], conf[kept], cls[kept]
+    # Kembalikan dari ruang letterbox ke piksel gambar asli
+    xyxy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+    xyxy /= ratio
+    height, width = image_shape[:2]
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+    return Detections(xyxy.astype(np.float32), conf.astype(np.float32), cls.astype(np.int64))
+
+
+class _NumpyDetector:
+    """Dasar backend tanpa PyTorch: batching, letterbox, dan decode output dikerjakan di sini."""
+    backend_name = None
+
+    def __init__(self, model_path, imgsz=640, iou_threshold=0.7, names=None):
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.iou_threshold = iou_threshold
+        self.names = names or {0: "object"}
+        self.fixed_size = False   # True = model diekspor dengan ukuran input tetap
+        self.fixed_batch = None   # None = batch dinamis
+
+    def _infer(self, batch):
+        raise NotImplementedError
+
+    def predict(self, images, conf=0.25, imgsz=None):
+        """Deteksi untuk list gambar BGR; imgsz diabaikan jika model diekspor dengan ukuran tetap."""
+        size = self.imgsz if self.fixed_size or imgsz is None else imgsz
+        letterboxed, metas = [], []
+        for image in images:
+            padded, ratio, pad = letterbox(image, (size, size))
+            letterboxed.append(padded)
+            metas.append((ratio, pad, image.shape))
+        results = []
+        step = self.fixed_batch or len(letterboxed) or 1
+        for start in range(0, len(letterboxed), step):
+            chunk = letterboxed[start:start + step]
+            outputs = self._infer(to_input_tensor(chunk))
+            for output, (ratio, pad, shape) in zip(outputs, metas[start:start + step]):
+                results.append(decode_yolo_output(output, conf, self.iou_threshold, ratio, pad, shape))
+        return results
+
+    def __call__(self, images, conf=0.25, imgsz=None, **kwargs):
+        return self.predict(images, conf=conf, imgsz=imgsz)
+
+
+class OnnxRuntimeDetector(_NumpyDetector):
+    backend_name = "onnxruntime"
+
+    def __init__(self, model_path, num_threads=0, imgsz=640, names=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            names = ast.literal_eval(metadata["names"])
+        batch_dim, _, height_dim, _ = model_input.shape
+        super().__init__(model_path, imgsz=height_dim if isinstance(height_dim, int) else imgsz, names=names)
+        self.fixed_size = isinstance(height_dim, int)
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+
+    def _infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoDetector(_NumpyDetector):
+    backend_name = "openvino"
+
+    def __init__(self, model_path, num_threads=0, imgsz=640, names=None):
+        import openvino as ov
+        xml_path = model_path
+        if os.path.isdir(model_path):
+            xml_path = next(os.path.join(model_path, f) for f in sorted(os.listdir(model_path)) if f.endswith(".xml"))
+        core = ov.Core()
+        model = core.read_model(xml_path)
+        input_shape = model.inputs[0].get_partial_shape()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if num_threads:
+            config["INFERENCE_NUM_THREADS"] = num_threads
+        self.compiled = core.compile_model(model, "CPU", config)
+        names = _read_openvino_names(os.path.dirname(xml_path)) or names
+        fixed_size = input_shape[2].is_static
+        super().__init__(model_path, imgsz=input_shape[2].get_length() if fixed_size else imgsz, names=names)
+        self.fixed_size = fixed_size
+        self.fixed_batch = input_shape[0].get_length() if input_shape[0].is_static else None
+
+    def _infer(self, batch):
+        return self.compiled(batch)[0]
+
+
+def _read_openvino_names(model_dir):
+    """Nama kelas dari metadata.yaml yang ditulis ultralytics saat export OpenVINO (tanpa dependensi yaml)."""
+    path = os.path.join(model_dir, "metadata.yaml")
+    if not os.path.exists(path):
+        return None
+    names, in_names = {}, False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("names:"):
+                in_names = True
+                continue
+            if in_names:
+                if not line.startswith(" "):
+                    break
+                key, _, value = line.strip().partition(":")
+                names[int(key)] = value.strip().strip("'\"")
+    return names or None
+
+
+class UltralyticsDetector:
+    """Backend lama (PyTorch lewat ultralytics.YOLO), dibungkus agar mengembalikan Detections."""
+    backend_name = "ultralytics"
+
+    def __init__(self, model_path, num_threads=0):
+        from ultralytics import YOLO
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+
+    def predict(self, images, conf=0.25, imgsz=None):
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        results = self.model(images, conf=conf, verbose=False, device='cpu', **kwargs)
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or not len(boxes):
+                detections.append(Detections.empty())
+                continue
+            detections.append(Detections(boxes.xyxy.cpu().numpy().astype(np.float32), boxes.conf.cpu().numpy().astype(np.float32), boxes.cls.cpu().numpy().astype(np.int64)))
+        return detections
+
+    def __call__(self, images, conf=0.25, imgsz=None, **kwargs):
+        return self.predict(images, conf=conf, imgsz=imgsz)
+
+
+BACKENDS = {
+    "ultralytics": UltralyticsDetector,
+    "onnxruntime": OnnxRuntimeDetector,
+    "openvino": OpenVinoDetector
+}
+
+def resolve_backend(model_path, backend="auto"):
+    """Backend 'auto' ditentukan dari file model: .onnx -> onnxruntime, .xml/folder OpenVINO -> openvino, lainnya -> ultralytics."""
+    if backend != "auto":
+        return backend
+    lower = model_path.lower().rstrip("\\/")
+    if lower.endswith(".onnx"):
+        return "onnxruntime"
+    if lower.endswith(".xml") or lower.endswith("_openvino_model") or os.path.isdir(model_path):
+        return "openvino"
+    return "ultralytics"
+
+def load_detector(model_path, backend="auto", num_threads=0, names=None):
+    """Buat detektor untuk model_path; `names` dipakai jika file model tidak membawa nama kelas."""
+    backend = resolve_backend(model_path, backend)
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend detektor tidak dikenal: {backend} (pilihan: {', '.join(BACKENDS)})")
+    if backend == "ultralytics":
+        return UltralyticsDetector(model_path, num_threads=num_threads)
+    return BACKENDS[backend](model_path, num_threads=num_threads, names=names)
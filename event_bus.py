@@ -0,0 +1,79 @@
+# event_bus.py
+import json, threading, time
+from collections import deque
+
+class EventBus:
+    """Pub/sub in-process untuk push ke dashboard (SSE), dengan ring buffer untuk replay Last-Event-ID."""
+    def __init__(self, ring_size=100):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=ring_size)  # (id, event_type, data_json)
+        # ID berbasis waktu boot agar tetap naik setelah restart; ID klien yang lebih lama dari buffer -> snapshot penuh
+        self._next_id = int(time.time() * 1000)
+        self.latest = {}  # event_type -> data terakhir, untuk snapshot
+        self.subscribers = 0
+        self._subscribers_by_transport = {}  # "wsgi" / "async" -> jumlah; batas berlaku per transport
+        self.published_total = 0
+        self.rejected_total = 0
+
+    def publish(self, event_type, data):
+        data_json = json.dumps(data, default=str)
+        with self._condition:
+            event_id = self._next_id
+            self._next_id += 1
+            self._events.append((event_id, event_type, data_json))
+            self.latest[event_type] = data
+            self.published_total += 1
+            self._condition.notify_all()
+        return event_id
+
+    def publish_if_changed(self, event_type, data):
+        with self._condition:
+            if self.latest.get(event_type) == data:
+                return None
+        return self.publish(event_type, data)
+
+    @property
+    def latest_id(self):
+        with self._condition:
+            return self._next_id - 1
+
+    def _events_after_locked(self, last_id):
+        """List event setelah last_id, atau None jika last_id sudah keluar dari ring buffer (ada celah)."""
+        if last_id > self._next_id - 1:
+            return None
+        if self._events and last_id < self._events[0][0] - 1:
+            return None
+        if not self._events and last_id < self._next_id - 1:
+            return None
+        return [event for event in self._events if event[0] > last_id]
+
+    def wait_for_events(self, last_id, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self._next_id - 1 > last_id, timeout=timeout)
+            return self._events_after_locked(last_id)
+
+    def add_subscriber(self, max_subscribers=0, transport="wsgi"):
+        """Tambah satu pelanggan secara atomik; False (dan dihitung ditolak) jika max_subscribers transport itu sudah tercapai."""
+        with self._condition:
+            count = self._subscribers_by_transport.get(transport, 0)
+            if max_subscribers and count >= max_subscribers:
+                self.rejected_total += 1
+                return False
+            self._subscribers_by_transport[transport] = count + 1
+            self.subscribers += 1
+            return True
+
+    def remove_subscriber(self, transport="wsgi"):
+        with self._condition:
+            count = self._subscribers_by_transport.get(transport, 0)
+            if count > 0:
+                self._subscribers_by_transport[transport] = count - 1
+                self.subscribers -= 1
+
+    def subscribers_by_transport(self):
+        with self._condition:
+            return dict(self._subscribers_by_transport)
+
+    @staticmethod
+    def format_sse(event_id, event_type, data_json):
+        return f"id: {event_id}\nevent: {event_type}\ndata: {data_json}\n\n"
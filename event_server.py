@@ -0,0 +1,184 @@
+# event_server.py
+"""
+Server SSE /api/events berbasis asyncio di port terpisah (EVENTS_ASYNC_PORT).
+Semua koneksi dilayani satu thread event loop, jadi ratusan dashboard yang idle hanya memakai
+socket + buffer kecil, bukan satu thread WSGI per koneksi. Satu thread jembatan menunggu EventBus
+lalu membangunkan semua klien sekaligus; snapshot (yang bisa memanggil Supabase) dijalankan di executor.
+"""
+import asyncio, json, threading
+from urllib.parse import parse_qs, urlsplit
+
+_STATUS_TEXT = {400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+
+
+class AsyncEventServer:
+    def __init__(self, event_bus, snapshot_fn, host, port, heartbeat_s=15.0, max_subscribers=1000, on_subscribe=None,
+                 allow_origin="*", request_timeout_s=10.0):
+        self.event_bus = event_bus
+        self.snapshot_fn = snapshot_fn  # () -> dict, sama dengan snapshot /api/events WSGI
+        self.host = host
+        self.port = port  # 0 = port bebas; diisi port sebenarnya setelah start()
+        self.heartbeat_s = heartbeat_s
+        self.max_subscribers = max_subscribers
+        self.on_subscribe = on_subscribe
+        self.allow_origin = allow_origin
+        self.request_timeout_s = request_timeout_s
+        self._loop = None
+        self._changed = None  # future yang diselesaikan (lalu diganti) setiap ada event baru
+        self._stop_event = None
+        self._client_tasks = set()
+        self._ready = threading.Event()
+        self._start_error = None
+        self._stopping = False
+        self._thread = None
+
+    def start(self, timeout=5.0):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Server event async tidak siap tepat waktu.")
+        if self._start_error is not None:
+            raise self._start_error
+        threading.Thread(target=self._bridge_loop, daemon=True).start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stopping = True
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except Exception as e:
+            self._start_error = e
+            self._ready.set()
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        self._changed = self._loop.create_future()
+        self._stop_event = asyncio.Event()
+        server = await asyncio.start_server(self._handle_client, self.host, self.port, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        await self._stop_event.wait()
+        server.close()
+        for task in list(self._client_tasks):
+            task.cancel()
+        await asyncio.gather(*self._client_tasks, return_exceptions=True)
+        await server.wait_closed()
+
+    def _bridge_loop(self):
+        # Satu-satunya thread yang memblok di EventBus; klien async cukup menunggu future _changed
+        last_id = self.event_bus.latest_id
+        while not self._stopping:
+            self.event_bus.wait_for_events(last_id, timeout=1.0)
+            latest_id = self.event_bus.latest_id
+            if latest_id != last_id:
+                last_id = latest_id
+                try:
+                    self._loop.call_soon_threadsafe(self._notify_changed)
+                except RuntimeError:
+                    return  # loop sudah ditutup
+
+    def _notify_changed(self):
+        changed, self._changed = self._changed, self._loop.create_future()
+        changed.set_result(None)
+
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._client_tasks.add(task)
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.request_timeout_s)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                return
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, _ = lines[0].split(" ", 2)
+            except ValueError:
+                await self._write_plain(writer, 400, "Request tidak valid.")
+                return
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(":")
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            if method != "GET" or url.path != "/api/events":
+                await self._write_plain(writer, 404, "Tidak ditemukan.")
+                return
+
+            last_event_id = headers.get("last-event-id") or parse_qs(url.query).get("last_event_id", [None])[0]
+            try:
+                last_id = int(last_event_id) if last_event_id else None
+            except ValueError:
+                last_id = None
+            if not self.event_bus.add_subscriber(self.max_subscribers, transport="async"):
+                await self._write_plain(writer, 503, "Jumlah koneksi event sudah maksimal.")
+                return
+            try:
+                if self.on_subscribe is not None:
+                    self.on_subscribe()
+                await self._stream(reader, writer, last_id)
+            finally:
+                self.event_bus.remove_subscriber(transport="async")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"[SSE async] Error koneksi event: {e}")
+        finally:
+            self._client_tasks.discard(task)
+            writer.close()
+
+    async def _stream(self, reader, writer, last_id):
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream; charset=utf-8\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n"
+            "X-Accel-Buffering: no\r\n"
+            f"Access-Control-Allow-Origin: {self.allow_origin}\r\n\r\n"
+        ).encode())
+        # Klien baru atau yang tertinggal terlalu jauh mendapat snapshot penuh, sisanya hanya delta
+        if last_id is None or last_id > self.event_bus.latest_id:
+            last_id = await self._write_snapshot(writer)
+        writer.write(b"retry: 5000\n\n")
+        await writer.drain()
+        while not reader.at_eof() and not writer.is_closing():
+            changed = self._changed  # ambil sebelum membaca event agar publish di antaranya tidak terlewat
+            events = self.event_bus.wait_for_events(last_id, timeout=0)
+            if events is None:
+                last_id = await self._write_snapshot(writer)
+            elif events:
+                for event_id, event_type, data_json in events:
+                    writer.write(self.event_bus.format_sse(event_id, event_type, data_json).encode())
+                    last_id = event_id
+            else:
+                try:
+                    await asyncio.wait_for(asyncio.shield(changed), self.heartbeat_s)
+                    continue
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")  # heartbeat agar proxy tidak menutup koneksi idle
+            await writer.drain()
+
+    async def _write_snapshot(self, writer):
+        last_id = self.event_bus.latest_id
+        data_json = await self._loop.run_in_executor(None, lambda: json.dumps(self.snapshot_fn(), default=str))
+        writer.write(self.event_bus.format_sse(last_id, "snapshot", data_json).encode())
+        return last_id
+
+    async def _write_plain(self, writer, status, text):
+        body = text.encode()
+        writer.write((
+            f"HTTP/1.1 {status} {_STATUS_TEXT[status]}\r\n"
+            "Content-Type: text/plain; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n"
+            f"Access-Control-Allow-Origin: {self.allow_origin}\r\n\r\n"
+        ).encode() + body)
+        await writer.drain()
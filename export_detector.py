@@ -0,0 +1,82 @@
+# export_detector.py
+"""
+Export model YOLO (.pt) ke ONNX atau OpenVINO IR untuk backend CPU di detector_backends, opsional INT8.
+
+Contoh:
+  python export_detector.py D:\\Downloads\\besti.pt --format onnx
+  python export_detector.py D:\\Downloads\\besti.pt --format onnx --int8 --calib-video "D:\\Downloads\\Ayam Panjang.mp4"
+  python export_detector.py D:\\Downloads\\v8n.pt --format openvino --int8 --data dataset_ayam.yaml
+
+Lalu arahkan YOLO_MODEL_PATH_* di config.py ke file .onnx / folder *_openvino_model (DETECTOR_BACKEND = "auto").
+Export butuh ultralytics (PyTorch) hanya di mesin yang melakukan export, bukan di mesin produksi.
+"""
+import argparse, os
+import cv2
+from detector_backends import letterbox, to_input_tensor
+
+def read_calibration_frames(video_path, num_frames, imgsz):
+    """Ambil frame tersebar merata dari video, sudah di-letterbox untuk kalibrasi kuantisasi."""
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or num_frames
+    step = max(1, total // num_frames)
+    frames = []
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(to_input_tensor([letterbox(frame, (imgsz, imgsz))[0]]))
+        if len(frames) >= num_frames:
+            break
+    cap.release()
+    return frames
+
+def quantize_onnx_int8(onnx_path, calib_video, num_frames, imgsz):
+    """Kuantisasi statis QDQ INT8 dengan ONNX Runtime, dikalibrasi dari frame kandang asli."""
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    import onnxruntime as ort
+
+    input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    batches = read_calibration_frames(calib_video, num_frames, imgsz)
+    if not batches:
+        raise RuntimeError(f"Tidak ada frame kalibrasi yang terbaca dari {calib_video}")
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._iter = iter(batches)
+
+        def get_next(self):
+            batch = next(self._iter, None)
+            return None if batch is None else {input_name: batch}
+
+    int8_path = onnx_path.replace(".onnx", "_int8.onnx")
+    quantize_static(onnx_path, int8_path, FrameReader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    return int8_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", help="path model .pt")
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--dynamic", action="store_true", help="ukuran input & batch dinamis (perlu untuk inferensi ber-tile dengan TILE_SIZE lain)")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--calib-video", default=None, help="video untuk kalibrasi INT8 ONNX")
+    parser.add_argument("--calib-frames", type=int, default=100)
+    parser.add_argument("--data", default=None, help="dataset yaml untuk kalibrasi INT8 OpenVINO (lewat ultralytics)")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    model = YOLO(args.model)
+    if args.format == "onnx":
+        exported = model.export(format="onnx", imgsz=args.imgsz, dynamic=args.dynamic, simplify=True)
+        print(f"ONNX FP32: {exported}")
+        if args.int8:
+            if not args.calib_video:
+                parser.error("--int8 untuk ONNX membutuhkan --calib-video")
+            print(f"ONNX INT8: {quantize_onnx_int8(exported, args.calib_video, args.calib_frames, args.imgsz)}")
+    else:
+        kwargs = {"int8": True, "data": args.data} if args.int8 else {}
+        exported = model.export(format="openvino", imgsz=args.imgsz, dynamic=args.dynamic, **kwargs)
+        print(f"OpenVINO{' INT8' if args.int8 else ''}: {exported}")
+    print(f"Ukuran: {sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(exported) for f in files) if os.path.isdir(exported) else os.path.getsize(exported)} byte")
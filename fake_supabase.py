@@ -0,0 +1,84 @@
+# fake_supabase.py
+"""Pengganti SupabaseHandler untuk uji offline: storage & tabel disimpan di folder lokal."""
+import json, os, random, threading, time
+
+class FakeSupabaseHandler:
+    """Meniru API SupabaseHandler yang dipakai aplikasi, dengan latensi & tingkat kegagalan yang bisa diatur."""
+    def __init__(self, base_dir, latency_s=0.0, failure_rate=0.0):
+        self.base_dir = base_dir
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self.client = None
+        self.rows = []
+        self.upload_stats = {"uploads": 0, "failures": 0, "bytes": 0, "total_latency_s": 0.0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(base_dir, "storage"), exist_ok=True)
+        self._table_path = os.path.join(base_dir, "density_mappings.jsonl")
+        if os.path.exists(self._table_path):
+            with open(self._table_path) as f:
+                self.rows = [json.loads(line) for line in f if line.strip()]
+        print(f"Memakai Supabase palsu (offline) di {base_dir}.")
+
+    def _simulate_network(self):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("Kegagalan jaringan simulasi")
+
+    def upload_bytes(self, bucket_name, data, storage_file_name, content_type="application/octet-stream"):
+        num_bytes = memoryview(data).nbytes if data is not None else 0
+        result = {"url": None, "bytes": num_bytes, "latency_s": 0.0}
+        start_time = time.perf_counter()
+        try:
+            self._simulate_network()
+            bucket_dir = os.path.join(self.base_dir, "storage", bucket_name)
+            os.makedirs(bucket_dir, exist_ok=True)
+            file_path = os.path.join(bucket_dir, storage_file_name)
+            with open(file_path, 'wb') as f:
+                f.write(data)
+            result["url"] = f"file://{os.path.abspath(file_path)}"
+        except Exception as e:
+            print(f"  [Fake] Error saat mengunggah '{storage_file_name}': {e}")
+        result["latency_s"] = time.perf_counter() - start_time
+        with self._lock:
+            key = "uploads" if result["url"] else "failures"
+            self.upload_stats[key] += 1
+            self.upload_stats["bytes"] += num_bytes if result["url"] else 0
+            self.upload_stats["total_latency_s"] += result["latency_s"]
+        return result
+
+    def upload_file(self, bucket_name, local_file_path, storage_file_name):
+        if not local_file_path or not os.path.exists(local_file_path):
+            return None
+        with open(local_file_path, 'rb') as f:
+            return self.upload_bytes(bucket_name, f.read(), storage_file_name)["url"]
+
+    def insert_mapping_rows(self, rows):
+        try:
+            self._simulate_network()
+        except Exception as e:
+            print(f"  [Fake] Error saat menyimpan batch: {e}")
+            return False
+        with self._lock:
+            with open(self._table_path, 'a') as f:
+                for row in rows:
+                    row = dict(row, id=len(self.rows) + 1)
+                    self.rows.append(row)
+                    f.write(json.dumps(row) + "\n")
+        return True
+
+    def insert_mapping_data(self, data_to_insert):
+        return self.insert_mapping_rows([data_to_insert])
+
+    def get_latest_mapping(self):
+        with self._lock:
+            if not self.rows:
+                return None
+            latest = self.rows[-1]
+            return {"density_plot_url": latest.get("density_plot_url"), "heatmap_plot_url": latest.get("heatmap_plot_url")}
+
+    def get_latest_temperature_data(self):
+        return [
+            {"sensor_id": f"sensor_{i}", "temperature_celsius": round(29.0 + i * 0.5 + random.uniform(-0.3, 0.3), 2), "location_description": f"Sensor {i}"}
+            for i in range(1, 5)
+        ]
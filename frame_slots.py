@@ -0,0 +1,152 @@
+# frame_slots.py
+"""
+Ring buffer frame yang dialokasikan sekali untuk serah-terima antar thread tanpa salinan.
+Pembaca video men-decode langsung ke slot kosong, konsumen meminjam view read-only
+(dengan reference count), dan hanya yang perlu menggambar membuat salinan writable.
+"""
+import threading, time
+from contextlib import contextmanager
+
+class FrameSlotRing:
+    """N slot frame dengan nomor urut (seq) dan reference count per slot."""
+    def __init__(self, num_slots=4):
+        if num_slots < 2:
+            raise ValueError("FrameSlotRing butuh minimal 2 slot")
+        self.num_slots = num_slots
+        self._buffers = [None] * num_slots
+        self._seqs = [0] * num_slots
+        self._refcounts = [0] * num_slots
+        self._writing = [False] * num_slots
+        self._latest_slot = None
+        self.latest_seq = 0
+        self.latest_written_at = None  # time.monotonic() saat frame terbaru diterbitkan
+        self._condition = threading.Condition()
+
+        # Statistik untuk mengukur salinan yang dihindari
+        self.writes = 0
+        self.writes_in_place = 0   # decode langsung ke buffer slot (tanpa alokasi/salinan)
+        self.writes_dropped = 0    # semua slot sedang dipinjam, frame dilewati
+        self.borrows = 0
+        self.copies = 0
+        self.bytes_copied = 0
+        self.bytes_borrowed = 0
+
+    # --- Sisi penulis (thread pembaca video) ---
+    def begin_write(self):
+        """Ambil indeks slot bebas (tidak dipinjam & bukan frame terbaru), atau None jika semua sibuk."""
+        with self._condition:
+            for offset in range(1, self.num_slots + 1):
+                idx = ((self._latest_slot if self._latest_slot is not None else -1) + offset) % self.num_slots
+                if idx != self._latest_slot and self._refcounts[idx] == 0 and not self._writing[idx]:
+                    self._writing[idx] = True
+                    return idx
+            self.writes_dropped += 1
+            return None
+
+    def slot_buffer(self, idx):
+        """Buffer slot untuk di-decode langsung (cap.read(buffer)); None sebelum frame pertama."""
+        return self._buffers[idx]
+
+    def commit_write(self, idx, frame):
+        """Terbitkan frame di slot idx. Jika decoder mengalokasikan array baru (mis. resolusi berubah), array itu dipakai."""
+        with self._condition:
+            if frame is self._buffers[idx]:
+                self.writes_in_place += 1
+            self._buffers[idx] = frame
+            self._writing[idx] = False
+            self.latest_seq += 1
+            self._seqs[idx] = self.latest_seq
+            self._latest_slot = idx
+            self.latest_written_at = time.monotonic()
+            self.writes += 1
+            self._condition.notify_all()
+            return self.latest_seq
+
+    def abort_write(self, idx):
+        with self._condition:
+            self._writing[idx] = False
+
+    def write_copy(self, frame):
+        """Jalur sederhana untuk sumber yang tidak bisa decode ke buffer: salin frame ke slot bebas."""
+        idx = self.begin_write()
+        if idx is None:
+            return None
+        buffer = self._buffers[idx]
+        if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+            buffer = frame.copy()
+        else:
+            buffer[...] = frame
+        with self._condition:
+            self.copies += 1
+            self.bytes_copied += frame.nbytes
+        return self.commit_write(idx, buffer)
+
+    # --- Sisi konsumen ---
+    def wait_for_newer(self, seq, timeout=None):
+        """Blok sampai ada frame dengan seq > seq; mengembalikan seq terbaru (bisa tetap <= seq jika timeout)."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.latest_seq > seq, timeout=timeout)
+            return self.latest_seq
+
+    def _acquire(self, newer_than, timeout):
+        with self._condition:
+            if newer_than is not None:
+                self._condition.wait_for(lambda: self.latest_seq > newer_than, timeout=timeout)
+            idx = self._latest_slot
+            if idx is None or (newer_than is not None and self.latest_seq <= newer_than):
+                return None, self.latest_seq, None
+            self._refcounts[idx] += 1
+            return idx, self._seqs[idx], self._buffers[idx]
+
+    def _release(self, idx):
+        with self._condition:
+            self._refcounts[idx] -= 1
+
+    @contextmanager
+    def borrow(self, newer_than=None, timeout=None):
+        """
+        Pinjam frame terbaru sebagai view read-only: `with ring.borrow() as (seq, frame): ...`.
+        frame bernilai None jika belum ada frame (atau tidak ada yang lebih baru dari newer_than sebelum timeout).
+        Slot tidak akan ditimpa penulis selama masih dipinjam.
+        """
+        idx, seq, buffer = self._acquire(newer_than, timeout)
+        if idx is None:
+            yield seq, None
+            return
+        with self._condition:
+            self.borrows += 1
+            self.bytes_borrowed += buffer.nbytes
+        try:
+            view = buffer.view()
+            view.flags.writeable = False
+            yield seq, view
+        finally:
+            self._release(idx)
+
+    def copy_latest(self, newer_than=None, timeout=None):
+        """Salinan writable dari frame terbaru (untuk annotator yang menggambar di atas frame)."""
+        idx, seq, buffer = self._acquire(newer_than, timeout)
+        if idx is None:
+            return seq, None
+        try:
+            frame = buffer.copy()
+        finally:
+            self._release(idx)
+        with self._condition:
+            self.copies += 1
+            self.bytes_copied += frame.nbytes
+        return seq, frame
+
+    def stats(self):
+        with self._condition:
+            return {
+                "latest_seq": self.latest_seq,
+                "writes": self.writes,
+                "writes_in_place": self.writes_in_place,
+                "writes_dropped": self.writes_dropped,
+                "borrows": self.borrows,
+                "copies": self.copies,
+                "bytes_copied": self.bytes_copied,
+                "bytes_borrowed": self.bytes_borrowed,
+                "slots_in_use": sum(1 for count in self._refcounts if count > 0)
+            }
@@ -0,0 +1,185 @@
+# history_store.py
+"""
+Riwayat lokal kepadatan & suhu per siklus pemetaan (SQLite, mode WAL), terpisah dari Supabase.
+Selain sampel mentah, setiap insert memperbarui rollup 5 menit & 1 jam (jumlah sampel, min, sum, max,
+dan jumlah grid) sehingga query rentang panjang hanya membaca beberapa ratus baris rollup.
+"""
+import math, os, sqlite3, threading
+import numpy as np
+
+ROLLUP_LEVELS_S = (300, 3600)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS density_samples (
+    ts REAL NOT NULL,
+    camera TEXT NOT NULL,
+    roi_count INTEGER NOT NULL,
+    grid_rows INTEGER NOT NULL,
+    grid_cols INTEGER NOT NULL,
+    grid_counts BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS temperature_samples (
+    ts REAL NOT NULL,
+    sensor_id TEXT NOT NULL,
+    celsius REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    level INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    series TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    min REAL NOT NULL,
+    sum REAL NOT NULL,
+    max REAL NOT NULL,
+    grid_rows INTEGER,
+    grid_cols INTEGER,
+    grid_sum BLOB,
+    PRIMARY KEY (level, kind, series, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_density_ts ON density_samples(ts);
+CREATE INDEX IF NOT EXISTS idx_temperature_ts ON temperature_samples(ts);
+"""
+
+_RAW_QUERIES = {
+    "density": "SELECT camera, {b} AS b, COUNT(*), MIN(roi_count), SUM(roi_count), MAX(roi_count) FROM density_samples "
+               "WHERE ts >= ? AND ts < ? GROUP BY camera, b ORDER BY camera, b",
+    "temperature": "SELECT sensor_id, {b} AS b, COUNT(*), MIN(celsius), SUM(celsius), MAX(celsius) FROM temperature_samples "
+                   "WHERE ts >= ? AND ts < ? GROUP BY sensor_id, b ORDER BY sensor_id, b"
+}
+_RAW_GRID_QUERY = "SELECT camera, {b} AS b, grid_rows, grid_cols, grid_counts, 1 FROM density_samples WHERE ts >= ? AND ts < ?"
+
+class HistoryStore:
+    """Append-only per siklus; grid hitungan disimpan sebagai blob float32 (baris x kolom)."""
+    def __init__(self, db_path, retention_days=90, max_points=500):
+        self.retention_s = retention_days * 86400 if retention_days else None
+        self.max_points = max_points
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._last_prune_at = 0.0
+
+    def record_cycle(self, timestamp, density_summary, sensor_data=None):
+        """
+        density_summary: {kamera: {'chickens_in_roi_count', 'grid_counts' (list baris x kolom), ...}} dari siklus pemetaan.
+        sensor_data: list {'sensor_id', 'temperature_celsius'} seperti get_latest_temperature_data().
+        """
+        ts = timestamp if isinstance(timestamp, (int, float)) else timestamp.timestamp()
+        density_rows = []
+        for camera_name, summary in density_summary.items():
+            counts = np.atleast_2d(np.asarray(summary['grid_counts'], dtype=np.float32))
+            density_rows.append((camera_name, int(summary['chickens_in_roi_count']), counts))
+        temperature_rows = [(str(data['sensor_id']), float(data['temperature_celsius']))
+                            for data in sensor_data or [] if data.get('temperature_celsius') is not None]
+
+        with self._db_lock, self._db:
+            self._db.executemany("INSERT INTO density_samples VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(ts, name, count, grid.shape[0], grid.shape[1], grid.tobytes()) for name, count, grid in density_rows])
+            self._db.executemany("INSERT INTO temperature_samples VALUES (?, ?, ?)", [(ts, sensor_id, celsius) for sensor_id, celsius in temperature_rows])
+            for level in ROLLUP_LEVELS_S:
+                bucket = math.floor(ts / level) * level
+                for name, count, grid in density_rows:
+                    self._add_to_rollup_locked(level, "density", name, bucket, count, grid)
+                for sensor_id, celsius in temperature_rows:
+                    self._add_to_rollup_locked(level, "temperature", sensor_id, bucket, celsius)
+            if self.retention_s and ts - self._last_prune_at > 3600:
+                cutoff = ts - self.retention_s
+                self._db.execute("DELETE FROM density_samples WHERE ts < ?", (cutoff,))
+                self._db.execute("DELETE FROM temperature_samples WHERE ts < ?", (cutoff,))
+                self._db.execute("DELETE FROM rollups WHERE bucket < ?", (cutoff,))
+                self._last_prune_at = ts
+
+    def _add_to_rollup_locked(self, level, kind, series, bucket, value, grid=None):
+        row = self._db.execute("SELECT samples, min, sum, max, grid_rows, grid_cols, grid_sum FROM rollups WHERE level=? AND kind=? AND series=? AND bucket=?",
+                               (level, kind, series, bucket)).fetchone()
+        if row is None:
+            grid_columns = (grid.shape[0], grid.shape[1], grid.astype(np.float64).tobytes()) if grid is not None else (None, None, None)
+            self._db.execute("INSERT INTO rollups VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?)",
+                             (level, kind, series, bucket, value, value, value, *grid_columns))
+            return
+        samples, minimum, total, maximum, rows, cols, grid_sum = row
+        if grid is not None and grid_sum is not None and (rows, cols) == grid.shape:
+            grid_sum = (np.frombuffer(grid_sum, dtype=np.float64).reshape(rows, cols) + grid).tobytes()
+        self._db.execute("UPDATE rollups SET samples=?, min=?, sum=?, max=?, grid_sum=? WHERE level=? AND kind=? AND series=? AND bucket=?",
+                         (samples + 1, min(minimum, value), total + value, max(maximum, value), grid_sum, level, kind, series, bucket))
+
+    def resolution_for(self, from_ts, to_ts, resolution_s=None):
+        """
+        Lebar bucket (detik): sesuai permintaan, tetapi tidak lebih dari max_points bucket per seri,
+        dibulatkan ke atas ke kelipatan level rollup terbesar yang muat agar query cukup membaca rollup.
+        """
+        resolution_s = max(math.ceil(resolution_s or 0), math.ceil(max(to_ts - from_ts, 1.0) / self.max_points), 1)
+        levels = [level for level in ROLLUP_LEVELS_S if level <= resolution_s]
+        return math.ceil(resolution_s / levels[-1]) * levels[-1] if levels else resolution_s
+
+    def query(self, from_ts, to_ts, resolution_s=None, include_grid=False):
+        """
+        Seri kolumnar per kamera & per sensor, satu titik per bucket yang berisi sampel. Bucket selaras epoch
+        (t = awal bucket, epoch detik), jadi bucket pertama bisa berisi sampel sedikit sebelum from_ts.
+        include_grid menambahkan rata-rata grid hitungan per bucket.
+        """
+        resolution_s = self.resolution_for(from_ts, to_ts, resolution_s)
+        level = max((level for level in ROLLUP_LEVELS_S if resolution_s % level == 0), default=None)
+        start = math.floor(from_ts / resolution_s) * resolution_s
+        with self._db_lock:
+            if level is None:
+                b = f"CAST(ts / {resolution_s} AS INTEGER)"
+                rows = {kind: self._db.execute(sql.format(b=b), (start, to_ts)).fetchall() for kind, sql in _RAW_QUERIES.items()}
+                grid_rows = self._db.execute(_RAW_GRID_QUERY.format(b=b), (start, to_ts)).fetchall() if include_grid else []
+            else:
+                b = f"CAST(bucket / {resolution_s} AS INTEGER)"
+                rows = {kind: self._db.execute(
+                    f"SELECT series, {b} AS b, SUM(samples), MIN(min), SUM(sum), MAX(max) FROM rollups "
+                    "WHERE level=? AND kind=? AND bucket >= ? AND bucket < ? GROUP BY series, b ORDER BY series, b",
+                    (level, kind, start, to_ts)).fetchall() for kind in _RAW_QUERIES}
+                grid_rows = self._db.execute(
+                    f"SELECT series, {b} AS b, grid_rows, grid_cols, grid_sum, samples FROM rollups "
+                    "WHERE level=? AND kind='density' AND grid_sum IS NOT NULL AND bucket >= ? AND bucket < ?",
+                    (level, start, to_ts)).fetchall() if include_grid else []
+
+        density = self._columnar(rows["density"], resolution_s, "roi_count")
+        if include_grid:
+            sums = {}
+            for camera, bucket, grid_r, grid_c, blob, samples in grid_rows:
+                grid = np.frombuffer(blob, dtype=np.float64 if level else np.float32).reshape(grid_r, grid_c)
+                entry = sums.setdefault((camera, bucket), [np.zeros(grid.shape), 0])
+                if entry[0].shape == grid.shape:
+                    entry[0] += grid
+                    entry[1] += samples
+            for camera, series in density.items():
+                series["grid_mean"] = [np.round(sums[(camera, bucket)][0] / max(sums[(camera, bucket)][1], 1), 3).tolist()
+                                       if (camera, bucket) in sums else None for bucket in series["_buckets"]]
+        temperature = self._columnar(rows["temperature"], resolution_s, "celsius")
+        for series in list(density.values()) + list(temperature.values()):
+            del series["_buckets"]
+        return {"from": from_ts, "to": to_ts, "resolution_s": resolution_s, "source": f"rollup_{level}s" if level else "raw",
+                "density": density, "temperature": temperature}
+
+    @staticmethod
+    def _columnar(rows, resolution_s, value_name):
+        series = {}
+        for key, bucket, samples, minimum, total, maximum in rows:
+            s = series.setdefault(key, {"t": [], "samples": [], value_name: {"min": [], "mean": [], "max": []}, "_buckets": []})
+            s["_buckets"].append(bucket)
+            s["t"].append(bucket * resolution_s)
+            s["samples"].append(samples)
+            s[value_name]["min"].append(minimum)
+            s[value_name]["mean"].append(round(total / samples, 3))
+            s[value_name]["max"].append(maximum)
+        return series
+
+    def stats(self):
+        with self._db_lock:
+            (density_count, first_ts, last_ts) = self._db.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM density_samples").fetchone()
+            (temperature_count,) = self._db.execute("SELECT COUNT(*) FROM temperature_samples").fetchone()
+            (rollup_count,) = self._db.execute("SELECT COUNT(*) FROM rollups").fetchone()
+        return {"density_samples": density_count, "temperature_samples": temperature_count, "rollup_rows": rollup_count,
+                "first_ts": first_ts, "last_ts": last_ts}
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
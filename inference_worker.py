@@ -0,0 +1,338 @@
+# inference_worker.py
+"""
+Detektor model 's' di proses worker terpisah, agar inferensi berat siklus pemetaan tidak berebut GIL & core
+dengan thread analisis live, pembaca frame, dan Flask.
+Frame disalin sekali ke multiprocessing.shared_memory milik worker (tanpa pickle); yang lewat antrean hanya
+header kecil (nama blok, offset & shape tiap gambar) dan hasil deteksi (array box yang kecil).
+"""
+import itertools, os, queue, sys, threading, time
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from detector_backends import Detections
+
+_ALIGN = 64
+
+_OWN_TRACKER = None  # apakah worker memakai resource tracker sendiri (bukan warisan proses utama)
+
+def _attach_shared_memory(name):
+    # Worker hanya menumpang blok milik proses utama; jangan biarkan resource tracker mencatatnya
+    # (jika tercatat, blok bisa di-unlink saat worker berhenti atau muncul peringatan "leaked").
+    global _OWN_TRACKER
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    if _OWN_TRACKER is None:
+        # Jika tracker proses utama sudah jalan saat worker dibuat, worker mewarisinya: pendaftaran ulang
+        # tidak berefek, dan unregister justru menghapus catatan milik proses utama.
+        _OWN_TRACKER = resource_tracker._resource_tracker._fd is None
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix" and _OWN_TRACKER:
+        # Sebelum 3.13 blok selalu didaftarkan di POSIX; batalkan untuk blok ini saja
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+def _apply_process_settings(worker_id, num_threads, cpu_affinity, nice):
+    if num_threads:
+        import cv2
+        cv2.setNumThreads(num_threads)
+    if cpu_affinity:
+        try:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, set(cpu_affinity))
+            else:
+                import psutil
+                psutil.Process().cpu_affinity(list(cpu_affinity))
+        except Exception as e:
+            print(f"[Density Worker {worker_id}] Afinitas CPU {cpu_affinity} tidak bisa diterapkan: {e}")
+    if nice:
+        # Prioritas lebih rendah dari proses utama agar stream live tetap didahulukan scheduler OS
+        try:
+            if hasattr(os, "nice"):
+                os.nice(nice)
+            else:
+                import psutil
+                psutil.Process().nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        except Exception as e:
+            print(f"[Density Worker {worker_id}] Prioritas proses tidak bisa diturunkan: {e}")
+
+def _worker_main(worker_id, model_path, backend, num_threads, names, cpu_affinity, nice, requests, responses):
+    """Loop proses worker: muat model sekali, lalu layani (request_id, nama blok, layout, conf, imgsz)."""
+    _apply_process_settings(worker_id, num_threads, cpu_affinity, nice)
+    try:
+        from detector_backends import load_detector
+        model = load_detector(model_path, backend, num_threads, names=names)
+    except Exception as e:
+        responses.put(("error", None, f"{type(e).__name__}: {e}"))
+        return
+    responses.put(("ready", None, {"names": dict(model.names), "pid": os.getpid()}))
+
+    block = None
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        request_id, block_name, layout, conf, imgsz = message
+        try:
+            if block is None or block.name != block_name:
+                if block is not None:
+                    block.close()
+                block = _attach_shared_memory(block_name)
+            images = [np.ndarray(shape, dtype=np.uint8, buffer=block.buf, offset=offset) for offset, shape in layout]
+            results = model.predict(images, conf=conf, imgsz=imgsz)
+            del images
+            responses.put(("ok", request_id, [(result.xyxy, result.conf, result.cls) for result in results]))
+        except Exception as e:
+            responses.put(("error", request_id, f"{type(e).__name__}: {e}"))
+    if block is not None:
+        block.close()
+
+
+class _WorkerHandle:
+    def __init__(self, worker_id, cpu_affinity):
+        self.worker_id = worker_id
+        self.cpu_affinity = cpu_affinity
+        self.process = None
+        self.requests = None
+        self.responses = None
+        self.block = None  # SharedMemory milik proses utama, diperbesar jika batch tidak muat
+        self.state = "starting"  # starting | idle | busy | restarting | failed
+        self.failed_at = None
+        self.pid = None
+        self.restarts = 0
+
+
+class InferenceWorkerPool:
+    """
+    Proxy detektor (predict() & names seperti detector_backends) yang meneruskan setiap batch ke salah satu
+    dari num_workers proses. Permintaan yang melewati request_timeout_s membuat worker-nya dimatikan &
+    dijalankan ulang; watchdog juga menjalankan ulang worker yang mati saat menganggur.
+    """
+    backend_name = "worker"
+
+    def __init__(self, model_path, backend="auto", num_threads=0, names=None, num_workers=1, cpu_affinity=None, nice=0,
+                 request_timeout_s=60.0, load_timeout_s=300.0, watchdog_interval_s=5.0, retry_failed_s=60.0):
+        self.model_path = model_path
+        self.backend = backend
+        self.num_threads = num_threads
+        self.class_names = names
+        self.nice = nice
+        self.request_timeout_s = request_timeout_s
+        self.load_timeout_s = load_timeout_s
+        self.watchdog_interval_s = watchdog_interval_s
+        self.retry_failed_s = retry_failed_s
+        self.names = None
+        self._ctx = mp.get_context("spawn")
+        # cpu_affinity: satu daftar core per worker (mis. [[2, 3], [4, 5]]); worker tanpa entri memakai semua core
+        affinities = list(cpu_affinity or []) + [None] * num_workers
+        self._handles = [_WorkerHandle(i, affinities[i]) for i in range(num_workers)]
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._closed = threading.Event()
+        self._watchdog = None
+        self._stats = {"requests": 0, "images": 0, "failures": 0, "timeouts": 0, "restarts": 0, "total_latency_s": 0.0, "last_latency_s": None}
+
+    # --- Siklus hidup worker ---
+    def start(self):
+        """Jalankan semua worker lalu tunggu modelnya dimuat (paralel); RuntimeError jika tidak ada yang siap."""
+        for handle in self._handles:
+            self._spawn(handle)
+        for handle in self._handles:
+            self._finish_start(handle)
+        if not any(handle.state == "idle" for handle in self._handles):
+            self.close()
+            raise RuntimeError(f"Tidak ada worker model yang berhasil dimuat dari {self.model_path}")
+        self._watchdog = threading.Thread(target=self._watchdog_loop, name="density-worker-watchdog", daemon=True)
+        self._watchdog.start()
+        return self
+
+    def _spawn(self, handle):
+        handle.requests, handle.responses = self._ctx.Queue(), self._ctx.Queue()
+        handle.process = self._ctx.Process(
+            target=_worker_main, name=f"density-worker-{handle.worker_id}", daemon=True,
+            args=(handle.worker_id, self.model_path, self.backend, self.num_threads, self.class_names,
+                  handle.cpu_affinity, self.nice, handle.requests, handle.responses))
+        handle.process.start()
+
+    def _finish_start(self, handle):
+        """Tunggu pesan 'ready' dari worker; worker yang gagal memuat ditandai 'failed'."""
+        deadline = time.monotonic() + self.load_timeout_s
+        while time.monotonic() < deadline:
+            try:
+                kind, _, payload = handle.responses.get(timeout=1.0)
+            except queue.Empty:
+                if not handle.process.is_alive():
+                    payload = f"proses berhenti (exit code {handle.process.exitcode})"
+                    break
+                continue
+            if kind == "ready":
+                self.names = self.names or payload["names"]
+                handle.pid = payload["pid"]
+                with self._lock:
+                    handle.state = "idle"
+                self._idle.put(handle)
+                print(f"[Density Worker {handle.worker_id}] Siap (PID {handle.pid}, afinitas {handle.cpu_affinity or 'semua core'}).")
+                return True
+            break
+        else:
+            payload = f"model tidak selesai dimuat dalam {self.load_timeout_s:.0f} detik"
+        print(f"[Density Worker {handle.worker_id}] Gagal dijalankan: {payload}")
+        self._stop_process(handle)
+        with self._lock:
+            handle.state, handle.failed_at = "failed", time.monotonic()
+        return False
+
+    def _stop_process(self, handle):
+        if handle.process is None:
+            return
+        if handle.process.is_alive():
+            handle.process.terminate()
+            handle.process.join(timeout=2.0)
+            if handle.process.is_alive():
+                handle.process.kill()
+                handle.process.join(timeout=2.0)
+        for q in (handle.requests, handle.responses):
+            q.close()
+            q.cancel_join_thread()
+
+    def _restart(self, handle, reason):
+        """Matikan worker (mis. macet/mati) lalu jalankan ulang di thread latar; blok shared memory dipakai lagi."""
+        with self._lock:
+            if handle.state == "restarting" or self._closed.is_set():
+                return
+            handle.state = "restarting"
+            handle.restarts += 1
+            self._stats["restarts"] += 1
+        print(f"[Density Worker {handle.worker_id}] Dijalankan ulang: {reason}")
+
+        def restart():
+            self._stop_process(handle)
+            self._spawn(handle)
+            self._finish_start(handle)
+        threading.Thread(target=restart, name=f"density-worker-{handle.worker_id}-restart", daemon=True).start()
+
+    def _watchdog_loop(self):
+        while not self._closed.wait(self.watchdog_interval_s):
+            for handle in self._handles:
+                # Worker yang sedang melayani permintaan diawasi oleh timeout pemanggilnya sendiri
+                if handle.state == "idle" and not handle.process.is_alive():
+                    self._restart(handle, f"proses mati (exit code {handle.process.exitcode})")
+                elif handle.state == "failed" and time.monotonic() - handle.failed_at >= self.retry_failed_s:
+                    self._restart(handle, "mencoba lagi setelah gagal dijalankan")
+
+    # --- Permintaan inferensi ---
+    def _acquire(self, deadline):
+        while True:
+            try:
+                handle = self._idle.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError("Tidak ada worker model yang siap dalam batas waktu") from None
+            with self._lock:
+                # Entri basi (worker sudah mulai dijalankan ulang) dibuang; worker itu masuk antrean lagi setelah siap
+                if handle.state != "idle":
+                    continue
+                if not handle.process.is_alive():
+                    stale = True
+                else:
+                    handle.state, stale = "busy", False
+            if stale:
+                self._restart(handle, "proses mati sebelum menerima permintaan")
+                continue
+            return handle
+
+    def _ensure_block(self, handle, num_bytes):
+        if handle.block is None or handle.block.size < num_bytes:
+            if handle.block is not None:
+                # Worker sudah/ akan menutup pemetaan lamanya saat menerima nama blok baru
+                handle.block.close()
+                handle.block.unlink()
+            handle.block = shared_memory.SharedMemory(create=True, size=max(num_bytes, 1))
+        return handle.block
+
+    def predict(self, images, conf=0.25, imgsz=None):
+        images = [np.ascontiguousarray(image, dtype=np.uint8) for image in images]
+        if not images:
+            return []
+        deadline = time.monotonic() + self.request_timeout_s
+        handle = self._acquire(deadline)
+        start = time.perf_counter()
+        try:
+            layout, offset = [], 0
+            for image in images:
+                layout.append((offset, image.shape))
+                offset += -(-image.nbytes // _ALIGN) * _ALIGN
+            block = self._ensure_block(handle, offset)
+            for image, (image_offset, shape) in zip(images, layout):
+                np.ndarray(shape, dtype=np.uint8, buffer=block.buf, offset=image_offset)[...] = image
+            request_id = next(self._request_ids)
+            handle.requests.put((request_id, block.name, layout, conf, imgsz))
+            results = self._await_response(handle, request_id, deadline)
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+                if isinstance(e, TimeoutError):
+                    self._stats["timeouts"] += 1
+            if isinstance(e, (TimeoutError, BrokenPipeError, EOFError)) or not handle.process.is_alive():
+                self._restart(handle, str(e))
+            else:
+                self._release(handle)
+            raise
+        self._release(handle)
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["images"] += len(images)
+            self._stats["total_latency_s"] += latency
+            self._stats["last_latency_s"] = latency
+        return [Detections(xyxy, scores, cls) for xyxy, scores, cls in results]
+
+    def __call__(self, images, conf=0.25, imgsz=None, **kwargs):
+        return self.predict(images, conf=conf, imgsz=imgsz)
+
+    def _await_response(self, handle, request_id, deadline):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"worker {handle.worker_id} tidak menjawab dalam {self.request_timeout_s:.0f} detik")
+            try:
+                kind, response_id, payload = handle.responses.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                if not handle.process.is_alive():
+                    raise RuntimeError(f"worker {handle.worker_id} berhenti (exit code {handle.process.exitcode})") from None
+                continue
+            if response_id != request_id:
+                continue
+            if kind == "ok":
+                return payload
+            raise RuntimeError(f"worker {handle.worker_id}: {payload}")
+
+    def _release(self, handle):
+        with self._lock:
+            if handle.state != "busy":
+                return
+            handle.state = "idle"
+        self._idle.put(handle)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["workers"] = [{"id": h.worker_id, "pid": h.pid, "state": h.state, "alive": h.process is not None and h.process.is_alive(),
+                                 "restarts": h.restarts, "cpu_affinity": h.cpu_affinity, "shared_memory_bytes": h.block.size if h.block else 0}
+                                for h in self._handles]
+        stats["mean_latency_s"] = round(stats["total_latency_s"] / stats["requests"], 4) if stats["requests"] else None
+        return stats
+
+    def close(self):
+        self._closed.set()
+        for handle in self._handles:
+            if handle.process is not None and handle.process.is_alive():
+                try:
+                    handle.requests.put(None)
+                    handle.process.join(timeout=2.0)
+                except Exception:
+                    pass
+            self._stop_process(handle)
+            if handle.block is not None:
+                handle.block.close()
+                handle.block.unlink()
+                handle.block = None
@@ -5,60 +5,112 @@ import threading
 import os
 
 from config import Config
-from calibrator import Calibrator
-from supabase_handler import SupabaseHandler
-from telegram_notifier import TelegramNotifier
-from chicken_analyzer import ChickenDensityAnalyzer
-from mjpeg_streamer import MJPEGStreamer
-from flask import render_template, jsonify 
-from flask import Flask 
-from web_routes import register_web_routes
+from startup_profile import StartupProfile
 
-# main.py
-# ... (impor dan kode lainnya tetap sama) ...
+# Modul berat (cv2, Flask, supabase, matplotlib, scipy, backend model) di-import di dalam fase startup
+# atau saat pertama dipakai, supaya web server & video sudah hidup beberapa detik setelah restart.
 if __name__ == "__main__":
-    config = Config()
+    profile = StartupProfile()
+    with profile.phase("konfigurasi"):
+        config = Config()
     # ... (kode kalibrasi tetap sama) ...
 
     # Inisialisasi komponen backend
-    supabase = SupabaseHandler(config.SUPABASE_URL, config.SUPABASE_KEY)
-    notifier = TelegramNotifier(config.TELEGRAM_BOT_TOKEN, config.TELEGRAM_CHAT_ID)
-    analyzer = ChickenDensityAnalyzer(config, supabase, notifier)
+    with profile.phase("inisialisasi backend"):
+        from telegram_notifier import TelegramNotifier
+        from event_bus import EventBus
+        if config.USE_FAKE_SUPABASE:
+            from fake_supabase import FakeSupabaseHandler
+            supabase = FakeSupabaseHandler(config.FAKE_SUPABASE_DIR)
+        else:
+            from supabase_handler import SupabaseHandler
+            supabase = SupabaseHandler(config.SUPABASE_URL, config.SUPABASE_KEY)  # klien dibuat saat pertama dipakai
+        notifier = TelegramNotifier(config.TELEGRAM_BOT_TOKEN, config.TELEGRAM_CHAT_ID)
+        event_bus = EventBus(ring_size=config.EVENTS_RING_SIZE)
+
+    with profile.phase("analyzer & kalibrasi kamera"):
+        from chicken_analyzer import ChickenDensityAnalyzer
+        # Model TIDAK dimuat di sini; dimulai paralel di latar setelah pembaca frame berjalan
+        analyzer = ChickenDensityAnalyzer(config, supabase, notifier, event_bus=event_bus, defer_model_loading=True, startup_profile=profile)
 
-    if analyzer.is_ready():
+    if all(camera.is_ready() for camera in analyzer.cameras):
         # --- TAMBAHKAN BLOK INI UNTUK MEMULAI SEMUA THREAD ---
-        
-        # 1. Mulai thread pembaca frame (Si Cepat)
-        threading.Thread(target=analyzer._read_video_source_thread, daemon=True).start()
 
-        # 2. Mulai thread analis untuk MJPEG Stream (Si Pintar)
-        threading.Thread(target=analyzer.process_rtsp_stream_for_mjpeg, daemon=True).start()
+        # 1. Mulai thread pembaca frame (Si Cepat), satu per kamera
+        with profile.phase("mulai pembaca frame"):
+            for camera in analyzer.cameras:
+                threading.Thread(target=camera.read_video_source_thread, daemon=True).start()
 
-        # --------------------------------------------------------
+        # 2. Muat model nano & small paralel di latar
+        analyzer.start_model_loading()
 
         # Pengaturan Aplikasi Web (Flask)
-        app = Flask(__name__, template_folder='templates')
-        register_web_routes(app, supabase)
-        streamer = MJPEGStreamer(analyzer)
-        streamer.register_stream_route(app)
-        
-        print(f"Memulai server dashboard di http://{config.MJPEG_HOST}:{config.MJPEG_PORT}/")
-        threading.Thread(
-            target=lambda: app.run(host=config.MJPEG_HOST, port=config.MJPEG_PORT, debug=False, use_reloader=False),
-            daemon=True
-        ).start()
+        with profile.phase("web server"):
+            from flask import Flask
+            from web_routes import register_web_routes
+            from mjpeg_streamer import MJPEGStreamer
+            app = Flask(__name__, template_folder='templates')
+            dashboard_cache = register_web_routes(app, supabase, outbox=analyzer.outbox, config=config, event_bus=event_bus, analyzer=analyzer, startup_profile=profile, history=analyzer.history)
+            analyzer.mapping_listeners.append(dashboard_cache.push_mapping)
+            analyzer.mapping_listeners.append(lambda row: event_bus.publish("mapping", row))
+            streamer = MJPEGStreamer(analyzer)
+            streamer.register_stream_route(app)
+            if config.METRICS_ENABLED:
+                from metrics import register_metrics_routes
+                register_metrics_routes(app, analyzer, streamer, config)
+
+            if config.EVENTS_ASYNC_PORT is not None:
+                from event_server import AsyncEventServer
+                AsyncEventServer(
+                    event_bus, lambda: dashboard_cache.snapshot(event_bus), config.MJPEG_HOST, config.EVENTS_ASYNC_PORT,
+                    heartbeat_s=config.EVENTS_HEARTBEAT_S, max_subscribers=config.EVENTS_ASYNC_MAX_SUBSCRIBERS,
+                    on_subscribe=lambda: dashboard_cache.ensure_temperature_publisher(event_bus)
+                ).start()
+                print(f"Server event dashboard (SSE async) di http://{config.MJPEG_HOST}:{config.EVENTS_ASYNC_PORT}/api/events")
+
+            print(f"Memulai server dashboard di http://{config.MJPEG_HOST}:{config.MJPEG_PORT}/ (status: /api/ready)")
+            threading.Thread(
+                target=lambda: app.run(host=config.MJPEG_HOST, port=config.MJPEG_PORT, debug=False, use_reloader=False),
+                daemon=True
+            ).start()
+
+        # 3. Mulai thread analis untuk MJPEG Stream (Si Pintar), satu batch YOLO untuk semua kamera.
+        #    Selama model nano dimuat, stream menampilkan video mentah.
+        threading.Thread(target=analyzer.process_rtsp_stream_for_mjpeg, daemon=True).start()
+
+        # 4. Mulai worker outbox untuk upload & insert ke Supabase
+        if analyzer.outbox is not None:
+            analyzer.outbox.start()
+        profile.print_report("Profil startup: web & video siap")
+
+        # --------------------------------------------------------
 
         # ... (Sisa file, penjadwalan, dll, tetap sama) ...
+        # Siklus pertama menunggu model selesai dimuat & frame pertama tiap kamera, bukan jeda tetap
+        print("\nMenunggu model & frame pertama sebelum siklus pemetaan pertama...")
+        with profile.phase("menunggu model & frame pertama"):
+            analyzer.models_loaded.wait()
+            for camera in analyzer.cameras:
+                camera.frame_ring.wait_for_newer(0, timeout=30)
+        profile.print_report("Profil startup: model siap")
+        if analyzer.yolo_model_n is None or analyzer.yolo_model_s is None:
+            print("WARNING: Tidak semua model berhasil dimuat; lihat /api/ready untuk detailnya.")
+
         print("\nMenjalankan siklus pemetaan pertama kali...")
-        # Beri jeda agar thread pembaca sempat mengambil frame pertama
-        time.sleep(5) 
         analyzer.run_mapping_cycle()
         schedule.every(2).minutes.do(analyzer.run_mapping_cycle)
         print(f"Pemetaan kepadatan dijadwalkan berjalan setiap 10 menit. Tekan Ctrl+C untuk berhenti.")
 
         try:
-            while True: schedule.run_pending(); time.sleep(1)
+            while True:
+                schedule.run_pending()
+                # Perubahan adegan besar (MOTION_GATING_ENABLED) memajukan siklus pemetaan
+                if analyzer.early_mapping_due():
+                    analyzer.run_mapping_cycle()
+                time.sleep(1)
         except KeyboardInterrupt: print("\nMenghentikan skrip...")
-        finally: print("Skrip dihentikan.")
+        finally:
+            analyzer.close()
+            print("Skrip dihentikan.")
     else:
-        print("\n❌ Inisialisasi Gagal.")
\ No newline at end of file
+        print("\n❌ Inisialisasi Gagal.")
@@ -0,0 +1,322 @@
+# metrics.py
+"""
+Instrumentasi ringan tanpa dependensi: Counter, Gauge, Histogram berlabel dan ekspor format teks Prometheus.
+Metrik hot path (inferensi, decode, siklus pemetaan, panggilan Supabase) diperbarui langsung; statistik yang sudah
+dicatat komponen lain (pembaca frame, hub MJPEG, outbox) dibaca lewat collector saat /metrics di-scrape.
+"""
+import bisect, math, threading, time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metrik {self.name} butuh label {self.label_names}, diberikan {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = self.header()
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Metrik terdaftar + collector (fungsi tanpa argumen yang mengembalikan list metrik sementara saat scrape)."""
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        for collector in collectors:
+            try:
+                for metric in collector():
+                    lines += metric.render()
+            except Exception as e:
+                lines.append(f"# collector error: {e}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# --- Metrik hot path ---
+INFERENCE_SECONDS = REGISTRY.histogram("chicken_inference_seconds", "Latensi satu panggilan detektor (satu batch frame).", ["model"])
+DECODE_SECONDS = REGISTRY.histogram("chicken_frame_decode_seconds", "Latensi retrieve/decode satu frame di pembaca video.", ["camera"],
+                                    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+ANALYSIS_TICK_SECONDS = REGISTRY.histogram("chicken_analysis_tick_seconds", "Durasi satu tick analisis live (ambil frame, inferensi, anotasi).")
+ANALYSIS_FRAMES = REGISTRY.counter("chicken_analysis_frames_total", "Frame yang dianalisis thread live.", ["camera"])
+ANALYSIS_FPS = REGISTRY.gauge("chicken_analysis_fps", "Laju tick analisis live yang tercapai (dihaluskan).")
+ANALYSIS_TARGET_FPS = REGISTRY.gauge("chicken_analysis_target_fps", "Laju tick analisis target (1 / interval tick saat ini).")
+TILED_CROPS = REGISTRY.counter("chicken_tiled_crops_total", "Crop tile yang dikirim ke model 's' pada inferensi ber-tile.")
+CASCADE_ESCALATIONS = REGISTRY.counter("chicken_cascade_escalations_total", "Eskalasi kaskade ke model 's' per alasan yang terpicu.", ["camera", "reason"])
+ANALYSIS_DECISIONS = REGISTRY.counter("chicken_analysis_decisions_total", "Keputusan penjadwal gerak per frame: detect atau reuse.", ["camera", "decision"])
+MAPPING_PHASE_SECONDS = REGISTRY.histogram("chicken_mapping_phase_seconds", "Durasi fase siklus pemetaan.", ["phase"],
+                                           buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+MAPPING_CYCLES = REGISTRY.counter("chicken_mapping_cycles_total", "Siklus pemetaan menurut hasil.", ["result"])
+SUPABASE_REQUEST_SECONDS = REGISTRY.histogram("chicken_supabase_request_seconds", "Latensi panggilan Supabase.", ["operation"])
+SUPABASE_FAILURES = REGISTRY.counter("chicken_supabase_failures_total", "Panggilan Supabase yang gagal.", ["operation"])
+
+@contextmanager
+def supabase_call(operation):
+    """Catat latensi panggilan Supabase; exception dihitung sebagai kegagalan lalu diteruskan."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SUPABASE_FAILURES.inc(operation=operation)
+        raise
+    finally:
+        SUPABASE_REQUEST_SECONDS.observe(time.perf_counter() - start, operation=operation)
+
+# --- Collector dari statistik komponen yang sudah ada ---
+def _collect_from(rows_by_metric):
+    """rows_by_metric: list (kelas, nama, dokumentasi, nama label, [(nilai label..., nilai)])."""
+    metrics = []
+    for metric_class, name, documentation, label_names, rows in rows_by_metric:
+        metric = metric_class(name, documentation, label_names)
+        for *label_values, value in rows:
+            metric._values[tuple(str(v) for v in label_values)] = value
+        metrics.append(metric)
+    return metrics
+
+def camera_collector(cameras):
+    def collect():
+        now = time.monotonic()
+        reader_stats = [(camera.name, camera.get_reader_stats()) for camera in cameras]
+        counters = [
+            (Counter, f"chicken_reader_{key}_total", f"Statistik pembaca frame: {key}.", ["camera"], [(name, stats[key]) for name, stats in reader_stats])
+            for key in ("frames_grabbed", "frames_decoded", "frames_skipped", "frames_dropped", "reconnects")
+        ]
+        return _collect_from(counters + [
+            (Gauge, "chicken_reader_connected", "1 jika sumber video terhubung.", ["camera"], [(name, int(stats["connected"])) for name, stats in reader_stats]),
+            (Gauge, "chicken_frame_age_seconds", "Umur frame mentah terbaru di ring.", ["camera"],
+             [(camera.name, now - camera.frame_ring.latest_written_at) for camera in cameras if camera.frame_ring.latest_written_at is not None]),
+            (Gauge, "chicken_annotated_frame_age_seconds", "Umur frame anotasi terbaru (stream live).", ["camera"],
+             [(camera.name, now - camera.annotated_at) for camera in cameras if camera.annotated_at is not None])
+        ] + _motion_gate_metrics(cameras))
+    return collect
+
+def _motion_gate_metrics(cameras):
+    gate_stats = [(camera.name, camera.motion_gate.stats()) for camera in cameras if camera.motion_gate is not None]
+    return [
+        (Gauge, "chicken_motion_score", "Fraksi piksel ROI yang berubah sejak deteksi terakhir.", ["camera"],
+         [(name, s["motion_score"]) for name, s in gate_stats if s["motion_score"] is not None]),
+        (Gauge, "chicken_analysis_skip_ratio", "Fraksi tick yang memakai ulang deteksi terakhir.", ["camera"], [(name, s["skip_ratio"]) for name, s in gate_stats]),
+        (Gauge, "chicken_detection_fps", "Laju deteksi model nano efektif (satu menit terakhir).", ["camera"], [(name, s["detection_fps"]) for name, s in gate_stats]),
+        (Gauge, "chicken_analysis_interval_seconds", "Interval tick dari penjadwal gerak.", ["camera"], [(name, s["interval_s"]) for name, s in gate_stats]),
+        (Counter, "chicken_scene_changes_total", "Perubahan adegan besar yang terdeteksi.", ["camera"], [(name, s["scene_changes"]) for name, s in gate_stats])
+    ]
+
+def stream_collector(streamer):
+    def collect():
+        hub_stats = [(name, hub.stats()) for name, hub in streamer.hubs.items()]
+        return _collect_from([
+            (Gauge, "chicken_stream_active_clients", "Klien MJPEG yang sedang menonton.", ["camera"], [(name, s["active_clients"]) for name, s in hub_stats]),
+            (Counter, "chicken_stream_bytes_sent_total", "Byte MJPEG terkirim.", ["camera"], [(name, s["bytes_sent"]) for name, s in hub_stats]),
+            (Counter, "chicken_stream_frames_dropped_total", "Frame yang dilompati klien lambat.", ["camera"], [(name, s["frames_dropped"]) for name, s in hub_stats]),
+            (Counter, "chicken_stream_clients_rejected_total", "Klien ditolak karena batas MJPEG_MAX_CLIENTS.", ["camera"], [(name, s["clients_rejected"]) for name, s in hub_stats]),
+            (Counter, "chicken_stream_encodes_total", "Frame yang di-encode JPEG.", ["camera"], [(name, s["encode_count"]) for name, s in hub_stats])
+        ] + _stream_variant_metrics(streamer))
+    return collect
+
+def _stream_variant_metrics(streamer):
+    variant_stats = [(name, view, variant) for view, hubs in (("annotated", streamer.hubs), ("birdseye", streamer.birdseye_hubs))
+                     for name, hub in hubs.items() for variant in hub.stats()["variants"]]
+    return [
+        (Gauge, "chicken_stream_variant_subscribers", "Klien per varian stream (lebar, kualitas).", ["camera", "view", "variant"],
+         [(name, view, v["variant"], v["subscribers"]) for name, view, v in variant_stats]),
+        (Counter, "chicken_stream_variant_bytes_sent_total", "Byte terkirim per varian stream.", ["camera", "view", "variant"],
+         [(name, view, v["variant"], v["bytes_sent"]) for name, view, v in variant_stats]),
+        (Counter, "chicken_stream_variant_encodes_total", "Frame yang di-resize & di-encode per varian stream.", ["camera", "view", "variant"],
+         [(name, view, v["variant"], v["encode_count"]) for name, view, v in variant_stats]),
+        (Counter, "chicken_stream_variant_encode_seconds_total", "Total waktu resize + encode per varian stream.", ["camera", "view", "variant"],
+         [(name, view, v["variant"], v["encode_s"]) for name, view, v in variant_stats])
+    ]
+
+def outbox_collector(outbox):
+    def collect():
+        s = outbox.stats()
+        return _collect_from([
+            (Gauge, "chicken_outbox_pending_jobs", "Baris yang menunggu di-insert.", [], [(s["pending_jobs"],)]),
+            (Gauge, "chicken_outbox_pending_artifacts", "Artefak yang menunggu diunggah.", [], [(s["pending_artifacts"],)]),
+            (Gauge, "chicken_outbox_oldest_pending_age_seconds", "Umur item outbox tertua yang belum selesai.", [], [(s["oldest_pending_age_s"],)]),
+            (Counter, "chicken_outbox_uploads_total", "Artefak yang berhasil diunggah.", [], [(s["uploaded_total"],)]),
+            (Counter, "chicken_outbox_upload_failures_total", "Percobaan upload yang gagal.", [], [(s["upload_failures"],)]),
+            (Counter, "chicken_outbox_insert_failures_total", "Batch insert yang gagal.", [], [(s["insert_failures"],)]),
+            (Counter, "chicken_outbox_dropped_jobs_total", "Job dibuang karena antrean penuh.", [], [(s["dropped_jobs"],)]),
+            (Counter, "chicken_outbox_failed_jobs_total", "Job dibuang karena gagal permanen (artefak wajib atau insert).", [], [(s["failed_jobs"],)])
+        ])
+    return collect
+
+def density_worker_collector(analyzer):
+    # Worker dibuat di thread pemuat model, jadi dicek saat scrape, bukan saat registrasi
+    def collect():
+        if analyzer.density_worker is None:
+            return []
+        s = analyzer.density_worker.stats()
+        return _collect_from([
+            (Gauge, "chicken_density_workers_alive", "Proses worker model 's' yang hidup.", [], [(sum(w["alive"] for w in s["workers"]),)]),
+            (Counter, "chicken_density_worker_requests_total", "Batch yang selesai diproses worker model 's'.", [], [(s["requests"],)]),
+            (Counter, "chicken_density_worker_failures_total", "Batch worker model 's' yang gagal (termasuk timeout).", [], [(s["failures"],)]),
+            (Counter, "chicken_density_worker_timeouts_total", "Batch worker model 's' yang melewati DENSITY_WORKER_TIMEOUT_S.", [], [(s["timeouts"],)]),
+            (Counter, "chicken_density_worker_restarts_total", "Worker model 's' yang dijalankan ulang watchdog.", [], [(s["restarts"],)])
+        ])
+    return collect
+
+def cascade_collector(cascade):
+    def collect():
+        report = cascade.stats()
+        return _collect_from([
+            (Counter, "chicken_cascade_frames_checked_total", "Frame nano yang dicek kaskade.", ["camera"], [(name, s["frames_checked"]) for name, s in report.items()]),
+            (Counter, "chicken_cascade_frames_triggered_total", "Frame dengan minimal satu alasan eskalasi.", ["camera"], [(name, s["frames_triggered"]) for name, s in report.items()]),
+            (Counter, "chicken_cascade_skipped_total", "Eskalasi terpicu yang dilewati (rate_limit / busy).", ["camera", "cause"],
+             [(name, cause, s[f"skipped_{cause}"]) for name, s in report.items() for cause in ("rate_limit", "busy")]),
+            (Gauge, "chicken_cascade_escalation_rate", "Fraksi frame yang dieskalasi ke model 's'.", ["camera"], [(name, s["escalation_rate"]) for name, s in report.items()])
+        ])
+    return collect
+
+def register_metrics_routes(app, analyzer, streamer=None, config=None, registry=REGISTRY):
+    """/metrics (format teks Prometheus) dan, jika PROFILER_ENABLED, /debug/profile untuk profiler sampling."""
+    from flask import Response, request
+    registry.add_collector(camera_collector(analyzer.cameras))
+    if streamer is not None:
+        registry.add_collector(stream_collector(streamer))
+    if analyzer.outbox is not None:
+        registry.add_collector(outbox_collector(analyzer.outbox))
+    registry.add_collector(density_worker_collector(analyzer))
+    if analyzer.cascade is not None:
+        registry.add_collector(cascade_collector(analyzer.cascade))
+    ANALYSIS_TARGET_FPS.set(1.0 / analyzer.config.STREAM_PROCESSING_INTERVAL_S if analyzer.config.STREAM_PROCESSING_INTERVAL_S > 0 else 0.0)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    if getattr(config, "PROFILER_ENABLED", False):
+        from profiler import SamplingProfiler
+        profile_lock = threading.Lock()
+
+        @app.route('/debug/profile')
+        def debug_profile():
+            # ?seconds=10&format=folded (untuk flamegraph/speedscope) atau format=top (fungsi terbanyak sampel)&limit=40
+            try:
+                seconds = float(request.args.get("seconds", 10))
+                limit = int(request.args.get("limit", 40))
+                if not math.isfinite(seconds):
+                    raise ValueError(f"seconds harus berhingga: {seconds}")
+            except ValueError as e:
+                return Response(f"Parameter tidak valid: {e}", status=400, mimetype='text/plain')
+            seconds = min(max(seconds, 0.1), 120.0)
+            limit = min(max(limit, 1), 1000)
+            if not profile_lock.acquire(blocking=False):
+                return Response("Profiler sedang berjalan untuk request lain.", status=409, mimetype='text/plain')
+            try:
+                profiler = SamplingProfiler(getattr(config, "PROFILER_SAMPLE_INTERVAL_S", 0.01))
+                profiler.run_for(seconds)
+            finally:
+                profile_lock.release()
+            body = profiler.folded() if request.args.get("format", "top") == "folded" else profiler.top(limit)
+            return Response(body, mimetype='text/plain')
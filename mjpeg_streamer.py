@@ -1,31 +1,406 @@
 # mjpeg_streamer.py
-import cv2, time
-from flask import Response
+import cv2, threading, time
+from collections import OrderedDict, deque
+from flask import Response, jsonify, request
+
+def encode_jpeg(frame, quality, width=None):
+    """Perkecil frame ke lebar `width` (jika lebih lebar) lalu encode JPEG; None jika gagal."""
+    if width and frame.shape[1] > width:
+        height = max(1, int(round(frame.shape[0] * width / frame.shape[1])))
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    (flag, encoded_image) = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return encoded_image.tobytes() if flag else None
+
+
+class StreamVariant:
+    """
+    Satu varian (lebar, kualitas) stream satu kamera. Frame sumber hanya disimpan saat dipublikasikan;
+    resize + encode dijalankan klien pertama yang memintanya (di luar lock), paling banyak sekali per frame sumber,
+    lalu JPEG-nya dipakai bersama semua klien varian ini.
+    """
+    BANDWIDTH_WINDOW_S = 10.0
+
+    def __init__(self, width=None, quality=70, transform=None):
+        self.width = width  # None = lebar asli
+        self.quality = quality
+        self.transform = transform
+        self.condition = threading.Condition()
+        self.source_seq = 0
+        self._source_frame = None
+        self.jpeg_seq = 0
+        self.jpeg = None
+        self._encoding = False
+        self.subscribers = 0  # dijaga lock FrameBroadcastHub
+        self.last_used = time.monotonic()
+
+        # Statistik
+        self.encode_count = 0
+        self.encode_s = 0.0
+        self.bytes_sent = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self._sent_window = deque()  # (waktu, byte) untuk bandwidth beberapa detik terakhir
+
+    @property
+    def label(self):
+        return f"w{self.width}_q{self.quality}" if self.width else f"asli_q{self.quality}"
+
+    def publish(self, frame, seq):
+        with self.condition:
+            self._source_frame, self.source_seq = frame, seq
+            self.condition.notify_all()
+
+    def encode(self, frame):
+        start = time.perf_counter()
+        if self.transform is not None:
+            frame = self.transform(frame)
+        jpeg = encode_jpeg(frame, self.quality, self.width)
+        elapsed = time.perf_counter() - start
+        with self.condition:
+            self.encode_count += 1
+            self.encode_s += elapsed
+        return jpeg
+
+    def wait_for_frame(self, last_seq, timeout=5.0):
+        """Blok sampai ada JPEG dengan seq > last_seq. Mengembalikan (seq, jpeg) atau None jika timeout."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if self.jpeg is not None and last_seq < self.jpeg_seq == self.source_seq:
+                    return self.jpeg_seq, self.jpeg
+                if self.source_seq > last_seq and self._source_frame is not None and not self._encoding:
+                    break
+                # Frame belum ada, atau klien lain sedang meng-encode frame yang sama
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+            self._encoding = True
+            frame, seq = self._source_frame, self.source_seq
+
+        jpeg = None
+        try:
+            jpeg = self.encode(frame)
+        finally:
+            with self.condition:
+                self._encoding = False
+                if jpeg is not None and seq > self.jpeg_seq:
+                    self.jpeg, self.jpeg_seq = jpeg, seq
+                if self.source_seq == seq:
+                    # Sudah ter-encode (atau gagal): frame mentah dilepas agar tidak di-encode ulang
+                    self._source_frame = None
+                self.condition.notify_all()
+        return (seq, jpeg) if jpeg is not None else None
+
+    def record_sent(self, num_bytes, dropped=0):
+        now = time.monotonic()
+        with self.condition:
+            self.bytes_sent += num_bytes
+            self.frames_sent += 1
+            self.frames_dropped += dropped
+            self._sent_window.append((now, num_bytes))
+            while self._sent_window and now - self._sent_window[0][0] > self.BANDWIDTH_WINDOW_S:
+                self._sent_window.popleft()
+
+    def stats(self):
+        now = time.monotonic()
+        with self.condition:
+            recent_bytes = sum(num_bytes for sent_at, num_bytes in self._sent_window if now - sent_at <= self.BANDWIDTH_WINDOW_S)
+            return {
+                "variant": self.label,
+                "width": self.width,
+                "quality": self.quality,
+                "subscribers": self.subscribers,
+                "encode_count": self.encode_count,
+                "encode_s": round(self.encode_s, 3),
+                "mean_encode_ms": round(1000 * self.encode_s / self.encode_count, 2) if self.encode_count else None,
+                "bytes_sent": self.bytes_sent,
+                "frames_sent": self.frames_sent,
+                "frames_dropped": self.frames_dropped,
+                "mean_frame_kb": round(self.bytes_sent / self.frames_sent / 1024, 1) if self.frames_sent else None,
+                "bandwidth_kbps": round(8 * recent_bytes / 1000 / self.BANDWIDTH_WINDOW_S, 1),
+                "idle_s": round(now - self.last_used, 1) if not self.subscribers else 0.0
+            }
+
+
+class FrameBroadcastHub:
+    """
+    Frame anotasi satu kamera (atau satu tampilan, mis. bird's-eye) untuk semua klien stream.
+    Setiap kombinasi (lebar, kualitas) yang diminta menjadi StreamVariant sendiri, sehingga frame di-resize & di-encode
+    sekali per varian lalu dibagikan. Varian disimpan dalam LRU terbatas: jika penuh, varian tanpa penonton yang paling
+    lama tidak dipakai dibuang. transform (mis. warp bird's-eye) dijalankan tepat sebelum encode.
+    """
+    def __init__(self, jpeg_quality=70, max_clients=20, transform=None, max_variants=8):
+        self.jpeg_quality = jpeg_quality
+        self.max_clients = max_clients
+        self.transform = transform
+        self.max_variants = max_variants
+        self.lock = threading.Lock()
+
+        self.latest_seq = 0
+        self._latest_frame = None
+        self.variants = OrderedDict()  # (lebar, kualitas) -> StreamVariant, urutan = LRU
+
+        # Statistik
+        self.active_clients = 0
+        self.clients_rejected = 0
+        self.variants_evicted = 0
+        self._retired = {"encode_count": 0, "bytes_sent": 0, "frames_dropped": 0}  # dari varian yang sudah dibuang
+
+    def _encode(self, frame):
+        """Encode varian bawaan (lebar asli, jpeg_quality) tanpa cache; dipakai benchmark."""
+        return encode_jpeg(self.transform(frame) if self.transform is not None else frame, self.jpeg_quality)
+
+    def publish(self, frame):
+        """Dipanggil thread analis setiap ada frame anotasi baru; murah karena encode ditunda sampai ada yang meminta."""
+        if frame is None:
+            return
+        with self.lock:
+            self.latest_seq += 1
+            self._latest_frame = frame
+            for variant in self.variants.values():
+                variant.publish(frame, self.latest_seq)
+
+    def subscribe(self, width=None, quality=None):
+        """Daftarkan satu klien ke varian (dibuat jika belum ada). None jika batas klien atau batas varian tercapai."""
+        key = (width, quality or self.jpeg_quality)
+        with self.lock:
+            if self.max_clients and self.active_clients >= self.max_clients:
+                self.clients_rejected += 1
+                return None
+            variant = self.variants.get(key)
+            if variant is None:
+                if len(self.variants) >= self.max_variants and not self._evict_idle_locked():
+                    self.clients_rejected += 1
+                    return None
+                variant = StreamVariant(*key, transform=self.transform)
+                if self._latest_frame is not None:
+                    variant.publish(self._latest_frame, self.latest_seq)
+                self.variants[key] = variant
+            self.variants.move_to_end(key)
+            variant.subscribers += 1
+            self.active_clients += 1
+            return variant
+
+    def unsubscribe(self, variant):
+        with self.lock:
+            variant.subscribers = max(0, variant.subscribers - 1)
+            variant.last_used = time.monotonic()
+            self.active_clients = max(0, self.active_clients - 1)
+
+    def _evict_idle_locked(self):
+        for key, variant in self.variants.items():
+            if variant.subscribers == 0:
+                del self.variants[key]
+                stats = variant.stats()
+                for name in self._retired:
+                    self._retired[name] += stats[name]
+                self.variants_evicted += 1
+                return True
+        return False
+
+    def stats(self):
+        with self.lock:
+            variants = list(self.variants.values())
+            stats = {
+                "active_clients": self.active_clients,
+                "max_clients": self.max_clients,
+                "latest_seq": self.latest_seq,
+                "clients_rejected": self.clients_rejected,
+                "max_variants": self.max_variants,
+                "variants_evicted": self.variants_evicted
+            }
+            retired = dict(self._retired)
+        variant_stats = [variant.stats() for variant in variants]
+        for name, total in retired.items():
+            stats[name] = total + sum(s[name] for s in variant_stats)
+        stats["variants"] = variant_stats
+        return stats
+
 
 class MJPEGStreamer:
+    # Lebar & kualitas dibulatkan agar permintaan yang hampir sama berbagi satu varian
+    WIDTH_STEP = 16
+    QUALITY_STEP = 5
+
     def __init__(self, analyzer):
         self.analyzer = analyzer
+        config = analyzer.config
+        self.min_width = config.MJPEG_MIN_WIDTH
+        self.max_fps = config.MJPEG_MAX_FPS
+        self.websocket_enabled = config.MJPEG_WEBSOCKET_ENABLED
+        hub_options = {"jpeg_quality": config.MJPEG_JPEG_QUALITY, "max_clients": config.MJPEG_MAX_CLIENTS, "max_variants": config.MJPEG_MAX_VARIANTS}
+        # Satu hub per kamera; hub diberi tahu setiap kali thread analis menghasilkan frame anotasi baru
+        self.hubs = {}
+        for camera in analyzer.cameras:
+            hub = FrameBroadcastHub(**hub_options)
+            camera.annotated_frame_listeners.append(hub.publish)
+            with camera.annotation_lock:
+                if camera.latest_annotated_frame is not None:
+                    hub.publish(camera.latest_annotated_frame)
+            self.hubs[camera.name] = hub
+        self.hub = self.hubs[analyzer.primary_camera.name]
+        # Tampilan bird's-eye dari frame anotasi yang sama, lewat peta remap artefak kalibrasi
+        self.birdseye_hubs = {}
+        if config.BIRDSEYE_ENABLED:
+            for camera in analyzer.cameras:
+                if camera.calibration_id is None:
+                    continue
+                hub = FrameBroadcastHub(transform=camera.birdseye_view, **hub_options)
+                camera.annotated_frame_listeners.append(hub.publish)
+                self.birdseye_hubs[camera.name] = hub
+
+    def _resolve_hub(self, camera_name=None, birdseye=False):
+        hubs = self.birdseye_hubs if birdseye else self.hubs
+        return hubs.get(camera_name or self.analyzer.primary_camera.name)
 
-    def _generate_frames(self):
+    def _variant_params(self, args):
+        """(lebar, kualitas, fps) dari query ?width=&quality=&fps=; ValueError jika tidak valid."""
+        values = {}
+        for name, kind in (("width", int), ("quality", int), ("fps", float)):
+            raw = args.get(name)
+            try:
+                values[name] = kind(raw) if raw not in (None, "") else None
+            except ValueError:
+                raise ValueError(f"Parameter '{name}' harus berupa angka.")
+        width, quality, fps = values["width"], values["quality"], values["fps"]
+        if width is not None:
+            if width <= 0:
+                raise ValueError("Parameter 'width' harus > 0.")
+            width = max(self.min_width, int(round(width / self.WIDTH_STEP)) * self.WIDTH_STEP)
+        if quality is not None:
+            quality = min(95, max(10, int(round(quality / self.QUALITY_STEP)) * self.QUALITY_STEP))
+        if fps is not None:
+            if fps <= 0:
+                raise ValueError("Parameter 'fps' harus > 0.")
+            fps = min(fps, self.max_fps) if self.max_fps else fps
+        return width, quality, fps
+
+    def _frames(self, variant, fps):
+        """(jpeg, jumlah frame terlewat) untuk setiap frame baru, dibatasi fps milik klien ini."""
+        last_seq = 0
+        min_interval = 1.0 / fps if fps else 0.0
+        next_send = 0.0
         while True:
-            # --- PERUBAHAN: Gunakan lock yang benar ---
-            with self.analyzer.annotation_lock:
-                frame = self.analyzer.latest_annotated_frame
-            
-            if frame is None:
-                time.sleep(0.1)
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            item = variant.wait_for_frame(last_seq)
+            if item is None:
+                yield None, 0
                 continue
-                
-            (flag, encoded_image) = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-            if not flag:
+            seq, jpeg = item
+            # Klien lambat otomatis melompati frame: yang dikirim selalu frame terbaru.
+            # Frame yang dilewati karena batas fps klien sendiri tidak dihitung sebagai drop.
+            dropped = seq - last_seq - 1 if last_seq and not min_interval else 0
+            last_seq = seq
+            next_send = time.monotonic() + min_interval
+            yield jpeg, dropped
+
+    def _generate_frames(self, variant, fps):
+        for jpeg, dropped in self._frames(variant, fps):
+            if jpeg is None:
                 continue
-                
-            yield(b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + 
-                  bytearray(encoded_image) + b'\r\n')
-            # Beri jeda agar tidak membanjiri browser
-            time.sleep(1/30) # Target stream ~30 FPS
+            chunk = b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+            yield chunk
+            variant.record_sent(len(chunk), dropped)
+
+    def _stream_response(self, hub):
+        try:
+            width, quality, fps = self._variant_params(request.args)
+        except ValueError as e:
+            return Response(str(e), status=400, mimetype='text/plain')
+        variant = hub.subscribe(width, quality)
+        if variant is None:
+            return Response("Jumlah penonton atau varian stream sudah maksimal.", status=503, mimetype='text/plain')
+        response = Response(self._generate_frames(variant, fps), mimetype='multipart/x-mixed-replace; boundary=frame')
+        response.call_on_close(lambda: hub.unsubscribe(variant))
+        return response
+
+    def _websocket_stream(self, ws, hub):
+        """Kirim setiap JPEG baru sebagai pesan biner; tidak ada pesan selama frame belum berganti."""
+        if hub is None:
+            ws.close(1008, "Kamera atau tampilan tidak ditemukan.")
+            return
+        try:
+            width, quality, fps = self._variant_params(request.args)
+        except ValueError as e:
+            ws.close(1008, str(e))
+            return
+        variant = hub.subscribe(width, quality)
+        if variant is None:
+            ws.close(1013, "Jumlah penonton atau varian stream sudah maksimal.")
+            return
+        try:
+            for jpeg, dropped in self._frames(variant, fps):
+                if not ws.connected:
+                    break
+                if jpeg is None:
+                    continue
+                ws.send(jpeg)
+                variant.record_sent(len(jpeg), dropped)
+        except Exception as e:
+            print(f"WebSocket stream ditutup: {e}")
+        finally:
+            hub.unsubscribe(variant)
+
+    def register_websocket_routes(self, app):
+        """/ws/video_feed[...]: transport WebSocket biner opsional (butuh paket flask-sock)."""
+        try:
+            from flask_sock import Sock
+        except ImportError:
+            print("Stream WebSocket tidak aktif: paket flask-sock belum terpasang (pip install flask-sock).")
+            return False
+        sock = Sock(app)
+
+        @sock.route('/ws/video_feed')
+        def ws_video_feed(ws):
+            self._websocket_stream(ws, self._resolve_hub())
+
+        @sock.route('/ws/video_feed/birdseye')
+        def ws_birdseye_feed(ws):
+            self._websocket_stream(ws, self._resolve_hub(birdseye=True))
+
+        @sock.route('/ws/video_feed/<camera_name>')
+        def ws_camera_video_feed(ws, camera_name):
+            self._websocket_stream(ws, self._resolve_hub(camera_name))
+
+        @sock.route('/ws/video_feed/<camera_name>/birdseye')
+        def ws_camera_birdseye_feed(ws, camera_name):
+            self._websocket_stream(ws, self._resolve_hub(camera_name, birdseye=True))
+        return True
 
     def register_stream_route(self, app):
+        # Semua endpoint stream menerima ?width=&quality=&fps= (mis. /video_feed?width=480&quality=50&fps=5)
         @app.route('/video_feed')
         def video_feed():
-            return Response(self._generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
\ No newline at end of file
+            return self._stream_response(self.hub)
+
+        @app.route('/video_feed/<camera_name>')
+        def camera_video_feed(camera_name):
+            hub = self._resolve_hub(camera_name)
+            if hub is None:
+                return Response(f"Kamera '{camera_name}' tidak ditemukan.", status=404, mimetype='text/plain')
+            return self._stream_response(hub)
+
+        @app.route('/video_feed/birdseye')
+        def birdseye_feed():
+            return camera_birdseye_feed(self.analyzer.primary_camera.name)
+
+        @app.route('/video_feed/<camera_name>/birdseye')
+        def camera_birdseye_feed(camera_name):
+            hub = self._resolve_hub(camera_name, birdseye=True)
+            if hub is None:
+                return Response(f"Tampilan bird's-eye kamera '{camera_name}' tidak tersedia.", status=404, mimetype='text/plain')
+            return self._stream_response(hub)
+
+        @app.route('/api/stream_stats')
+        def stream_stats():
+            cameras = self.analyzer.cameras_by_name
+            stats = {name: dict(hub.stats(), frame_ring=cameras[name].frame_ring.stats(), reader=cameras[name].get_reader_stats()) for name, hub in self.hubs.items()}
+            for name, hub in self.birdseye_hubs.items():
+                stats[name]["birdseye"] = hub.stats()
+            return jsonify(stats)
+
+        if self.websocket_enabled:
+            self.register_websocket_routes(app)
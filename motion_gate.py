@@ -0,0 +1,125 @@
+# motion_gate.py
+"""
+Penjadwal analisis adaptif per kamera: skor gerak murah (selisih frame kecil grayscale di dalam ROI terhadap
+frame saat deteksi terakhir) menentukan apakah model nano dijalankan ulang, deteksi terakhir dipakai ulang,
+atau tick dipercepat. Interval tick melambat saat kandang tenang dan tidak pernah melebihi anggaran CPU inferensi.
+"""
+import threading, time
+from collections import deque
+import cv2
+import numpy as np
+
+DETECT, REUSE = "detect", "reuse"
+
+class MotionGate:
+    """
+    motion_threshold / scene_change_threshold: fraksi piksel ROI yang berubah (0..1).
+    cpu_budget: fraksi waktu dinding yang boleh dipakai inferensi kamera ini (mis. 0.5 = setengah core).
+    force_detect_s: deteksi tetap dijalankan paling lambat setiap sekian detik walau tidak ada gerak.
+    """
+    def __init__(self, min_interval_s=0.5, max_interval_s=3.0, force_detect_s=15.0, motion_threshold=0.01,
+                 scene_change_threshold=0.25, cpu_budget=0.5, score_width=160, pixel_threshold=12, backoff=1.25):
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.force_detect_s = force_detect_s
+        self.motion_threshold = motion_threshold
+        self.scene_change_threshold = scene_change_threshold
+        self.cpu_budget = cpu_budget
+        self.score_width = score_width
+        self.pixel_threshold = pixel_threshold
+        self.backoff = backoff
+        self.interval_s = min_interval_s
+        self._budget_interval_s = 0.0  # interval minimum dari anggaran CPU, dihitung ulang setiap deteksi
+        self.last_score = None
+        self.last_scene_change = False
+        self.last_detect_at = None
+        self._reference = None  # frame kecil saat deteksi terakhir
+        self._current = None
+        self._mask_cache = (None, None)  # (shape frame kecil, mask ROI kecil)
+        self._detect_times = deque()
+        self._lock = threading.Lock()
+        self._stats = {"ticks": 0, "detections": 0, "reuses": 0, "scene_changes": 0, "budget_limited": 0, "inference_s": 0.0}
+
+    def _small(self, frame):
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.score_width / width)
+        small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _small_mask(self, roi_mask, shape):
+        if roi_mask is None:
+            return None
+        cached_shape, cached_mask = self._mask_cache
+        if cached_shape != shape:
+            cached_mask = cv2.resize(roi_mask.astype(np.uint8), (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST) > 0
+            self._mask_cache = (shape, cached_mask)
+        return cached_mask
+
+    def score(self, frame, roi_mask=None):
+        """Fraksi piksel ROI yang berubah sejak deteksi terakhir (1.0 jika belum ada referensi)."""
+        self._current = self._small(frame)
+        self.last_scene_change = False
+        if self._reference is None or self._reference.shape != self._current.shape:
+            self.last_score = 1.0
+            return self.last_score
+        changed = cv2.absdiff(self._current, self._reference) > self.pixel_threshold
+        mask = self._small_mask(roi_mask, changed.shape)
+        if mask is not None and mask.any():
+            changed = changed[mask]
+        self.last_score = float(np.count_nonzero(changed)) / max(changed.size, 1)
+        self.last_scene_change = self.last_score >= self.scene_change_threshold
+        return self.last_score
+
+    def decide(self, score, now=None):
+        """
+        DETECT jika belum pernah deteksi, force_detect_s terlewati, atau ada perubahan adegan besar; selain itu
+        REUSE selama interval kamera ini (termasuk batas anggaran CPU) belum habis, walau tick digerakkan kamera lain.
+        """
+        now = time.monotonic() if now is None else now
+        if self.last_detect_at is None or now - self.last_detect_at >= self.force_detect_s or self.last_scene_change:
+            return DETECT
+        if now - self.last_detect_at < self.interval_s:
+            return REUSE
+        return DETECT if score >= self.motion_threshold else REUSE
+
+    def record(self, decision, inference_s=0.0, now=None):
+        """Catat hasil tick lalu sesuaikan interval: cepat saat ada gerak, melambat bertahap saat tenang."""
+        now = time.monotonic() if now is None else now
+        moving = self.last_score is not None and self.last_score >= self.motion_threshold
+        with self._lock:
+            self._stats["ticks"] += 1
+            if decision == DETECT:
+                self._stats["detections"] += 1
+                self._stats["inference_s"] += inference_s
+                self._detect_times.append(now)
+                self._reference = self._current
+                self.last_detect_at = now
+            else:
+                self._stats["reuses"] += 1
+            if self.last_scene_change:
+                self._stats["scene_changes"] += 1
+            while self._detect_times and now - self._detect_times[0] > 60.0:
+                self._detect_times.popleft()
+        interval = self.min_interval_s if moving else min(self.max_interval_s, self.interval_s * self.backoff)
+        # Anggaran CPU: inferensi terakhir tidak boleh memakan lebih dari cpu_budget dari interval.
+        # Batas ini tetap berlaku sampai deteksi berikutnya, juga saat tick di antaranya memakai ulang deteksi.
+        if decision == DETECT:
+            self._budget_interval_s = inference_s / self.cpu_budget if self.cpu_budget > 0 else 0.0
+            if self._budget_interval_s > interval:
+                with self._lock:
+                    self._stats["budget_limited"] += 1
+        self.interval_s = max(interval, self._budget_interval_s)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            recent = list(self._detect_times)
+        stats["skip_ratio"] = round(stats["reuses"] / stats["ticks"], 3) if stats["ticks"] else 0.0
+        # Laju deteksi efektif selama satu menit terakhir
+        stats["detection_fps"] = round((len(recent) - 1) / (recent[-1] - recent[0]), 3) if len(recent) > 1 and recent[-1] > recent[0] else 0.0
+        stats["interval_s"] = round(self.interval_s, 3)
+        stats["motion_score"] = round(self.last_score, 4) if self.last_score is not None else None
+        stats["inference_s"] = round(stats["inference_s"], 3)
+        return stats
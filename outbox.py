@@ -0,0 +1,351 @@
+# outbox.py
+"""
+Outbox lokal yang tahan restart untuk tahap publikasi (upload artefak + insert baris DB).
+Artefak disimpan sebagai file blob, antrean & statusnya di SQLite; sekelompok worker
+mengunggah secara paralel dengan exponential backoff dan insert dilakukan per batch.
+"""
+import json, os, random, sqlite3, threading, time, uuid
+from collections import deque
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bucket TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    blob_path TEXT,
+    size INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    url TEXT,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    row_json TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_artifacts (
+    job_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    artifact_id INTEGER NOT NULL,
+    required INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_due ON artifacts(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_job_artifacts_job ON job_artifacts(job_id);
+"""
+
+class PublishOutbox:
+    """Antrean publikasi terbatas di disk, diproses oleh worker upload paralel dan satu worker insert."""
+    def __init__(self, outbox_dir, supabase_handler, num_workers=3, max_pending_jobs=500, insert_batch_size=20,
+                 backoff_base_s=2.0, backoff_max_s=300.0, max_attempts=0):
+        self.supabase_handler = supabase_handler
+        self.num_workers = num_workers
+        self.max_pending_jobs = max_pending_jobs
+        self.insert_batch_size = insert_batch_size
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.max_attempts = max_attempts  # 0 = coba terus tanpa batas
+
+        self.blob_dir = os.path.join(outbox_dir, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(outbox_dir, "outbox.sqlite"), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads = []
+        # Callback yang dipanggil dengan list baris setelah batch berhasil di-insert
+        self.inserted_listeners = []
+
+        # Metrik in-process
+        self._metrics_lock = threading.Lock()
+        self._recent_uploads = deque()  # (timestamp, bytes) untuk hitung throughput
+        self.uploaded_total = 0
+        self.uploaded_bytes = 0
+        self.upload_failures = 0
+        self.inserted_rows = 0
+        self.insert_failures = 0
+        self.dropped_jobs = 0
+        self.failed_jobs = 0
+
+        # Upload yang terputus saat proses mati dikembalikan ke antrean; job 'failed' dari versi lama
+        # (yang masih memegang blob) dibersihkan
+        with self._db_lock, self._db:
+            self._db.execute("UPDATE artifacts SET status='pending' WHERE status='uploading'")
+            self._finish_jobs_locked([r[0] for r in self._db.execute("SELECT id FROM jobs WHERE status='failed'")], 'failed')
+
+    # --- Producer ---
+    def enqueue(self, artifacts, rows):
+        """
+        artifacts: {key: {'bucket', 'file_name', 'content_type', 'data'}}.
+        rows: [{'row': dict, 'url_fields': {kolom: key}, 'required': [kolom, ...]}].
+        Artefak dengan data None diabaikan; kolom URL-nya akan bernilai None.
+        Baris yang artefak wajibnya tidak tersedia dilewati, dan artefak yang tidak dipakai baris mana pun tidak disimpan.
+        """
+        now = time.time()
+        available = {key for key, artifact in artifacts.items() if artifact['data'] is not None}
+        accepted_rows = []
+        for spec in rows:
+            missing_required = [field for field in spec.get('required', []) if spec['url_fields'][field] not in available]
+            if missing_required:
+                print(f"[Outbox] Baris dilewati, artefak wajib tidak tersedia: {missing_required}")
+                continue
+            accepted_rows.append(spec)
+        used_keys = {key for spec in accepted_rows for key in spec['url_fields'].values() if key in available}
+        if not accepted_rows:
+            return
+
+        blob_paths = {}
+        for key, artifact in artifacts.items():
+            if key not in used_keys:
+                continue
+            blob_path = os.path.join(self.blob_dir, f"{uuid.uuid4().hex}.bin")
+            tmp_path = blob_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(artifact['data'])
+            os.replace(tmp_path, blob_path)
+            blob_paths[key] = blob_path
+
+        with self._db_lock, self._db:
+            artifact_ids = {}
+            for key, blob_path in blob_paths.items():
+                artifact = artifacts[key]
+                cur = self._db.execute(
+                    "INSERT INTO artifacts (bucket, file_name, content_type, blob_path, size, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (artifact['bucket'], artifact['file_name'], artifact['content_type'], blob_path, memoryview(artifact['data']).nbytes, now, now)
+                )
+                artifact_ids[key] = cur.lastrowid
+            for spec in accepted_rows:
+                row = dict(spec['row'])
+                for field, key in spec['url_fields'].items():
+                    row.setdefault(field, None)
+                cur = self._db.execute("INSERT INTO jobs (row_json, next_attempt_at, created_at) VALUES (?, ?, ?)", (json.dumps(row), now, now))
+                for field, key in spec['url_fields'].items():
+                    if key in artifact_ids:
+                        self._db.execute("INSERT INTO job_artifacts (job_id, field, artifact_id, required) VALUES (?, ?, ?, ?)",
+                                         (cur.lastrowid, field, artifact_ids[key], int(field in spec.get('required', []))))
+            self._enforce_bound_locked()
+        self._wake_event.set()
+
+    def _enforce_bound_locked(self):
+        (pending,) = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status='pending'").fetchone()
+        overflow = pending - self.max_pending_jobs
+        if overflow <= 0:
+            return
+        old_jobs = [r[0] for r in self._db.execute("SELECT id FROM jobs WHERE status='pending' ORDER BY created_at LIMIT ?", (overflow,))]
+        for job_id in old_jobs:
+            self._db.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+            self._db.execute("DELETE FROM job_artifacts WHERE job_id=?", (job_id,))
+        self._purge_orphan_artifacts_locked()
+        with self._metrics_lock:
+            self.dropped_jobs += len(old_jobs)
+        print(f"[Outbox] Antrean penuh, {len(old_jobs)} job tertua dibuang.")
+
+    def _purge_orphan_artifacts_locked(self):
+        orphans = self._db.execute(
+            "SELECT id, blob_path FROM artifacts WHERE status != 'uploading' AND id NOT IN (SELECT artifact_id FROM job_artifacts)"
+        ).fetchall()
+        for artifact_id, blob_path in orphans:
+            self._remove_blob(blob_path)
+            self._db.execute("DELETE FROM artifacts WHERE id=?", (artifact_id,))
+
+    def _remove_blob(self, blob_path):
+        if blob_path and os.path.exists(blob_path):
+            try: os.remove(blob_path)
+            except OSError as e: print(f"[Outbox] Error menghapus blob '{blob_path}': {e}")
+
+    def _backoff_delay(self, attempts):
+        return min(self.backoff_base_s * (2 ** (attempts - 1)), self.backoff_max_s) * random.uniform(0.8, 1.2)
+
+    # --- Worker upload ---
+    def _claim_artifact(self):
+        with self._db_lock, self._db:
+            row = self._db.execute(
+                "SELECT id, bucket, file_name, content_type, blob_path, attempts FROM artifacts WHERE status='pending' AND next_attempt_at <= ? ORDER BY created_at LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+            if row:
+                self._db.execute("UPDATE artifacts SET status='uploading' WHERE id=?", (row[0],))
+            return row
+
+    def _upload_worker(self):
+        while not self._stop_event.is_set():
+            claimed = self._claim_artifact()
+            if claimed is None:
+                self._wake_event.wait(1.0)
+                self._wake_event.clear()
+                continue
+            artifact_id, bucket, file_name, content_type, blob_path, attempts = claimed
+            try:
+                with open(blob_path, 'rb') as f:
+                    data = f.read()
+                result = self.supabase_handler.upload_bytes(bucket, data, file_name, content_type)
+                error = None if result["url"] else "upload gagal"
+            except Exception as e:
+                result, error = {"url": None, "bytes": 0}, str(e)
+
+            attempts += 1
+            with self._db_lock, self._db:
+                if error is None:
+                    self._db.execute("UPDATE artifacts SET status='done', url=?, attempts=?, blob_path=NULL WHERE id=?", (result["url"], attempts, artifact_id))
+                elif self.max_attempts and attempts >= self.max_attempts:
+                    self._db.execute("UPDATE artifacts SET status='failed', attempts=?, last_error=? WHERE id=?", (attempts, error, artifact_id))
+                else:
+                    self._db.execute("UPDATE artifacts SET status='pending', attempts=?, next_attempt_at=?, last_error=? WHERE id=?",
+                                     (attempts, time.time() + self._backoff_delay(attempts), error, artifact_id))
+            with self._metrics_lock:
+                if error is None:
+                    self.uploaded_total += 1
+                    self.uploaded_bytes += result["bytes"]
+                    self._recent_uploads.append((time.time(), result["bytes"]))
+                else:
+                    self.upload_failures += 1
+            if error is None:
+                self._remove_blob(blob_path)
+                self._wake_event.set()  # mungkin ada job yang kini siap di-insert
+
+    # --- Worker insert ---
+    def _collect_ready_jobs_locked(self):
+        ready, failed = [], []
+        jobs = self._db.execute("SELECT id, row_json, attempts FROM jobs WHERE status='pending' AND next_attempt_at <= ? ORDER BY created_at LIMIT ?",
+                                (time.time(), self.insert_batch_size * 5)).fetchall()
+        for job_id, row_json, attempts in jobs:
+            links = self._db.execute(
+                "SELECT ja.field, ja.required, a.status, a.url FROM job_artifacts ja JOIN artifacts a ON a.id = ja.artifact_id WHERE ja.job_id=?", (job_id,)
+            ).fetchall()
+            if any(status in ('pending', 'uploading') for _, _, status, _ in links):
+                continue
+            if any(required and status == 'failed' for _, required, status, _ in links):
+                failed.append(job_id)
+                continue
+            row = json.loads(row_json)
+            for field, _, status, url in links:
+                row[field] = url if status == 'done' else None
+            ready.append((job_id, row, attempts))
+            if len(ready) >= self.insert_batch_size:
+                break
+        return ready, failed
+
+    def _finish_jobs_locked(self, job_ids, status):
+        """Hapus job yang selesai ('done') atau gagal permanen ('failed') beserta blob artefak yang tidak dipakai lagi."""
+        for job_id in job_ids:
+            self._db.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+            self._db.execute("DELETE FROM job_artifacts WHERE job_id=?", (job_id,))
+        if job_ids:
+            self._purge_orphan_artifacts_locked()
+            if status == 'failed':
+                with self._metrics_lock:
+                    self.failed_jobs += len(job_ids)
+
+    def _insert_worker(self):
+        while not self._stop_event.is_set():
+            with self._db_lock, self._db:
+                ready, failed = self._collect_ready_jobs_locked()
+                self._finish_jobs_locked(failed, 'failed')
+            if failed:
+                print(f"[Outbox] {len(failed)} job dibatalkan karena artefak wajib gagal diunggah.")
+            if not ready:
+                self._stop_event.wait(1.0)
+                continue
+
+            inserted, rejected = self._insert_ready(ready)
+            exhausted = []
+            with self._db_lock, self._db:
+                self._finish_jobs_locked([job_id for job_id, _, _ in inserted], 'done')
+                for job_id, _, attempts in rejected:
+                    attempts += 1
+                    if self.max_attempts and attempts >= self.max_attempts:
+                        exhausted.append(job_id)
+                    else:
+                        self._db.execute("UPDATE jobs SET attempts=?, next_attempt_at=?, last_error=? WHERE id=?",
+                                         (attempts, time.time() + self._backoff_delay(attempts), "insert gagal", job_id))
+                self._finish_jobs_locked(exhausted, 'failed')
+            if exhausted:
+                print(f"[Outbox] {len(exhausted)} job dibuang setelah {self.max_attempts} percobaan insert gagal.")
+            with self._metrics_lock:
+                self.inserted_rows += len(inserted)
+                if rejected:
+                    self.insert_failures += 1
+            if inserted:
+                for listener in self.inserted_listeners:
+                    listener([row for _, row, _ in inserted])
+
+    def _insert_rows(self, rows):
+        try:
+            return self.supabase_handler.insert_mapping_rows(rows)
+        except Exception as e:
+            print(f"[Outbox] Error saat insert: {e}")
+            return False
+
+    def _insert_ready(self, ready):
+        """
+        Insert satu batch; jika gagal, baris di-insert satu per satu agar satu baris bermasalah (mis. constraint)
+        tidak menahan baris lain. Mengembalikan (job yang berhasil, job yang gagal).
+        """
+        if self._insert_rows([row for _, row, _ in ready]):
+            return ready, []
+        if len(ready) == 1:
+            return [], ready
+        inserted, rejected = [], []
+        for job in ready:
+            (inserted if self._insert_rows([job[1]]) else rejected).append(job)
+        return inserted, rejected
+
+    # --- Lifecycle & metrik ---
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.num_workers):
+            self._threads.append(threading.Thread(target=self._upload_worker, name=f"outbox-upload-{i}", daemon=True))
+        self._threads.append(threading.Thread(target=self._insert_worker, name="outbox-insert", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        print(f"[Outbox] {self.num_workers} worker upload + 1 worker insert dimulai.")
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def is_running(self):
+        """True selama worker sudah dimulai dan masih ada yang hidup."""
+        return any(thread.is_alive() for thread in self._threads)
+
+    def stats(self, window_s=300.0):
+        now = time.time()
+        with self._db_lock:
+            (pending_artifacts,) = self._db.execute("SELECT COUNT(*) FROM artifacts WHERE status IN ('pending', 'uploading')").fetchone()
+            (pending_bytes,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE status IN ('pending', 'uploading')").fetchone()
+            (pending_jobs, oldest_job) = self._db.execute("SELECT COUNT(*), MIN(created_at) FROM jobs WHERE status='pending'").fetchone()
+            (oldest_artifact,) = self._db.execute("SELECT MIN(created_at) FROM artifacts WHERE status IN ('pending', 'uploading')").fetchone()
+        oldest = min([t for t in (oldest_job, oldest_artifact) if t is not None], default=None)
+        with self._metrics_lock:
+            while self._recent_uploads and self._recent_uploads[0][0] < now - window_s:
+                self._recent_uploads.popleft()
+            recent_count = len(self._recent_uploads)
+            recent_bytes = sum(b for _, b in self._recent_uploads)
+            return {
+                "pending_artifacts": pending_artifacts,
+                "pending_bytes": pending_bytes,
+                "pending_jobs": pending_jobs,
+                "failed_jobs": self.failed_jobs,
+                "oldest_pending_age_s": round(now - oldest, 1) if oldest else 0.0,
+                "uploads_per_min": round(recent_count * 60.0 / window_s, 2),
+                "upload_bytes_per_s": round(recent_bytes / window_s, 1),
+                "uploaded_total": self.uploaded_total,
+                "uploaded_bytes": self.uploaded_bytes,
+                "upload_failures": self.upload_failures,
+                "inserted_rows": self.inserted_rows,
+                "insert_failures": self.insert_failures,
+                "dropped_jobs": self.dropped_jobs
+            }
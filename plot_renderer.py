@@ -0,0 +1,147 @@
+# plot_renderer.py
+"""
+Renderer plot cepat berbasis objek Figure (tanpa state global pyplot).
+Latar statis (axes, grid, label, area ROI) digambar sekali; setiap render hanya
+menggambar ulang artist yang berubah lalu langsung di-encode ke buffer PNG di memori.
+"""
+import threading
+import cv2
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Rectangle
+
+class _BlitFigure:
+    """Dasar renderer: menyimpan latar statis dan menggambar artist dinamis di atasnya."""
+    def __init__(self, figsize, dpi):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.dynamic_artists = []
+        self._background = None
+        self._lock = threading.Lock()
+
+    def _add_dynamic(self, artist):
+        artist.set_animated(True)
+        self.dynamic_artists.append(artist)
+        return artist
+
+    def _capture_background(self):
+        # Layout dihitung sekali saat latar dibuat, bukan di setiap savefig(bbox_inches='tight')
+        self.figure.tight_layout()
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def _encode_png(self):
+        if self._background is None:
+            self._capture_background()
+        self.canvas.restore_region(self._background)
+        for artist in self.dynamic_artists:
+            if artist.get_visible():
+                self.figure.draw_artist(artist)
+        rgba = np.asarray(self.canvas.buffer_rgba())
+        ok, png = cv2.imencode(".png", cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR), [int(cv2.IMWRITE_PNG_COMPRESSION), 1])
+        return png.tobytes() if ok else None
+
+
+class DensityPlotRenderer(_BlitFigure):
+    """Plot kepadatan ayam per sel grid, memakai hasil density.compute_grid_density."""
+    def __init__(self, config, figsize=(10, 10), dpi=150):
+        super().__init__(figsize, dpi)
+        self.config = config
+        cfg = config
+        width, height = cfg.REAL_WORLD_WIDTH_M, cfg.REAL_WORLD_HEIGHT_M
+        self.num_cols = int(np.ceil(width / cfg.GRID_SIZE_X))
+        self.num_rows = int(np.ceil(height / cfg.GRID_SIZE_Y))
+
+        ax = self.ax = self.figure.add_subplot(111)
+        ax.set_facecolor('whitesmoke')
+        ax.add_patch(Rectangle((0, 0), width, height, facecolor='skyblue', alpha=0.2, edgecolor='none'))
+        ax.set_xlim(-0.1, width + 0.1)
+        ax.set_ylim(-0.1, height + 0.1)
+        ax.set_xlabel("Lebar Area (X - meter)", fontsize=12)
+        ax.set_ylabel("Kedalaman Area (Y - meter)", fontsize=12)
+        ax.grid(True, linestyle='--', alpha=0.6)
+        ax.set_aspect('equal', 'box')
+
+        # Semua sel grid sebagai satu koleksi; hanya warnanya yang diperbarui
+        cells = []
+        for r in range(self.num_rows):
+            for c in range(self.num_cols):
+                x0, y0 = c * cfg.GRID_SIZE_X, r * cfg.GRID_SIZE_Y
+                cells.append([(x0, y0), (x0 + cfg.GRID_SIZE_X, y0), (x0 + cfg.GRID_SIZE_X, y0 + cfg.GRID_SIZE_Y), (x0, y0 + cfg.GRID_SIZE_Y)])
+        self.cell_collection = self._add_dynamic(PolyCollection(cells, facecolors=(0, 0, 0, 0), edgecolors='none'))
+        ax.add_collection(self.cell_collection)
+
+        self.scatter = self._add_dynamic(ax.scatter([], [], c='red', s=50, edgecolors='black', label='Posisi Ayam (Dalam ROI)'))
+        # Satu teks per sel dibuat sekali; render hanya mengganti isi & visibilitas
+        self.cell_texts = np.empty((self.num_rows, self.num_cols), dtype=object)
+        for r in range(self.num_rows):
+            for c in range(self.num_cols):
+                self.cell_texts[r, c] = self._add_dynamic(ax.text((c + 0.5) * cfg.GRID_SIZE_X, (r + 0.5) * cfg.GRID_SIZE_Y, "", ha='center', va='center', fontsize=10, color='blue', weight='bold', visible=False))
+        ax.legend(loc='upper right')
+        self.title = self._add_dynamic(ax.set_title("", fontsize=14))
+
+    def render(self, world_coords, density_result, timestamp):
+        """Mengembalikan bytes PNG untuk hasil kepadatan pada timestamp tertentu."""
+        x_coords, y_coords = world_coords
+        counts, density = density_result['counts'], density_result['density']
+        with self._lock:
+            facecolors = np.zeros((counts.size, 4))
+            for alert in density_result['alerts']:
+                facecolors[alert['grid_y'] * self.num_cols + alert['grid_x']] = (1.0, 0.0, 0.0, 0.4)
+            self.cell_collection.set_facecolors(facecolors)
+
+            self.scatter.set_offsets(np.column_stack([x_coords, y_coords]) if len(x_coords) else np.empty((0, 2)))
+
+            for text in self.cell_texts.flat:
+                text.set_visible(False)
+            for r, c in zip(*np.nonzero(counts)):
+                text = self.cell_texts[r, c]
+                text.set_text(f"{counts[r, c]}\n({density[r, c]:.1f}/m²)")
+                text.set_visible(True)
+
+            self.title.set_text(f"Kepadatan Ayam (ROI) @ {timestamp.strftime('%Y-%m-%d %H:%M:%S')} (Max {self.config.MAX_AYAM_PER_METER_PERSEGI}/m²)")
+            return self._encode_png()
+
+
+class TemperatureHeatmapRenderer(_BlitFigure):
+    """Heatmap suhu hasil interpolasi; hanya array imshow, titik sensor, dan heatspot yang diperbarui."""
+    def __init__(self, config, figsize=(8, 7), dpi=100, resolution=100):
+        super().__init__(figsize, dpi)
+        self.config = config
+        width, height = config.REAL_WORLD_WIDTH_M, config.REAL_WORLD_HEIGHT_M
+
+        ax = self.ax = self.figure.add_subplot(111)
+        ax.set_xlabel("X Coordinate (m)")
+        ax.set_ylabel("Y Coordinate (m)")
+        # Gunakan colormap 'hot' seperti di contoh
+        self.image = self._add_dynamic(ax.imshow(np.zeros((resolution, resolution)), extent=(0, width, 0, height), origin='lower', cmap='hot', interpolation='bicubic'))
+        self.colorbar = self.figure.colorbar(self.image, ax=ax)
+        self.colorbar.set_label('Temperature (°C)')
+        self._add_dynamic(self.colorbar.ax)
+
+        self.sensor_scatter = self._add_dynamic(ax.scatter([], [], c='blue', s=150, edgecolors='white', label='Sensors'))
+        self.heatspot_scatter = self._add_dynamic(ax.scatter([], [], c='green', marker='X', s=250, edgecolors='white', linewidth=2, label='Heatspot Center'))
+        self.legend_full = self._add_dynamic(ax.legend(handles=[self.sensor_scatter, self.heatspot_scatter]))
+        self.legend_sensors = self._add_dynamic(ax.legend(handles=[self.sensor_scatter]))
+        ax.add_artist(self.legend_full)
+        self.title = self._add_dynamic(ax.set_title(""))
+
+    def render(self, grid_z, sensor_points, heatspot, timestamp):
+        """grid_z berindeks [x, y] seperti keluaran np.mgrid; heatspot berupa (x, y) atau None."""
+        with self._lock:
+            self.image.set_data(grid_z.T)
+            finite = grid_z[np.isfinite(grid_z)]
+            if finite.size:
+                self.image.set_clim(float(finite.min()), float(finite.max()))
+
+            self.sensor_scatter.set_offsets(np.asarray(sensor_points, dtype=np.float64).reshape(-1, 2))
+            if heatspot is not None:
+                self.heatspot_scatter.set_offsets([heatspot])
+            self.heatspot_scatter.set_visible(heatspot is not None)
+            self.legend_full.set_visible(heatspot is not None)
+            self.legend_sensors.set_visible(heatspot is None)
+
+            self.title.set_text(f"Temperature Heatmap at {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
+            return self._encode_png()
@@ -0,0 +1,59 @@
+# profiler.py
+"""Profiler sampling in-process: ambil stack semua thread secara berkala lewat sys._current_frames()."""
+import os, sys, threading, time
+from collections import Counter
+
+class SamplingProfiler:
+    """Overhead sebanding dengan frekuensi sampling; thread profiler sendiri tidak ikut dihitung."""
+    def __init__(self, interval_s=0.01, max_depth=64):
+        self.interval_s = interval_s
+        self.max_depth = max_depth
+        self.stacks = Counter()    # "thread;fungsi_luar;...;fungsi_dalam" -> jumlah sampel
+        self.leaf_counts = Counter()
+        self.samples = 0
+        self.duration_s = 0.0
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    def sample_once(self, own_ident):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            if not labels:
+                continue
+            self.leaf_counts[labels[0]] += 1
+            self.stacks[";".join([thread_names.get(ident, str(ident))] + labels[::-1])] += 1
+        self.samples += 1
+
+    def run_for(self, seconds):
+        """Sampling di thread pemanggil selama `seconds` detik."""
+        own_ident = threading.get_ident()
+        start = time.perf_counter()
+        next_sample = start
+        while time.perf_counter() - start < seconds:
+            self.sample_once(own_ident)
+            next_sample += self.interval_s
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+        self.duration_s = time.perf_counter() - start
+        return self
+
+    def folded(self):
+        """Format "folded stacks" (satu baris per stack + jumlah) untuk flamegraph.pl / speedscope."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def top(self, limit=40):
+        """Fungsi dengan sampel terbanyak di puncak stack (waktu 'self'), termasuk thread yang sedang menunggu."""
+        total = sum(self.leaf_counts.values()) or 1
+        lines = [f"{self.samples} sampel dalam {self.duration_s:.1f} s (interval {self.interval_s * 1000:.0f} ms), {total} sampel stack thread",
+                 f"{'%':>6}  {'sampel':>7}  fungsi"]
+        for label, count in self.leaf_counts.most_common(limit):
+            lines.append(f"{100 * count / total:>6.1f}  {count:>7}  {label}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,40 @@
+# startup_profile.py
+"""Pencatat durasi tiap fase startup, dicetak saat boot dan tersedia lewat endpoint readiness."""
+import threading, time
+from contextlib import contextmanager
+
+class StartupProfile:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases = []  # (nama, mulai relatif, durasi) dalam detik
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start)
+
+    def record(self, name, start, duration_s):
+        """Catat fase yang diukur sendiri (mis. muat model di thread latar)."""
+        with self._lock:
+            self.phases.append((name, start - self.started_at, duration_s))
+
+    def elapsed_s(self):
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "elapsed_s": round(self.elapsed_s(), 3),
+                "phases": [{"name": name, "start_s": round(start, 3), "duration_s": round(duration, 3)} for name, start, duration in self.phases]
+            }
+
+    def print_report(self, title="Profil startup"):
+        with self._lock:
+            phases = list(self.phases)
+        print(f"\n--- {title} ({self.elapsed_s():.2f} detik sejak start) ---")
+        for name, start, duration in phases:
+            print(f"  {name:<40} mulai +{start:6.2f} s  durasi {duration:6.2f} s")
@@ -1,38 +1,81 @@
 # supabase_handler.py
-import os
-from supabase import create_client, Client
+import os, threading, time
+from metrics import supabase_call
 
 class SupabaseHandler:
     """Mengelola semua interaksi dengan Supabase (Auth, DB, Storage)."""
     def __init__(self, url, key):
-        self.client: Client = None
-        try:
-            if url and key:
-                self.client = create_client(url, key)
-                print("Koneksi ke Supabase berhasil.")
-            else:
-                print("WARNING: URL atau Key Supabase tidak ada di .env.")
-        except Exception as e:
-            print(f"Gagal terkoneksi ke Supabase: {e}")
+        self.url = url
+        self.key = key
+        self._client = None
+        self._connect_lock = threading.Lock()
+        self._connect_attempted = False
+        # Statistik unggahan kumulatif (bytes & latensi)
+        self.upload_stats = {"uploads": 0, "failures": 0, "bytes": 0, "total_latency_s": 0.0}
+        self._stats_lock = threading.Lock()
+        if not (url and key):
+            print("WARNING: URL atau Key Supabase tidak ada di .env.")
 
-    def upload_file(self, bucket_name: str, local_file_path: str, storage_file_name: str):
-        if not self.client or not os.path.exists(local_file_path):
-            return None
+    @property
+    def client(self):
+        """Klien Supabase dibuat (dan library supabase di-import) saat pertama kali dipakai, bukan saat startup."""
+        if self._client is None and not self._connect_attempted:
+            with self._connect_lock:
+                if not self._connect_attempted:
+                    self._connect_attempted = True
+                    if self.url and self.key:
+                        try:
+                            from supabase import create_client
+                            self._client = create_client(self.url, self.key)
+                            print("Koneksi ke Supabase berhasil.")
+                        except Exception as e:
+                            print(f"Gagal terkoneksi ke Supabase: {e}")
+        return self._client
+
+    def upload_bytes(self, bucket_name: str, data, storage_file_name: str, content_type: str = "application/octet-stream"):
+        """
+        Mengunggah payload bytes/memoryview langsung dari memori tanpa file sementara.
+        Mengembalikan dict {"url", "bytes", "latency_s"}; "url" bernilai None jika gagal.
+        """
+        num_bytes = memoryview(data).nbytes if data is not None else 0
+        result = {"url": None, "bytes": num_bytes, "latency_s": 0.0}
+        if not self.client or data is None:
+            return result
+        start_time = time.perf_counter()
         try:
-            with open(local_file_path, 'rb') as f:
-                self.client.storage.from_(bucket_name).upload(path=storage_file_name, file=f, file_options={"upsert": "true", "cacheControl": "3600"})
-            public_url = self.client.storage.from_(bucket_name).get_public_url(storage_file_name)
-            print(f"  Berhasil unggah '{storage_file_name}' ke bucket '{bucket_name}'.")
-            return public_url
+            payload = data if isinstance(data, bytes) else bytes(data)
+            with supabase_call("upload"):
+                self.client.storage.from_(bucket_name).upload(path=storage_file_name, file=payload, file_options={"upsert": "true", "cacheControl": "3600", "content-type": content_type})
+            result["url"] = self.client.storage.from_(bucket_name).get_public_url(storage_file_name)
+            result["latency_s"] = time.perf_counter() - start_time
+            print(f"  Berhasil unggah '{storage_file_name}' ke bucket '{bucket_name}' ({num_bytes / 1024:.1f} KB, {result['latency_s'] * 1000:.0f} ms).")
         except Exception as e:
+            result["latency_s"] = time.perf_counter() - start_time
             print(f"  Error saat mengunggah file ke Supabase: {e}")
+        self._record_upload(result)
+        return result
+
+    def _record_upload(self, result):
+        with self._stats_lock:
+            if result["url"]:
+                self.upload_stats["uploads"] += 1
+                self.upload_stats["bytes"] += result["bytes"]
+            else:
+                self.upload_stats["failures"] += 1
+            self.upload_stats["total_latency_s"] += result["latency_s"]
+
+    def upload_file(self, bucket_name: str, local_file_path: str, storage_file_name: str):
+        if not self.client or not local_file_path or not os.path.exists(local_file_path):
             return None
+        with open(local_file_path, 'rb') as f:
+            return self.upload_bytes(bucket_name, f.read(), storage_file_name)["url"]
 
     def insert_mapping_data(self, data_to_insert: dict):
         if not self.client:
             return False
         try:
-            response = self.client.table("density_mappings").insert(data_to_insert).execute()
+            with supabase_call("insert"):
+                response = self.client.table("density_mappings").insert(data_to_insert).execute()
             if response.data:
                 print(f"  Data pemetaan berhasil disimpan ke DB (ID: {response.data[0].get('id')}).")
                 return True
@@ -43,6 +86,39 @@ class SupabaseHandler:
             print(f"  Error saat menyimpan data ke DB: {e}")
             return False
 
+    def insert_mapping_rows(self, rows: list):
+        """Insert beberapa baris density_mappings dalam satu request (dipakai outbox)."""
+        if not self.client or not rows:
+            return False
+        try:
+            with supabase_call("insert_batch"):
+                response = self.client.table("density_mappings").insert(rows).execute()
+            if response.data:
+                print(f"  {len(response.data)} baris pemetaan berhasil disimpan ke DB.")
+                return True
+            elif hasattr(response, 'error') and response.error:
+                print(f"  Gagal menyimpan batch ke DB. Error: {response.error}")
+            return False
+        except Exception as e:
+            print(f"  Error saat menyimpan batch ke DB: {e}")
+            return False
+
+    def get_latest_mapping(self):
+        """Baris density_mappings terbaru (hanya URL plot), None jika tabel masih kosong atau terjadi error."""
+        if not self.client:
+            return None
+        try:
+            with supabase_call("latest_mapping"):
+                response = self.client.table("density_mappings") \
+                    .select("density_plot_url, heatmap_plot_url") \
+                    .order("id", desc=True) \
+                    .limit(1) \
+                    .execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"  Error saat mengambil data pemetaan terbaru: {e}")
+            return None
+
     # --- FUNGSI BARU DI SINI ---
     def get_latest_temperature_data(self):
         """Mengambil data suhu terakhir untuk setiap sensor via RPC call."""
@@ -50,7 +126,8 @@ class SupabaseHandler:
             return None
         try:
             # Panggil fungsi 'get_latest_sensor_data' yang sudah kita perbarui
-            response = self.client.rpc('get_latest_sensor_data').execute()
+            with supabase_call("temperature"):
+                response = self.client.rpc('get_latest_sensor_data').execute()
 
             if response.data:
                 formatted_data = []
@@ -0,0 +1,109 @@
+# temperature.py
+"""Interpolasi suhu sensor ke grid kandang dengan bobot yang dihitung sekali per tata letak sensor.
+
+Posisi sensor tetap, jadi triangulasi Delaunay (dan bobot barisentrik/Clough-Tocher atau IDW) cukup dihitung
+sekali. Setiap pembaruan suhu lalu hanya berupa satu perkalian matriks sparse x vektor nilai sensor.
+"""
+from functools import lru_cache
+import numpy as np
+
+INTERPOLATION_METHODS = ("linear", "cubic", "idw")
+FILL_STRATEGIES = ("nan", "nearest", "idw", "mean")
+
+class TemperatureInterpolator:
+    """Grid [x, y] berukuran resolution x resolution di atas area width_m x height_m, seperti np.mgrid semula."""
+    def __init__(self, sensor_points, width_m, height_m, resolution=100, method="cubic", fill="nan", idw_power=2.0):
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError(f"Metode interpolasi tidak dikenal: {method} (pilihan: {', '.join(INTERPOLATION_METHODS)})")
+        if fill not in FILL_STRATEGIES:
+            raise ValueError(f"Strategi pengisian tidak dikenal: {fill} (pilihan: {', '.join(FILL_STRATEGIES)})")
+        self.sensor_points = np.asarray(sensor_points, dtype=np.float64).reshape(-1, 2)
+        self.method, self.fill, self.idw_power = method, fill, idw_power
+        self.grid_x, self.grid_y = np.mgrid[0:width_m:complex(0, resolution), 0:height_m:complex(0, resolution)]
+        self.shape = self.grid_x.shape
+        grid_points = np.column_stack([self.grid_x.ravel(), self.grid_y.ravel()])
+
+        weights, inside = self._hull_weights(grid_points) if method != "idw" else (None, None)
+        if weights is None:
+            # IDW dipilih, atau triangulasi gagal (< 3 sensor / sensor segaris): pakai IDW di seluruh grid
+            weights, inside = self._idw_weights(grid_points), np.ones(len(grid_points), dtype=bool)
+        self.inside_hull = inside.reshape(self.shape)
+        self._fill_outside(weights, grid_points, inside)
+        self._fill_mean = fill == "mean" and not inside.all()
+
+        from scipy.sparse import csr_matrix
+        weights[np.abs(weights) < 1e-12] = 0.0
+        self.weights = csr_matrix(weights)
+        self._outside = ~inside
+
+    def _hull_weights(self, grid_points):
+        """Bobot di dalam convex hull sensor: barisentrik (linear) atau Clough-Tocher (cubic, sama dengan griddata)."""
+        from scipy.spatial import Delaunay
+        try:
+            from scipy.spatial import QhullError
+        except ImportError:  # scipy lama
+            from scipy.spatial.qhull import QhullError
+        if len(self.sensor_points) < 3:
+            return None, None
+        try:
+            tri = Delaunay(self.sensor_points)
+        except QhullError:
+            return None, None
+
+        simplex = tri.find_simplex(grid_points)
+        inside = simplex >= 0
+        num_sensors = len(self.sensor_points)
+        if self.method == "linear":
+            weights = np.zeros((len(grid_points), num_sensors))
+            rows = np.flatnonzero(inside)
+            transform = tri.transform[simplex[rows]]
+            bary = np.einsum("nij,nj->ni", transform[:, :2], grid_points[rows] - transform[:, 2])
+            bary = np.column_stack([bary, 1.0 - bary.sum(axis=1)])
+            np.add.at(weights, (rows[:, None], tri.simplices[simplex[rows]]), bary)
+        else:
+            # Clough-Tocher linear terhadap nilai sensor: interpolasi matriks identitas sekaligus menghasilkan
+            # kolom bobot tiap sensor (estimasi gradien iteratif, selisih terhadap griddata ~1e-6 °C)
+            from scipy.interpolate import CloughTocher2DInterpolator
+            weights = CloughTocher2DInterpolator(tri, np.eye(num_sensors))(grid_points)
+            weights = np.nan_to_num(weights.reshape(len(grid_points), num_sensors), nan=0.0)
+        return weights, inside
+
+    def _idw_weights(self, grid_points):
+        distances = np.linalg.norm(grid_points[:, None, :] - self.sensor_points[None, :, :], axis=2)
+        with np.errstate(divide="ignore"):
+            weights = 1.0 / np.power(distances, self.idw_power)
+        exact = distances < 1e-9
+        rows_on_sensor = exact.any(axis=1)
+        weights[rows_on_sensor] = exact[rows_on_sensor].astype(np.float64)
+        return weights / weights.sum(axis=1, keepdims=True)
+
+    def _fill_outside(self, weights, grid_points, inside):
+        """Isi baris di luar hull sesuai strategi; 'nan' & 'mean' ditangani saat interpolate()."""
+        outside = np.flatnonzero(~inside)
+        if not len(outside) or self.fill in ("nan", "mean"):
+            return
+        if self.fill == "nearest":
+            distances = np.linalg.norm(grid_points[outside, None, :] - self.sensor_points[None, :, :], axis=2)
+            weights[outside] = 0.0
+            weights[outside, distances.argmin(axis=1)] = 1.0
+        else:
+            weights[outside] = self._idw_weights(grid_points[outside])
+
+    def interpolate(self, values):
+        """Nilai sensor (urutan sama dengan sensor_points) -> grid_z [x, y]; NaN di luar hull jika fill='nan'."""
+        values = np.asarray(values, dtype=np.float64)
+        grid_z = self.weights @ values
+        if self.fill == "nan":
+            grid_z[self._outside] = np.nan
+        elif self._fill_mean:
+            grid_z[self._outside] = values.mean()
+        return grid_z.reshape(self.shape)
+
+@lru_cache(maxsize=16)
+def _cached_interpolator(sensor_points, width_m, height_m, resolution, method, fill, idw_power):
+    return TemperatureInterpolator(sensor_points, width_m, height_m, resolution, method, fill, idw_power)
+
+def interpolator_for(sensor_points, width_m, height_m, resolution=100, method="cubic", fill="nan", idw_power=2.0):
+    """Interpolator ter-cache per tata letak sensor (kumpulan sensor yang melapor bisa berubah jika ada yang mati)."""
+    key = tuple((float(x), float(y)) for x, y in sensor_points)
+    return _cached_interpolator(key, float(width_m), float(height_m), int(resolution), method, fill, float(idw_power))
@@ -0,0 +1,5 @@
+# tests/conftest.py
+# Modul aplikasi berada di root repo (layout datar), jadi root ditambahkan ke sys.path untuk pytest.
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
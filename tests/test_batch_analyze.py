@@ -0,0 +1,45 @@
+# tests/test_batch_analyze.py
+import os
+import pytest
+from batch_analyze import chunk_output_path, list_videos, merge_video_chunks, video_output_dir, write_rows
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return str(path)
+
+def test_keys_are_relative_to_input_folder(tmp_path):
+    first = touch(tmp_path / "rekaman" / "0501" / "cam1.mp4")
+    second = touch(tmp_path / "rekaman" / "0502" / "cam1.mp4")
+    touch(tmp_path / "rekaman" / "catatan.txt")
+    videos = list_videos([str(tmp_path / "rekaman")])
+    assert videos == [(first, "0501/cam1.mp4"), (second, "0502/cam1.mp4")]
+    out = str(tmp_path / "out")
+    chunks = [{"key": key, "start": 0} for _, key in videos]
+    assert chunk_output_path(out, chunks[0], "csv") != chunk_output_path(out, chunks[1], "csv")
+
+def test_single_file_keeps_basename_layout(tmp_path):
+    video = touch(tmp_path / "Ayam Panjang.mp4")
+    assert list_videos([video, video]) == [(video, "Ayam Panjang.mp4")]
+    assert video_output_dir("out", "Ayam Panjang.mp4") == os.path.join("out", "Ayam Panjang")
+
+def test_colliding_outputs_are_rejected(tmp_path):
+    first = touch(tmp_path / "0501" / "cam1.mp4")
+    second = touch(tmp_path / "0502" / "cam1.avi")
+    with pytest.raises(ValueError):
+        list_videos([first, second])
+    with pytest.raises(ValueError):
+        list_videos([str(tmp_path / "0501"), str(tmp_path / "0502")])
+
+def test_merge_keeps_videos_with_same_name_apart(tmp_path):
+    out = str(tmp_path / "out")
+    for key, count in (("0501/cam1.mp4", 1), ("0502/cam1.mp4", 2)):
+        os.makedirs(video_output_dir(out, key))
+        for start in (0, 10):
+            write_rows(chunk_output_path(out, {"key": key, "start": start}, "csv"),
+                       [{"video": key, "frame_index": start, "chickens_in_roi_count": count}], ["video", "frame_index", "chickens_in_roi_count"], "csv")
+    merged = merge_video_chunks(out, "0502/cam1.mp4", "csv")
+    assert merged == os.path.join(out, "0502", "cam1.csv")
+    with open(merged) as f:
+        lines = f.read().splitlines()
+    assert lines == ["video,frame_index,chickens_in_roi_count", "0502/cam1.mp4,0,2", "0502/cam1.mp4,10,2"]
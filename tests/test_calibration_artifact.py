@@ -0,0 +1,64 @@
+# tests/test_calibration_artifact.py
+import os
+import cv2
+import numpy as np
+import pytest
+from calibration_artifact import build_artifact, calibration_id, load_artifacts, save_artifact
+from density import cell_indices
+from detection_geometry import project_to_world
+
+GEOMETRY = {"width_m": 3.0, "height_m": 3.0, "grid_size_x": 1.0, "grid_size_y": 1.0, "birdseye_width_px": 120}
+FRAME_SHAPE = (120, 160)
+ROI = np.array([[20, 10], [140, 10], [150, 110], [10, 110]], dtype=np.float64)
+# Sudut ROI (piksel) -> sudut lantai (meter), sedikit perspektif seperti kamera miring
+HOMOGRAPHY = cv2.getPerspectiveTransform(ROI.astype(np.float32), np.float32([[0, 3], [3, 3], [3, 0], [0, 0]])).astype(np.float64)
+
+@pytest.fixture(scope="module")
+def artifact():
+    return build_artifact(HOMOGRAPHY, ROI, FRAME_SHAPE, GEOMETRY, calibration_id(HOMOGRAPHY, ROI, GEOMETRY))
+
+def test_cells_at_matches_projection_per_point(artifact):
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.integers(10, 150, 500), rng.integers(10, 110, 500)]).astype(np.float64)
+    world_x, world_y = project_to_world(points, HOMOGRAPHY, 3.0, 3.0)
+    gx, gy = cell_indices(world_x, world_y, 3.0, 3.0, 1.0, 1.0)
+    cells = artifact.cells_at(points)
+    # float32 (perspectiveTransform) vs float64 bisa berbeda tepat di garis batas sel
+    assert np.mean(cells == gy * 3 + gx) > 0.99
+
+def test_cells_at_outside_frame_is_minus_one(artifact):
+    cells = artifact.cells_at(np.array([[-1.0, 5.0], [160.0, 5.0], [5.0, 120.0]]))
+    assert cells.tolist() == [-1, -1, -1]
+    assert artifact.cells_at(np.zeros((0, 2))).shape == (0,)
+
+def test_cell_area_sums_to_roi_floor_area(artifact):
+    # ROI dipetakan tepat ke seluruh lantai 3 x 3 m
+    assert artifact.cell_area_m2.shape == (3, 3)
+    assert artifact.cell_area_m2.sum() == pytest.approx(9.0, rel=0.02)
+    assert artifact.effective_cell_area(0.25).min() >= 0.25
+
+def test_save_and_load_roundtrip_as_read_only_memmap(tmp_path, artifact):
+    target = save_artifact(str(tmp_path), "kandang", artifact)
+    assert os.path.isdir(target)
+    loaded = load_artifacts(str(tmp_path), "kandang", artifact.meta["calibration_id"])
+    assert list(loaded) == [FRAME_SHAPE]
+    restored = loaded[FRAME_SHAPE]
+    assert isinstance(restored.cell_index, np.memmap) and not restored.cell_index.flags.writeable
+    for name, array in artifact.arrays().items():
+        np.testing.assert_array_equal(restored.arrays()[name], array)
+    assert load_artifacts(str(tmp_path), "kandang", "kalibrasi_lain") == {}
+
+def test_new_calibration_prunes_old_artifacts(tmp_path, artifact):
+    old_dir = save_artifact(str(tmp_path), "kandang", artifact)
+    other_dir = save_artifact(str(tmp_path), "kandang2", artifact)
+    roi = ROI + 2
+    new_id = calibration_id(HOMOGRAPHY, roi, GEOMETRY)
+    new_dir = save_artifact(str(tmp_path), "kandang", build_artifact(HOMOGRAPHY, roi, FRAME_SHAPE, GEOMETRY, new_id))
+    assert not os.path.exists(old_dir) and os.path.isdir(new_dir)
+    assert os.path.isdir(other_dir)  # kamera lain tidak tersentuh
+
+def test_corrupt_artifact_is_skipped(tmp_path, artifact):
+    target = save_artifact(str(tmp_path), "kandang", artifact)
+    with open(os.path.join(target, "cell_index.npy"), "wb") as f:
+        f.write(b"rusak")
+    assert load_artifacts(str(tmp_path), "kandang", artifact.meta["calibration_id"]) == {}
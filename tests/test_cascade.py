@@ -0,0 +1,57 @@
+# tests/test_cascade.py
+import numpy as np
+from cascade import CascadePolicy, merge_region_detections, pairwise_max_iou
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 4)
+
+def test_pairwise_max_iou():
+    iou = pairwise_max_iou(boxes([0, 0, 10, 10], [0, 0, 10, 10], [50, 50, 60, 60]))
+    assert iou.tolist() == [1.0, 1.0, 0.0]
+    assert pairwise_max_iou(boxes([0, 0, 10, 10])).tolist() == [0.0]
+
+def test_low_confidence_needs_enough_boxes():
+    policy = CascadePolicy(min_flagged_boxes=3)
+    xyxy = boxes([0, 0, 10, 10], [20, 0, 30, 10], [40, 0, 50, 10], [60, 0, 70, 10])
+    cells = np.full(4, -1)
+    flagged, reasons = policy.flag_boxes(xyxy, np.array([0.2, 0.3, 0.9, 0.9]), cells, 12)
+    assert reasons == [] and not flagged.any()
+    flagged, reasons = policy.flag_boxes(xyxy, np.array([0.2, 0.3, 0.4, 0.9]), cells, 12)
+    assert reasons == ["low_confidence"] and flagged.tolist() == [True, True, True, False]
+
+def test_near_limit_uses_per_cell_capacity():
+    policy = CascadePolicy(near_limit_ratio=0.8)
+    xyxy = boxes([0, 0, 10, 10], [20, 0, 30, 10], [40, 0, 50, 10])
+    cells = np.array([0, 0, 1])
+    capacity = np.array([[2.0, 10.0]])  # sel 0 sudah penuh, sel 1 masih longgar
+    flagged, reasons = policy.flag_boxes(xyxy, np.full(3, 0.9), cells, capacity)
+    assert reasons == ["near_limit"] and flagged.tolist() == [True, True, False]
+
+def test_regions_group_nearby_boxes_and_fall_back_to_full_frame():
+    policy = CascadePolicy(region_padding_px=8, max_region_fraction=0.6)
+    xyxy = boxes([100, 100, 120, 120], [125, 100, 145, 120], [400, 300, 420, 320])
+    regions = policy.regions(xyxy, np.ones(3, dtype=bool), (480, 640))
+    assert len(regions) == 2
+    x0, y0, x1, y1 = regions[0]
+    assert x0 <= 100 and y0 <= 100 and x1 >= 145 and y1 >= 120
+    big = boxes([0, 0, 600, 400])
+    assert policy.regions(big, np.ones(1, dtype=bool), (480, 640)) == [(0, 0, 640, 480)]
+
+def test_merge_replaces_nano_boxes_inside_regions():
+    nano = boxes([10, 10, 20, 20], [200, 200, 210, 210])
+    small = (boxes([12, 12, 22, 22], [14, 14, 24, 24], [90, 90, 110, 110]), np.array([0.8, 0.7, 0.9], dtype=np.float32))
+    xyxy, conf, replaced, added = merge_region_detections(nano, np.array([0.3, 0.9]), [(0, 0, 50, 50)], [small])
+    assert (replaced, added) == (1, 2)  # box model 's' di margin crop (tengah 100,100) diabaikan
+    assert xyxy.tolist()[0] == [200, 200, 210, 210] and len(conf) == 3
+
+def test_rate_limit_and_report():
+    policy = CascadePolicy(min_interval_s=5.0)
+    assert policy.due("kandang", now=0.0)
+    policy.record_check("kandang", ["overlap"])
+    policy.record_escalation("kandang", [(0, 0, 32, 48)], (48, 64), small_model_s=0.2, nano_replaced=1, small_added=2, now=0.0)
+    assert not policy.due("kandang", now=4.0) and policy.due("kandang", now=5.0)
+    policy.record_check("kandang", ["overlap"], skipped="rate_limit")
+    report = policy.stats()["kandang"]
+    assert report["frames_checked"] == 2 and report["skipped_rate_limit"] == 1
+    assert report["reasons"] == {"overlap": 2}
+    assert report["escalation_rate"] == 0.5 and report["mean_area_fraction"] == 0.5
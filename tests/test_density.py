@@ -0,0 +1,38 @@
+# tests/test_density.py
+import numpy as np
+from density import cell_indices, compute_grid_density, grid_shape
+
+def test_grid_shape_covers_partial_cells():
+    assert grid_shape(3.0, 3.0, 1.0, 1.0) == (3, 3)
+    assert grid_shape(3.0, 2.5, 2.0, 1.0) == (2, 3)
+
+def test_points_on_far_edge_fall_in_last_cell():
+    gx, gy = cell_indices([0.0, 2.99, 3.0], [0.0, 1.5, 3.0], 3.0, 3.0, 1.0, 1.0)
+    assert gx.tolist() == [0, 2, 2]
+    assert gy.tolist() == [0, 1, 2]
+
+def test_counts_are_indexed_row_then_column():
+    result = compute_grid_density([0.5, 2.5, 2.5], [0.5, 1.5, 1.5], 3.0, 2.0, 1.0, 1.0, max_per_m2=12)
+    assert result['counts'].shape == (2, 3)
+    assert result['counts'][0, 0] == 1 and result['counts'][1, 2] == 2
+    assert result['grid_data'] == {"0_0": 1, "2_1": 2}
+    assert result['alerts'] == []
+
+def test_alerts_use_density_per_square_metre():
+    x = [0.25] * 5
+    y = [0.25] * 5
+    result = compute_grid_density(x, y, 1.0, 1.0, 0.5, 0.5, max_per_m2=12)
+    # 5 ayam di sel 0.25 m² = 20 / m²
+    assert result['density'][0, 0] == 20.0
+    assert result['alerts'] == [{'grid_x': 0, 'grid_y': 0, 'count': 5, 'density': 20.0}]
+
+def test_cell_area_matrix_overrides_full_cell_area():
+    area = np.array([[0.5, 1.0], [0.0, 1.0]])
+    result = compute_grid_density([0.5, 0.5], [0.5, 0.5], 2.0, 2.0, 1.0, 1.0, max_per_m2=3, cell_area_m2=area)
+    assert result['density'][0, 0] == 4.0
+    assert result['density'][1, 0] == 0.0  # sel berluas 0 tidak dibagi
+    assert len(result['alerts']) == 1
+
+def test_empty_input_gives_zero_grid():
+    result = compute_grid_density([], [], 3.0, 3.0, 1.0, 1.0, max_per_m2=12)
+    assert result['counts'].sum() == 0 and result['grid_data'] == {}
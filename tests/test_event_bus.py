@@ -0,0 +1,52 @@
+# tests/test_event_bus.py
+import json, threading
+from event_bus import EventBus
+
+def test_events_after_known_id_are_replayed_in_order():
+    bus = EventBus(ring_size=10)
+    start = bus.latest_id
+    first = bus.publish("mapping", {"n": 1})
+    second = bus.publish("density", {"n": 2})
+    events = bus.wait_for_events(start, timeout=0)
+    assert [event_id for event_id, _, _ in events] == [first, second]
+    assert [json.loads(data) for _, _, data in events] == [{"n": 1}, {"n": 2}]
+    assert bus.wait_for_events(second, timeout=0) == []
+
+def test_gap_beyond_ring_buffer_returns_none():
+    bus = EventBus(ring_size=3)
+    start = bus.latest_id
+    for i in range(5):
+        bus.publish("mapping", {"n": i})
+    # ID klien sudah keluar dari ring buffer -> pemanggil harus mengirim snapshot penuh
+    assert bus.wait_for_events(start, timeout=0) is None
+    assert len(bus.wait_for_events(bus.latest_id - 3, timeout=0)) == 3
+
+def test_id_from_the_future_is_treated_as_gap():
+    bus = EventBus()
+    bus.publish("mapping", {})
+    assert bus.wait_for_events(bus.latest_id + 100, timeout=0) is None
+
+def test_publish_if_changed_skips_identical_data():
+    bus = EventBus()
+    assert bus.publish_if_changed("temperature", [1, 2]) is not None
+    assert bus.publish_if_changed("temperature", [1, 2]) is None
+    assert bus.latest["temperature"] == [1, 2]
+
+def test_waiter_is_woken_by_publish():
+    bus = EventBus()
+    start = bus.latest_id
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(bus.wait_for_events(start, timeout=5.0)))
+    waiter.start()
+    bus.publish("mapping", {"n": 1})
+    waiter.join(2.0)
+    assert result and len(result[0]) == 1
+
+def test_subscriber_cap_is_enforced():
+    bus = EventBus()
+    assert bus.add_subscriber(max_subscribers=2)
+    assert bus.add_subscriber(max_subscribers=2)
+    assert not bus.add_subscriber(max_subscribers=2)
+    assert bus.rejected_total == 1
+    bus.remove_subscriber()
+    assert bus.add_subscriber(max_subscribers=2)
@@ -0,0 +1,98 @@
+# tests/test_event_server.py
+import json, socket, threading, time
+import pytest
+from event_bus import EventBus
+from event_server import AsyncEventServer
+
+@pytest.fixture
+def event_bus():
+    return EventBus()
+
+@pytest.fixture
+def make_server(event_bus):
+    servers = []
+    def make(**kwargs):
+        server = AsyncEventServer(event_bus, lambda: {"mapping": event_bus.latest.get("mapping")}, "127.0.0.1", 0, **kwargs)
+        servers.append(server.start())
+        return server
+    yield make
+    for server in servers:
+        server.stop()
+
+def _connect(server, path="/api/events", headers=""):
+    sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode())
+    return sock
+
+def _read_until(sock, marker, buffer=b""):
+    while marker not in buffer:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buffer += chunk
+    return buffer
+
+def _events(raw):
+    body = raw.split(b"\r\n\r\n", 1)[1].decode()
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_many_idle_clients_share_one_thread_and_all_receive_events(make_server, event_bus):
+    server = make_server(heartbeat_s=0.2)
+    threads_before = threading.active_count()
+    clients = [_connect(server) for _ in range(300)]
+    try:
+        buffers = [_read_until(sock, b"retry: 5000\n\n") for sock in clients]
+        assert all(_events(raw)[0][1] == "snapshot" for raw in buffers)
+        assert event_bus.subscribers_by_transport()["async"] == 300
+        # Koneksi idle tidak memegang thread masing-masing (hanya executor snapshot yang terbatas)
+        assert threading.active_count() - threads_before < 50
+
+        event_id = event_bus.publish("mapping", {"density_plot_url": "a"})
+        for sock, raw in zip(clients, buffers):
+            raw = _read_until(sock, b"event: mapping", raw)
+            assert (event_id, "mapping", {"density_plot_url": "a"}) in _events(raw)
+    finally:
+        for sock in clients:
+            sock.close()
+    assert _wait_until(lambda: event_bus.subscribers == 0, timeout=5.0)
+
+def test_last_event_id_replays_only_missed_events(make_server, event_bus):
+    server = make_server()
+    first = event_bus.publish("mapping", {"n": 1})
+    second = event_bus.publish("density", {"n": 2})
+    sock = _connect(server, headers=f"Last-Event-ID: {first}\r\n")
+    try:
+        raw = _read_until(sock, b"event: density")
+        assert b"Access-Control-Allow-Origin: *" in raw
+        assert _events(raw) == [(second, "density", {"n": 2})]
+    finally:
+        sock.close()
+
+def test_subscriber_cap_and_unknown_path(make_server, event_bus):
+    server = make_server(max_subscribers=1)
+    first = _connect(server)
+    try:
+        _read_until(first, b"retry: 5000\n\n")
+        rejected = _connect(server)
+        assert _read_until(rejected, b"maksimal.").startswith(b"HTTP/1.1 503")
+        rejected.close()
+        # Batas async terpisah dari batas /api/events WSGI
+        assert event_bus.add_subscriber(max_subscribers=1)
+        missing = _connect(server, path="/lain")
+        assert _read_until(missing, b"\r\n\r\n").startswith(b"HTTP/1.1 404")
+        missing.close()
+    finally:
+        first.close()
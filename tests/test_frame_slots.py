@@ -0,0 +1,58 @@
+# tests/test_frame_slots.py
+import numpy as np
+import pytest
+from frame_slots import FrameSlotRing
+
+def make_frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+def test_requires_at_least_two_slots():
+    with pytest.raises(ValueError):
+        FrameSlotRing(num_slots=1)
+
+def test_borrow_before_first_frame_yields_none():
+    ring = FrameSlotRing()
+    with ring.borrow() as (seq, frame):
+        assert seq == 0 and frame is None
+
+def test_borrowed_view_is_read_only_and_zero_copy():
+    ring = FrameSlotRing()
+    ring.write_copy(make_frame(5))
+    with ring.borrow() as (seq, frame):
+        assert seq == 1 and frame[0, 0, 0] == 5
+        assert not frame.flags.writeable
+    assert ring.stats()["borrows"] == 1
+    assert ring.stats()["slots_in_use"] == 0
+
+def test_writer_never_overwrites_borrowed_slot():
+    ring = FrameSlotRing(num_slots=2)
+    ring.write_copy(make_frame(1))
+    with ring.borrow() as (_, frame):
+        # Slot terbaru dipinjam; satu-satunya slot lain dipakai untuk frame berikutnya
+        ring.write_copy(make_frame(2))
+        # Kedua slot sekarang terkunci (satu dipinjam, satu frame terbaru) -> frame dilewati
+        assert ring.write_copy(make_frame(3)) is None
+        assert frame[0, 0, 0] == 1
+    assert ring.stats()["writes_dropped"] == 1
+    assert ring.write_copy(make_frame(4)) == 3
+
+def test_in_place_decode_reuses_slot_buffer():
+    ring = FrameSlotRing(num_slots=2)
+    for value in range(4):
+        idx = ring.begin_write()
+        buffer = ring.slot_buffer(idx)
+        if buffer is None:
+            buffer = make_frame(0)
+        else:
+            buffer[...] = value
+        ring.commit_write(idx, buffer)
+    assert ring.writes_in_place == 2
+    seq, frame = ring.copy_latest()
+    assert seq == 4 and frame[0, 0, 0] == 3 and frame.flags.writeable
+
+def test_newer_than_times_out_without_new_frame():
+    ring = FrameSlotRing()
+    ring.write_copy(make_frame(1))
+    with ring.borrow(newer_than=1, timeout=0.01) as (seq, frame):
+        assert seq == 1 and frame is None
+    assert ring.copy_latest(newer_than=1, timeout=0.01) == (1, None)
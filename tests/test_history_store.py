@@ -0,0 +1,57 @@
+# tests/test_history_store.py
+import os
+import pytest
+from history_store import HistoryStore
+
+T0 = 1_700_000_000 // 3600 * 3600  # awal jam, agar bucket mudah dihitung
+
+def summary(count, grid):
+    return {"kandang": {"chickens_in_roi_count": count, "grid_counts": grid}}
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "nested" / "history.sqlite"), retention_days=0, max_points=500)
+    yield store
+    store.close()
+
+def test_creates_parent_directory(tmp_path, store):
+    assert os.path.isdir(tmp_path / "nested")
+
+def test_resolution_rounds_up_to_rollup_levels():
+    store = HistoryStore(":memory:", max_points=100)
+    assert store.resolution_for(0, 3600, 60) == 60             # muat, tidak ada level rollup <= 60
+    assert store.resolution_for(0, 3600, 400) == 600           # kelipatan rollup 5 menit
+    assert store.resolution_for(0, 86400 * 30) == 3600 * 8     # dibatasi max_points, kelipatan rollup 1 jam
+    assert store.resolution_for(0, 100) == 1
+
+def test_raw_and_rollup_queries_agree(store):
+    for i, count in enumerate([2, 4, 6, 8]):
+        store.record_cycle(T0 + i * 60, summary(count, [[count, 0]]),
+                           [{"sensor_id": "s1", "temperature_celsius": 30.0 + i}, {"sensor_id": "s2", "temperature_celsius": None}])
+    raw = store.query(T0, T0 + 300, resolution_s=60)
+    rollup = store.query(T0, T0 + 300, resolution_s=300, include_grid=True)
+    assert raw["source"] == "raw" and rollup["source"] == "rollup_300s"
+    assert raw["density"]["kandang"]["samples"] == [1, 1, 1, 1]
+    series = rollup["density"]["kandang"]
+    assert series["t"] == [T0] and series["samples"] == [4]
+    assert series["roi_count"] == {"min": [2], "mean": [5.0], "max": [8]}
+    assert series["grid_mean"] == [[[5.0, 0.0]]]
+    assert rollup["temperature"]["s1"]["celsius"]["mean"] == [31.5]
+    assert "s2" not in rollup["temperature"]
+
+def test_hour_rollup_spans_several_five_minute_buckets(store):
+    for i in range(12):
+        store.record_cycle(T0 + i * 300, summary(i, [[i]]))
+    result = store.query(T0, T0 + 3600, resolution_s=3600)
+    assert result["source"] == "rollup_3600s"
+    assert result["density"]["kandang"]["samples"] == [12]
+    assert result["density"]["kandang"]["roi_count"]["max"] == [11]
+
+def test_retention_prunes_old_samples_and_rollups(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.sqlite"), retention_days=1)
+    store.record_cycle(T0, summary(1, [[1]]))
+    store.record_cycle(T0 + 3 * 86400, summary(2, [[2]]))
+    stats = store.stats()
+    assert stats["density_samples"] == 1 and stats["first_ts"] == T0 + 3 * 86400
+    assert stats["rollup_rows"] == 2  # satu baris per level untuk sampel yang tersisa
+    store.close()
@@ -0,0 +1,96 @@
+# tests/test_live_cascade.py
+import threading
+import numpy as np
+import pytest
+from cascade import CascadePolicy
+from chicken_analyzer import ChickenDensityAnalyzer
+from config import Config
+from detection_geometry import build_roi_mask
+from detector_backends import Detections
+
+FRAME_SHAPE = (480, 640, 3)
+ROI = np.array([[0, 0], [639, 0], [639, 479], [0, 479]], dtype=np.float64)
+# Piksel -> meter: frame penuh = lantai 3 x 3 m
+HOMOGRAPHY = np.diag([3.0 / 640, 3.0 / 480, 1.0])
+
+class FakeModel:
+    """Detektor palsu: mengembalikan box tetap dengan conf >= conf yang diminta, dan mencatat permintaannya."""
+    names = {0: "broiler"}
+
+    def __init__(self, boxes):
+        self.boxes = np.array([box[:4] for box in boxes], dtype=np.float32).reshape(-1, 4)
+        self.scores = np.array([box[4] for box in boxes], dtype=np.float32)
+        self.calls = []
+
+    def predict(self, images, conf=0.25):
+        self.calls.append((len(images), conf))
+        keep = self.scores >= conf
+        return [Detections(self.boxes[keep], self.scores[keep], np.zeros(int(keep.sum()), dtype=np.int64)) for _ in images]
+
+class StubCamera:
+    name = "kandang"
+
+    def __init__(self, frame_shape=FRAME_SHAPE, roi=ROI, homography=HOMOGRAPHY):
+        self.calibration = {"roi_mask": build_roi_mask(roi, frame_shape), "roi_polygon": roi, "area_points": None,
+                            "homography": homography, "artifact": None}
+
+    def calibration_for(self, frame_shape):
+        return self.calibration
+
+CONFIDENT = [(40, 40, 80, 80, 0.9), (500, 380, 540, 420, 0.8)]
+WEAK_SINGLE = [(300, 40, 340, 80, 0.3)]
+WEAK_CLUSTER = [(200, 200, 240, 240, 0.2), (245, 200, 285, 240, 0.25), (290, 200, 330, 240, 0.3)]
+
+def make_analyzer(nano_boxes, small_boxes, cascade=True):
+    config = Config()
+    config.TRACKING_ENABLED = False
+    analyzer = object.__new__(ChickenDensityAnalyzer)
+    analyzer.config = config
+    analyzer.yolo_model_n = FakeModel(nano_boxes)
+    analyzer.yolo_model_s = FakeModel(small_boxes)
+    analyzer.cascade = CascadePolicy(config.CASCADE_LOW_CONF, config.CASCADE_HIGH_CONF, min_flagged_boxes=3, min_interval_s=0.0) if cascade else None
+    analyzer._small_model_lock = threading.Lock()
+    return analyzer
+
+def live_boxes(analyzer):
+    camera = StubCamera()
+    analyzer._analyze_and_annotate_frames([np.zeros(FRAME_SHAPE, dtype=np.uint8)], [camera])
+    return sorted(box for box, _ in camera.last_overlays), int(camera.latest_density['counts'].sum())
+
+@pytest.mark.parametrize("weak", [WEAK_SINGLE, []])
+def test_cascade_without_escalation_keeps_nano_only_counts(weak):
+    with_cascade = make_analyzer(CONFIDENT + weak, [])
+    without_cascade = make_analyzer(CONFIDENT + weak, [], cascade=False)
+    assert live_boxes(with_cascade) == live_boxes(without_cascade)
+    assert live_boxes(with_cascade)[1] == 2
+    # Nano diminta sampai batas bawah pita ragu, tetapi model 's' tidak dipanggil
+    assert with_cascade.yolo_model_n.calls[0][1] == pytest.approx(0.15)
+    assert without_cascade.yolo_model_n.calls[0][1] == pytest.approx(0.4)
+    assert with_cascade.yolo_model_s.calls == []
+
+def test_low_confidence_cluster_escalates_to_small_model():
+    # Model 's' (dalam koordinat crop) menemukan dua ayam di region yang diragukan
+    analyzer = make_analyzer(CONFIDENT + WEAK_CLUSTER, [(70, 70, 110, 110, 0.7), (120, 70, 160, 110, 0.6)])
+    boxes, count = live_boxes(analyzer)
+    assert len(analyzer.yolo_model_s.calls) == 1
+    assert count == 4  # 2 box nano yakin + 2 box model 's'; box nano lemah diganti
+    stats = analyzer.cascade.stats()["kandang"]
+    assert stats["escalations"] == 1 and stats["reasons"] == {"low_confidence": 1}
+    assert stats["small_boxes_added"] == 2
+    assert (40, 40, 80, 80) in boxes and (500, 380, 540, 420) in boxes
+
+def test_scaled_live_boxes_stay_float_until_drawn():
+    # Frame 1280 px diperkecil ke 640 untuk YOLO; box diskalakan balik tanpa dibulatkan
+    analyzer = make_analyzer([(40.25, 40.25, 80.25, 80.25, 0.9)], [], cascade=False)
+    seen = []
+    process_detections = analyzer._process_detections
+    def record(frame, detections, camera, draw=True):
+        seen.append(detections['xyxy'])
+        return process_detections(frame, detections, camera, draw=draw)
+    analyzer._process_detections = record
+    big_shape = (960, 1280, 3)
+    camera = StubCamera(big_shape, ROI * 2, np.diag([3.0 / 1280, 3.0 / 960, 1.0]))
+    analyzer._analyze_and_annotate_frames([np.zeros(big_shape, dtype=np.uint8)], [camera])
+    assert seen[0].dtype == np.float32
+    assert seen[0].tolist() == [[80.5, 80.5, 160.5, 160.5]]
+    assert camera.last_overlays == [((80, 80, 160, 160), None)]
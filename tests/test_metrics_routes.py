@@ -0,0 +1,36 @@
+# tests/test_metrics_routes.py
+import pytest
+from flask import Flask
+from metrics import MetricsRegistry, register_metrics_routes
+
+class StubConfig:
+    PROFILER_ENABLED = True
+    PROFILER_SAMPLE_INTERVAL_S = 0.01
+    STREAM_PROCESSING_INTERVAL_S = 1.0
+
+class StubAnalyzer:
+    config = StubConfig()
+    cameras = []
+    outbox = None
+    cascade = None
+    density_worker = None
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    register_metrics_routes(app, StubAnalyzer(), config=StubConfig(), registry=MetricsRegistry())
+    return app.test_client()
+
+@pytest.mark.parametrize("query", ["seconds=abc", "seconds=nan", "seconds=inf", "limit=x", "limit=1.5"])
+def test_profile_rejects_bad_arguments(client, query):
+    response = client.get(f'/debug/profile?{query}')
+    assert response.status_code == 400
+
+def test_profile_clamps_negative_values(client):
+    response = client.get('/debug/profile?seconds=-5&limit=-3')
+    assert response.status_code == 200
+
+def test_metrics_endpoint_renders(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
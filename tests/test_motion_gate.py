@@ -0,0 +1,74 @@
+# tests/test_motion_gate.py
+import numpy as np
+from motion_gate import MotionGate, DETECT, REUSE
+
+def _frame(value=0, size=(120, 160)):
+    return np.full(size + (3,), value, dtype=np.uint8)
+
+def test_first_tick_detects_and_static_scene_is_reused():
+    gate = MotionGate(min_interval_s=0.5, force_detect_s=100.0)
+    assert gate.decide(gate.score(_frame()), now=0.0) == DETECT
+    gate.record(DETECT, 0.01, now=0.0)
+    score = gate.score(_frame())
+    assert score == 0.0
+    assert gate.decide(score, now=1.0) == REUSE
+
+def test_motion_after_interval_detects():
+    gate = MotionGate(min_interval_s=0.5, force_detect_s=100.0, scene_change_threshold=1.1)
+    gate.score(_frame())
+    gate.record(DETECT, 0.01, now=0.0)
+    frame = _frame()
+    frame[:20] = 255
+    score = gate.score(frame)
+    assert score >= gate.motion_threshold
+    assert gate.decide(score, now=0.6) == DETECT
+
+def test_motion_within_own_interval_is_reused():
+    # Interval kamera ini belum habis: tick yang digerakkan kamera lain tidak boleh memicu inferensi
+    gate = MotionGate(min_interval_s=2.0, force_detect_s=100.0, scene_change_threshold=1.1)
+    gate.score(_frame())
+    gate.record(DETECT, 0.01, now=0.0)
+    frame = _frame()
+    frame[:20] = 255
+    assert gate.decide(gate.score(frame), now=0.5) == REUSE
+
+def test_cpu_budget_stretches_interval_and_survives_reuse_ticks():
+    gate = MotionGate(min_interval_s=0.5, max_interval_s=3.0, cpu_budget=0.5, force_detect_s=100.0, scene_change_threshold=1.1)
+    gate.score(_frame())
+    gate.record(DETECT, 1.0, now=0.0)  # inferensi 1 s dengan anggaran 50% -> interval minimal 2 s
+    assert gate.interval_s == 2.0
+    assert gate.stats()["budget_limited"] == 1
+    frame = _frame()
+    frame[:20] = 255
+    assert gate.decide(gate.score(frame), now=1.0) == REUSE
+    gate.record(REUSE, now=1.0)  # masih ada gerak, tetapi interval tidak kembali ke min_interval_s
+    assert gate.interval_s == 2.0
+    assert gate.decide(gate.score(frame), now=2.1) == DETECT
+
+def test_scene_change_and_force_detect_override_interval():
+    gate = MotionGate(min_interval_s=5.0, force_detect_s=10.0, scene_change_threshold=0.25)
+    gate.score(_frame())
+    gate.record(DETECT, 0.01, now=0.0)
+    assert gate.decide(gate.score(_frame(255)), now=1.0) == DETECT
+    assert gate.last_scene_change
+    assert gate.decide(gate.score(_frame()), now=10.0) == DETECT
+
+def test_quiet_scene_backs_off_to_max_interval():
+    gate = MotionGate(min_interval_s=0.5, max_interval_s=1.0, backoff=2.0, force_detect_s=100.0)
+    gate.score(_frame())
+    gate.record(DETECT, 0.0, now=0.0)
+    for tick in range(1, 4):
+        gate.score(_frame())
+        gate.record(REUSE, now=float(tick))
+    assert gate.interval_s == 1.0
+    assert gate.stats()["skip_ratio"] == 0.75
+
+def test_roi_mask_limits_score_to_roi():
+    gate = MotionGate(force_detect_s=100.0)
+    gate.score(_frame())
+    gate.record(DETECT, 0.0, now=0.0)
+    roi_mask = np.zeros((120, 160), dtype=np.uint8)
+    roi_mask[60:, :] = 1
+    frame = _frame()
+    frame[:40] = 255  # perubahan hanya di luar ROI
+    assert gate.score(frame, roi_mask) == 0.0
@@ -0,0 +1,110 @@
+# tests/test_outbox.py
+import os, time
+import pytest
+from fake_supabase import FakeSupabaseHandler
+from outbox import PublishOutbox
+
+class RejectingSupabase(FakeSupabaseHandler):
+    """Supabase palsu yang menolak setiap batch berisi baris dengan kolom 'bad' (mis. pelanggaran constraint)."""
+    def insert_mapping_rows(self, rows):
+        if any(row.get("bad") for row in rows):
+            return False
+        return super().insert_mapping_rows(rows)
+
+class FailingUploadSupabase(RejectingSupabase):
+    """Supabase palsu yang selalu gagal mengunggah file berawalan 'gagal'."""
+    def upload_bytes(self, bucket_name, data, storage_file_name, content_type="application/octet-stream"):
+        if storage_file_name.startswith("gagal"):
+            return {"url": None, "bytes": 0, "latency_s": 0.0}
+        return super().upload_bytes(bucket_name, data, storage_file_name, content_type)
+
+def _artifact(name, data=b"jpeg"):
+    return {"bucket": "b", "file_name": name, "content_type": "image/jpeg", "data": data}
+
+def _spec(row, required=("snapshot_url",)):
+    return {"row": row, "url_fields": {"snapshot_url": "snap"}, "required": list(required)}
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+@pytest.fixture
+def make_outbox(tmp_path):
+    outboxes = []
+    def make(supabase_cls=FakeSupabaseHandler, **kwargs):
+        supabase = supabase_cls(str(tmp_path / "supabase"))
+        outbox = PublishOutbox(str(tmp_path / "outbox"), supabase, num_workers=2, backoff_base_s=0.01, backoff_max_s=0.02, **kwargs)
+        outboxes.append(outbox)
+        return outbox, supabase
+    yield make
+    for outbox in outboxes:
+        outbox.stop()
+
+def test_rows_are_inserted_with_uploaded_urls(make_outbox):
+    outbox, supabase = make_outbox()
+    notified = []
+    outbox.inserted_listeners.append(notified.extend)
+    outbox.enqueue({"snap": _artifact("a.jpg")}, [_spec({"count": 1}), _spec({"count": 2})])
+    outbox.start()
+    assert _wait_until(lambda: len(supabase.rows) == 2)
+    assert all(row["snapshot_url"].startswith("file://") for row in supabase.rows)
+    assert _wait_until(lambda: sorted(row["count"] for row in notified) == [1, 2])
+    assert _wait_until(lambda: outbox.stats()["pending_artifacts"] == 0)
+
+def test_is_running_follows_start_and_stop(make_outbox):
+    outbox, _ = make_outbox()
+    assert not outbox.is_running()
+    outbox.start()
+    assert outbox.is_running()
+    outbox.stop()
+    assert not outbox.is_running()
+
+def test_rows_missing_required_artifact_leave_no_blobs(make_outbox):
+    outbox, _ = make_outbox()
+    outbox.enqueue({"snap": _artifact("a.jpg", data=None), "extra": _artifact("b.jpg")}, [_spec({"count": 1})])
+    stats = outbox.stats()
+    assert stats["pending_jobs"] == 0
+    assert stats["pending_artifacts"] == 0
+
+def test_bad_row_is_isolated_and_failed_after_max_attempts(make_outbox):
+    outbox, supabase = make_outbox(RejectingSupabase, max_attempts=3)
+    outbox.enqueue({"snap": _artifact("a.jpg")}, [_spec({"count": 1}), _spec({"count": 2, "bad": True}), _spec({"count": 3})])
+    outbox.start()
+    assert _wait_until(lambda: len(supabase.rows) == 2)
+    assert sorted(row["count"] for row in supabase.rows) == [1, 3]
+    assert _wait_until(lambda: outbox.stats()["failed_jobs"] == 1)
+    assert outbox.stats()["pending_jobs"] == 0
+
+def test_failed_job_releases_its_blobs(tmp_path, make_outbox):
+    outbox, supabase = make_outbox(FailingUploadSupabase, max_attempts=2)
+    spec = {"row": {"count": 1, "bad": True}, "url_fields": {"snapshot_url": "snap", "heatmap_url": "heat"}, "required": ["snapshot_url"]}
+    outbox.enqueue({"snap": _artifact("a.jpg"), "heat": _artifact("gagal.png")}, [spec])
+    outbox.start()
+    assert _wait_until(lambda: outbox.stats()["failed_jobs"] == 1)
+    # Job mati beserta artefak opsional yang gagal diunggah tidak meninggalkan blob atau baris di disk
+    assert os.listdir(outbox.blob_dir) == []
+    with outbox._db_lock:
+        assert outbox._db.execute("SELECT COUNT(*) FROM jobs").fetchone() == (0,)
+        assert outbox._db.execute("SELECT COUNT(*) FROM artifacts").fetchone() == (0,)
+    assert supabase.rows == []
+
+def test_queue_bound_drops_oldest_jobs(make_outbox):
+    outbox, _ = make_outbox(max_pending_jobs=2)
+    for i in range(4):
+        outbox.enqueue({"snap": _artifact(f"{i}.jpg")}, [_spec({"count": i})])
+    stats = outbox.stats()
+    assert stats["pending_jobs"] == 2
+    assert stats["dropped_jobs"] == 2
+    assert stats["pending_artifacts"] == 2
+
+def test_pending_jobs_survive_restart(make_outbox):
+    outbox, _ = make_outbox()
+    outbox.enqueue({"snap": _artifact("a.jpg")}, [_spec({"count": 1})])
+    restarted, supabase = make_outbox()
+    assert restarted.stats()["pending_jobs"] == 1
+    restarted.start()
+    assert _wait_until(lambda: len(supabase.rows) == 1)
@@ -0,0 +1,57 @@
+# tests/test_stream_variants.py
+import numpy as np
+from mjpeg_streamer import FrameBroadcastHub
+
+def make_frame(value=0):
+    return np.full((64, 96, 3), value, dtype=np.uint8)
+
+def test_variant_encodes_once_per_frame_for_all_clients():
+    hub = FrameBroadcastHub(max_clients=0)
+    first = hub.subscribe(width=48, quality=60)
+    second = hub.subscribe(width=48, quality=60)
+    assert first is second
+    hub.publish(make_frame())
+    seq_a, jpeg_a = first.wait_for_frame(0, timeout=1.0)
+    seq_b, jpeg_b = second.wait_for_frame(0, timeout=1.0)
+    assert seq_a == seq_b == 1 and jpeg_a is jpeg_b
+    assert first.encode_count == 1
+
+def test_new_variant_receives_latest_frame():
+    hub = FrameBroadcastHub()
+    hub.publish(make_frame())
+    variant = hub.subscribe(width=32)
+    seq, jpeg = variant.wait_for_frame(0, timeout=1.0)
+    assert seq == 1 and jpeg.startswith(b"\xff\xd8")
+
+def test_wait_times_out_without_new_frame():
+    hub = FrameBroadcastHub()
+    variant = hub.subscribe()
+    assert variant.wait_for_frame(0, timeout=0.05) is None
+
+def test_max_clients_rejects_extra_subscribers():
+    hub = FrameBroadcastHub(max_clients=1)
+    variant = hub.subscribe()
+    assert hub.subscribe() is None
+    hub.unsubscribe(variant)
+    assert hub.subscribe() is not None
+    assert hub.stats()["clients_rejected"] == 1
+
+def test_idle_variant_is_evicted_when_lru_is_full():
+    hub = FrameBroadcastHub(max_clients=0, max_variants=2)
+    idle = hub.subscribe(width=32)
+    busy = hub.subscribe(width=48)
+    hub.unsubscribe(idle)
+    assert hub.subscribe(width=64) is not None
+    assert (32, hub.jpeg_quality) not in hub.variants
+    assert hub.variants_evicted == 1
+    # Semua varian masih punya penonton -> varian baru ditolak
+    assert hub.subscribe(width=80) is None
+    assert busy.subscribers == 1
+
+def test_transform_runs_before_encode():
+    calls = []
+    hub = FrameBroadcastHub(transform=lambda frame: calls.append(frame.shape) or frame[:, :32])
+    variant = hub.subscribe()
+    hub.publish(make_frame())
+    assert variant.wait_for_frame(0, timeout=1.0) is not None
+    assert calls == [(64, 96, 3)]
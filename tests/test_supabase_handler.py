@@ -0,0 +1,21 @@
+# tests/test_supabase_handler.py
+from supabase_handler import SupabaseHandler
+
+class TimeoutClient:
+    """Klien Supabase yang setiap query-nya time out."""
+    def table(self, name):
+        raise TimeoutError("Supabase time out")
+
+    def rpc(self, name):
+        raise TimeoutError("Supabase time out")
+
+def test_read_methods_return_none_without_client():
+    handler = SupabaseHandler(None, None)
+    assert handler.get_latest_mapping() is None
+    assert handler.get_latest_temperature_data() is None
+
+def test_read_methods_return_none_on_error():
+    handler = SupabaseHandler("https://contoh.supabase.co", "kunci")
+    handler._client = TimeoutClient()
+    assert handler.get_latest_mapping() is None
+    assert handler.get_latest_temperature_data() is None
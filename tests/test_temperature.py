@@ -0,0 +1,46 @@
+# tests/test_temperature.py
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+from scipy.interpolate import griddata
+from temperature import TemperatureInterpolator, interpolator_for
+
+SENSORS = [(0.5, 0.5), (2.5, 0.5), (2.5, 2.5), (0.5, 2.5), (1.5, 1.4)]
+VALUES = [29.0, 30.5, 31.0, 29.5, 32.0]
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+def test_matches_griddata_inside_hull(method):
+    interp = TemperatureInterpolator(SENSORS, 3.0, 3.0, resolution=30, method=method)
+    grid_z = interp.interpolate(VALUES)
+    expected = griddata(np.array(SENSORS), np.array(VALUES), (interp.grid_x, interp.grid_y), method=method)
+    np.testing.assert_allclose(grid_z, expected, atol=1e-4, equal_nan=True)
+    assert np.isnan(grid_z[0, 0])  # sudut kandang di luar hull sensor
+
+@pytest.mark.parametrize("fill", ["nearest", "idw", "mean"])
+def test_fill_strategies_cover_whole_grid(fill):
+    interp = TemperatureInterpolator(SENSORS, 3.0, 3.0, resolution=20, method="linear", fill=fill)
+    grid_z = interp.interpolate(VALUES)
+    assert not np.isnan(grid_z).any()
+    assert min(VALUES) - 1e-9 <= grid_z.min() and grid_z.max() <= max(VALUES) + 1e-9
+    if fill == "nearest":
+        assert grid_z[0, 0] == pytest.approx(29.0)
+    if fill == "mean":
+        assert grid_z[0, 0] == pytest.approx(np.mean(VALUES))
+
+def test_idw_is_exact_at_sensor_and_used_for_collinear_sensors():
+    interp = TemperatureInterpolator([(0.0, 0.0), (1.0, 1.0), (2.0, 2.0)], 2.0, 2.0, resolution=3, method="cubic")
+    grid_z = interp.interpolate([20.0, 25.0, 30.0])
+    assert interp.inside_hull.all()
+    assert grid_z[0, 0] == pytest.approx(20.0) and grid_z[1, 1] == pytest.approx(25.0)
+
+def test_invalid_options_raise():
+    with pytest.raises(ValueError):
+        TemperatureInterpolator(SENSORS, 3.0, 3.0, method="spline")
+    with pytest.raises(ValueError):
+        TemperatureInterpolator(SENSORS, 3.0, 3.0, fill="zero")
+
+def test_interpolator_is_cached_per_sensor_layout():
+    first = interpolator_for(SENSORS, 3, 3, resolution=10)
+    assert interpolator_for(list(SENSORS), 3.0, 3.0, resolution=10) is first
+    assert interpolator_for(SENSORS[:4], 3, 3, resolution=10) is not first
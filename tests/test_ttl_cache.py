@@ -0,0 +1,115 @@
+# tests/test_ttl_cache.py
+import threading, time
+import pytest
+from ttl_cache import SingleFlightTTLCache
+
+def test_value_is_cached_until_ttl_expires():
+    cache = SingleFlightTTLCache()
+    calls = []
+    loader = lambda: calls.append(1) or len(calls)
+    assert cache.get("k", loader, ttl_s=60) == 1
+    assert cache.get("k", loader, ttl_s=60) == 1
+    assert cache.get("other", loader, ttl_s=0) == 2
+    assert cache.get("other", loader, ttl_s=0) == 3
+    assert cache.stats() == {"hits": 1, "misses": 3, "coalesced": 0}
+
+def test_none_is_not_cached_unless_requested():
+    cache = SingleFlightTTLCache()
+    calls = []
+    loader = lambda: calls.append(1)
+    cache.get("k", loader, ttl_s=60)
+    cache.get("k", loader, ttl_s=60)
+    assert len(calls) == 2
+    cache.get("n", loader, ttl_s=60, cache_none=True)
+    cache.get("n", loader, ttl_s=60, cache_none=True)
+    assert len(calls) == 3
+
+def test_concurrent_misses_share_one_fetch():
+    cache = SingleFlightTTLCache()
+    started = threading.Event()
+    calls = []
+    def slow_loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "nilai"
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get("k", slow_loader, ttl_s=60)))
+    leader.start()
+    started.wait(1.0)
+    followers = [threading.Thread(target=lambda: results.append(cache.get("k", slow_loader, ttl_s=60))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(2.0)
+    assert results == ["nilai"] * 5
+    assert len(calls) == 1 and cache.stats()["coalesced"] == 4
+
+def test_failed_fetch_is_retried_by_next_caller():
+    cache = SingleFlightTTLCache()
+    def failing():
+        raise ConnectionError("gagal")
+    with pytest.raises(ConnectionError):
+        cache.get("k", failing, ttl_s=60)
+    assert cache.get("k", lambda: 7, ttl_s=60) == 7
+
+@pytest.mark.parametrize("fails_with", [ConnectionError, None])
+def test_concurrent_waiters_share_leader_failure(fails_with):
+    cache = SingleFlightTTLCache()
+    started = threading.Event()
+    calls = []
+    def slow_failing_loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        if fails_with is not None:
+            raise fails_with("Supabase time out")
+        return None  # hasil error yang tidak di-cache
+    outcomes = []
+    def request():
+        try:
+            outcomes.append(cache.get("k", slow_failing_loader, ttl_s=60))
+        except ConnectionError as e:
+            outcomes.append(type(e))
+    leader = threading.Thread(target=request)
+    leader.start()
+    started.wait(1.0)
+    followers = [threading.Thread(target=request) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(2.0)
+    # Satu fetch untuk semua peminta; tidak ada yang mengulang loader() satu per satu
+    assert len(calls) == 1
+    assert outcomes == [fails_with] * 5
+    assert cache.stats()["coalesced"] == 4
+
+def test_failure_is_cached_for_failure_ttl():
+    cache = SingleFlightTTLCache()
+    calls = []
+    def failing():
+        calls.append(1)
+        raise ConnectionError("gagal")
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            cache.get("k", failing, ttl_s=60, failure_ttl_s=60)
+    assert len(calls) == 1
+    assert cache.get("none", lambda: calls.append(1), ttl_s=60, failure_ttl_s=60) is None
+    assert cache.get("none", lambda: calls.append(1), ttl_s=60, failure_ttl_s=60) is None
+    assert len(calls) == 2
+
+def test_cached_failure_expires():
+    cache = SingleFlightTTLCache()
+    def failing():
+        raise ConnectionError("gagal")
+    with pytest.raises(ConnectionError):
+        cache.get("k", failing, ttl_s=60, failure_ttl_s=0.05)
+    time.sleep(0.06)
+    assert cache.get("k", lambda: 7, ttl_s=60) == 7
+
+def test_put_and_invalidate():
+    cache = SingleFlightTTLCache()
+    cache.put("k", "push", ttl_s=60)
+    assert cache.get("k", lambda: "fetch", ttl_s=60) == "push"
+    cache.invalidate("k")
+    assert cache.get("k", lambda: "fetch", ttl_s=60) == "fetch"
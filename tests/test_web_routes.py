@@ -0,0 +1,71 @@
+# tests/test_web_routes.py
+import json
+import pytest
+from flask import Flask
+from event_bus import EventBus
+from web_routes import PLACEHOLDER_MAPPING, register_web_routes
+
+class DownSupabase:
+    """Supabase yang tidak bisa dihubungi: setiap query melempar error."""
+    def get_latest_mapping(self):
+        raise RuntimeError("Supabase tidak bisa dihubungi")
+
+    def get_latest_temperature_data(self):
+        raise RuntimeError("Supabase tidak bisa dihubungi")
+
+@pytest.fixture
+def event_bus():
+    return EventBus()
+
+@pytest.fixture
+def client(event_bus):
+    app = Flask(__name__)
+    register_web_routes(app, DownSupabase(), event_bus=event_bus)
+    return app.test_client()
+
+def first_sse_event(response):
+    chunks = response.response
+    text = next(iter(chunks))
+    text = text.decode() if isinstance(text, bytes) else text
+    fields = dict(line.split(": ", 1) for line in text.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+def test_events_snapshot_degrades_to_placeholders_when_supabase_is_down(client, event_bus):
+    response = client.get('/api/events', buffered=False)
+    try:
+        assert response.status_code == 200
+        event_type, data = first_sse_event(response)
+        assert event_type == "snapshot"
+        assert data["mapping"] == PLACEHOLDER_MAPPING
+        assert data["temperature"] == {"individual_sensors": []}
+    finally:
+        response.close()
+    assert event_bus.subscribers == 0
+
+def test_events_snapshot_prefers_published_state(client, event_bus):
+    event_bus.publish("mapping", {"density_plot_url": "a", "heatmap_plot_url": "b"})
+    response = client.get('/api/events', buffered=False)
+    try:
+        _, data = first_sse_event(response)
+        assert data["mapping"] == {"density_plot_url": "a", "heatmap_plot_url": "b"}
+    finally:
+        response.close()
+
+class MemoryHistory:
+    def query(self, from_ts, to_ts, resolution_s=None, include_grid=False):
+        return {"from": from_ts, "to": to_ts, "resolution_s": resolution_s}
+
+@pytest.mark.parametrize("query", ["resolution=nan", "resolution=inf", "resolution=-infh", "from=nan", "to=inf", "from=-inf&to=10", "resolution=abc"])
+def test_history_rejects_non_finite_arguments(query):
+    app = Flask(__name__)
+    register_web_routes(app, DownSupabase(), history=MemoryHistory())
+    response = app.test_client().get(f'/api/history?{query}')
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+def test_history_accepts_duration_units():
+    app = Flask(__name__)
+    register_web_routes(app, DownSupabase(), history=MemoryHistory())
+    response = app.test_client().get('/api/history?from=0&to=7200&resolution=15m')
+    assert response.status_code == 200
+    assert response.get_json() == {"from": 0.0, "to": 7200.0, "resolution_s": 900.0}
@@ -0,0 +1,102 @@
+# tiled_inference.py
+"""
+Inferensi ber-tile (gaya SAHI) untuk frame resolusi tinggi.
+Bounding box ROI dibagi menjadi tile yang saling tumpang tindih, tile di luar poligon ROI dilewati,
+semua tile (dari semua kamera) dijalankan dalam satu batch, lalu box digabung dengan NMS lintas tile.
+"""
+import cv2
+import numpy as np
+
+def plan_tiles(roi_mask, tile_size, overlap):
+    """
+    Daftar tile (x0, y0, x1, y1) yang menutupi bounding box ROI dengan tumpang tindih `overlap` (0..<1).
+    Tile yang sama sekali tidak mengenai ROI tidak diikutkan. Tile di tepi digeser masuk agar ukurannya tetap.
+    """
+    height, width = roi_mask.shape[:2]
+    ys, xs = np.nonzero(roi_mask)
+    if len(xs) == 0:
+        return []
+    bx0, bx1, by0, by1 = int(xs.min()), int(xs.max()) + 1, int(ys.min()), int(ys.max()) + 1
+    tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+    stride_x = max(1, int(tile_w * (1 - overlap)))
+    stride_y = max(1, int(tile_h * (1 - overlap)))
+
+    def starts(lo, hi, tile, stride, limit):
+        positions = list(range(lo, max(lo, hi - tile) + 1, stride))
+        if positions[-1] + tile < hi:
+            positions.append(hi - tile)
+        return sorted({min(max(0, p), limit - tile) for p in positions})
+
+    tiles = []
+    for y0 in starts(by0, by1, tile_h, stride_y, height):
+        for x0 in starts(bx0, bx1, tile_w, stride_x, width):
+            if roi_mask[y0:y0 + tile_h, x0:x0 + tile_w].any():
+                tiles.append((x0, y0, x0 + tile_w, y0 + tile_h))
+    return tiles
+
+def merge_tile_detections(boxes_per_tile, conf_per_tile, offsets, iou_threshold):
+    """Geser box setiap tile ke koordinat frame lalu gabungkan dengan NMS lintas tile."""
+    shifted = [boxes + np.array([ox, oy, ox, oy], dtype=np.float32) for boxes, (ox, oy) in zip(boxes_per_tile, offsets) if len(boxes)]
+    if not shifted:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    xyxy = np.concatenate(shifted).astype(np.float32)
+    conf = np.concatenate([c for c in conf_per_tile if len(c)]).astype(np.float32)
+    xywh = np.column_stack([xyxy[:, :2], xyxy[:, 2:] - xyxy[:, :2]])
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), conf.tolist(), 0.0, iou_threshold)
+    keep = np.asarray(keep, dtype=np.int64).ravel()
+    return xyxy[keep], conf[keep]
+
+
+class TiledDetector:
+    """Menjalankan model pada tile ROI (ditambah frame penuh jika diminta) untuk beberapa frame sekaligus."""
+    def __init__(self, tile_size=640, overlap=0.2, nms_iou=0.5, include_full_frame=True):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.nms_iou = nms_iou
+        self.include_full_frame = include_full_frame
+        self._plan_cache = {}
+        self.last_stats = {}
+
+    def tiles_for(self, camera, frame_shape):
+        key = (camera.name, tuple(frame_shape[:2]))
+        tiles = self._plan_cache.get(key)
+        if tiles is None:
+            roi_mask = camera.get_roi_mask(frame_shape)
+            tiles = plan_tiles(roi_mask, self.tile_size, self.overlap) if roi_mask is not None else []
+            if not tiles:
+                tiles = [(0, 0, frame_shape[1], frame_shape[0])]
+            self._plan_cache[key] = tiles
+        return tiles
+
+    def detect(self, model, frames, cameras, extract_boxes, conf=0.2):
+        """
+        model adalah detektor dari detector_backends; extract_boxes(Detections) -> (xyxy (N,4), conf (N,)).
+        Mengembalikan satu dict {'xyxy', 'conf'} per frame dalam koordinat frame asli.
+        """
+        crops, owners, offsets = [], [], []
+        for frame_idx, (frame, camera) in enumerate(zip(frames, cameras)):
+            for x0, y0, x1, y1 in self.tiles_for(camera, frame.shape):
+                crops.append(frame[y0:y1, x0:x1])  # view, tanpa salinan
+                owners.append(frame_idx)
+                offsets.append((x0, y0))
+            if self.include_full_frame:
+                # Frame penuh (diperkecil model ke tile_size) tetap menangkap ayam besar yang terpotong tile
+                crops.append(frame)
+                owners.append(frame_idx)
+                offsets.append((0, 0))
+
+        results = model.predict(crops, conf=conf, imgsz=self.tile_size) if crops else []
+        per_frame = [([], [], []) for _ in frames]
+        for result, frame_idx, offset in zip(results, owners, offsets):
+            xyxy, scores = extract_boxes(result)
+            boxes_list, conf_list, offset_list = per_frame[frame_idx]
+            boxes_list.append(xyxy)
+            conf_list.append(scores)
+            offset_list.append(offset)
+
+        self.last_stats = {"frames": len(frames), "crops": len(crops)}
+        detections = []
+        for boxes_list, conf_list, offset_list in per_frame:
+            xyxy, scores = merge_tile_detections(boxes_list, conf_list, offset_list, self.nms_iou)
+            detections.append({'xyxy': xyxy, 'conf': scores})
+        return detections
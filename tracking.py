@@ -0,0 +1,122 @@
+# tracking.py
+"""
+Pelacakan ayam ringan berbasis IoU (asosiasi dua tahap ala ByteTrack) untuk deteksi model nano.
+Track yang sesaat tertutup (occlusion) tetap dipertahankan beberapa frame sehingga hitungan per sel
+tidak langsung turun hanya karena satu frame yang buruk.
+"""
+import threading
+import numpy as np
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU semua pasangan box (N,4) x (M,4) format xyxy, dihitung sekaligus."""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0).astype(np.float32)
+
+def greedy_match(iou, threshold):
+    """Pasangkan (baris, kolom) dengan IoU tertinggi lebih dulu; setiap baris/kolom dipakai sekali."""
+    matches = []
+    if iou.size == 0:
+        return matches
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_rows, used_cols = set(), set()
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        matches.append((r, c))
+    return matches
+
+
+class Track:
+    """Satu ayam yang dilacak: box piksel terakhir, posisi dunia (meter), dan umur."""
+    __slots__ = ("track_id", "box", "conf", "hits", "missed", "world_xy")
+
+    def __init__(self, track_id, box, conf):
+        self.track_id = track_id
+        self.box = box
+        self.conf = conf
+        self.hits = 1
+        self.missed = 0
+        self.world_xy = None  # (x, y) meter, None jika di luar ROI / belum diproyeksikan
+
+    def as_dict(self):
+        return {"id": self.track_id, "box": self.box.tolist(), "conf": float(self.conf), "hits": self.hits, "missed": self.missed,
+                "world_xy": None if self.world_xy is None else [float(v) for v in self.world_xy]}
+
+
+class IoUTracker:
+    """
+    Asosiasi dua tahap: deteksi ber-confidence tinggi dicocokkan ke semua track, lalu deteksi rendah
+    ke track yang tersisa (hanya memperpanjang track, tidak membuat track baru).
+    Track dianggap pasti setelah min_hits deteksi dan dihapus setelah max_missed frame tanpa deteksi.
+    """
+    def __init__(self, iou_threshold=0.3, high_conf=0.4, max_missed=10, min_hits=3):
+        self.iou_threshold = iou_threshold
+        self.high_conf = high_conf
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.tracks = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def update(self, xyxy, conf):
+        """Perbarui track dengan deteksi satu frame; mengembalikan track pasti yang masih hidup."""
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        conf = np.asarray(conf, dtype=np.float32).ravel()
+        high = np.nonzero(conf >= self.high_conf)[0]
+        low = np.nonzero(conf < self.high_conf)[0]
+        with self._lock:
+            track_boxes = np.array([t.box for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+            matched_tracks = set()
+
+            # Tahap 1: deteksi tinggi ke semua track
+            unmatched_high = set(high.tolist())
+            for t_idx, d_pos in greedy_match(iou_matrix(track_boxes, xyxy[high]), self.iou_threshold):
+                self._assign(self.tracks[t_idx], xyxy[high[d_pos]], conf[high[d_pos]])
+                matched_tracks.add(t_idx)
+                unmatched_high.discard(int(high[d_pos]))
+
+            # Tahap 2: deteksi rendah hanya ke track pasti yang belum terpasang
+            remaining = [i for i, t in enumerate(self.tracks) if i not in matched_tracks and t.hits >= self.min_hits]
+            if remaining and len(low):
+                for r_pos, d_pos in greedy_match(iou_matrix(track_boxes[remaining], xyxy[low]), self.iou_threshold):
+                    self._assign(self.tracks[remaining[r_pos]], xyxy[low[d_pos]], conf[low[d_pos]])
+                    matched_tracks.add(remaining[r_pos])
+
+            for i, track in enumerate(self.tracks):
+                if i not in matched_tracks:
+                    track.missed += 1
+            self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+            for d_idx in sorted(unmatched_high):
+                self.tracks.append(Track(self._next_id, xyxy[d_idx].copy(), conf[d_idx]))
+                self._next_id += 1
+            return [t for t in self.tracks if t.hits >= self.min_hits]
+
+    def _assign(self, track, box, conf):
+        track.box = box.copy()
+        track.conf = conf
+        track.hits += 1
+        track.missed = 0
+
+    def set_world_positions(self, tracks, world_points):
+        """Simpan posisi dunia hasil proyeksi homografi per track (None = di luar ROI)."""
+        with self._lock:
+            for track, world_xy in zip(tracks, world_points):
+                track.world_xy = world_xy
+
+    def confirmed_tracks(self):
+        """Salinan track pasti saat ini (aman dibaca dari thread lain)."""
+        with self._lock:
+            return [t.as_dict() for t in self.tracks if t.hits >= self.min_hits]
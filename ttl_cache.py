@@ -0,0 +1,78 @@
+# ttl_cache.py
+import threading, time
+
+class _Flight:
+    """Satu fetch yang sedang berjalan; hasil atau exception-nya dibagikan ke semua peminta yang menunggu."""
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightTTLCache:
+    """
+    Cache nilai per kunci dengan TTL; miss bersamaan untuk kunci yang sama berbagi SATU fetch, termasuk saat fetch gagal.
+    Kegagalan (exception, atau None jika cache_none=False) bisa di-cache singkat lewat failure_ttl_s agar sumber
+    yang sedang mati tidak dipanggil ulang oleh setiap peminta.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (value, expires_at, error)
+        self._inflight = {}  # key -> _Flight milik thread yang sedang fetch
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key, loader, ttl_s, cache_none=False, failure_ttl_s=0.0):
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > time.monotonic():
+                    self.hits += 1
+                    if entry[2] is not None:
+                        raise entry[2]
+                    return entry[0]
+                flight = self._inflight.get(key)
+                is_leader = flight is None
+                if is_leader:
+                    flight = self._inflight[key] = _Flight()
+                    self.misses += 1
+                else:
+                    self.coalesced += 1
+
+            if not is_leader:
+                if not flight.event.wait(timeout=30):
+                    continue  # pemimpin macet; tunggu lagi (atau menjadi pemimpin jika fetch-nya sudah dilepas)
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+
+            try:
+                flight.value = loader()
+                return flight.value
+            except Exception as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    if flight.error is None and (flight.value is not None or cache_none):
+                        self._entries[key] = (flight.value, time.monotonic() + ttl_s, None)
+                    elif failure_ttl_s > 0:
+                        self._entries[key] = (None, time.monotonic() + failure_ttl_s, flight.error)
+                    self._inflight.pop(key, None)
+                flight.event.set()
+
+    def put(self, key, value, ttl_s):
+        """Isi cache secara langsung (push), mis. saat siklus pemetaan menyimpan baris baru."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_s, None)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
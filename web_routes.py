@@ -1,37 +1,133 @@
 # web_routes.py
 
-from flask import render_template, jsonify
+import hashlib, json, math, threading, time
+from datetime import datetime
+from flask import render_template, jsonify, request, Response
+from ttl_cache import SingleFlightTTLCache
 
-def register_web_routes(app, supabase_handler):
+PLACEHOLDER_MAPPING = {
+    "density_plot_url": "https://via.placeholder.com/300x200/343a40/ffffff?text=No+Density+Data",
+    "heatmap_plot_url": "https://via.placeholder.com/300x200/343a40/ffffff?text=No+Heatmap+Data"
+}
+
+class DashboardDataCache:
+    """Cache server-side untuk /api/dashboard_data: TTL per bagian + penggabungan request yang miss bersamaan."""
+    def __init__(self, supabase_handler, mapping_ttl_s=120.0, temperature_ttl_s=10.0, failure_ttl_s=5.0):
+        self.supabase_handler = supabase_handler
+        self.mapping_ttl_s = mapping_ttl_s
+        self.temperature_ttl_s = temperature_ttl_s
+        self.failure_ttl_s = failure_ttl_s
+        self.cache = SingleFlightTTLCache()
+        self._publisher_lock = threading.Lock()
+        self._publisher_started = False
+
+    def get_mapping(self):
+        # 1. Ambil data plot terakhir dari tabel 'density_mappings'; kosong/error (None) hanya di-cache failure_ttl_s
+        mapping = self.cache.get("mapping", self.supabase_handler.get_latest_mapping, self.mapping_ttl_s, failure_ttl_s=self.failure_ttl_s)
+        return mapping or dict(PLACEHOLDER_MAPPING)
+
+    def get_temperature(self):
+        # 2. Ambil data suhu terakhir dari semua sensor; hasil error (None) hanya di-cache failure_ttl_s
+        return self.cache.get("temperature", self.supabase_handler.get_latest_temperature_data, self.temperature_ttl_s, failure_ttl_s=self.failure_ttl_s)
+
+    def snapshot(self, event_bus):
+        """Keadaan lengkap dashboard untuk klien SSE baru atau yang tertinggal dari ring buffer."""
+        # Supabase yang mati tidak boleh menggagalkan stream: pakai placeholder seperti /api/dashboard_data
+        mapping = event_bus.latest.get("mapping")
+        if not mapping:
+            try:
+                mapping = self.get_mapping()
+            except Exception as e:
+                print(f"[SSE] Error mengambil data pemetaan untuk snapshot: {e}")
+                mapping = dict(PLACEHOLDER_MAPPING)
+        temperature_data = event_bus.latest.get("temperature")
+        if not temperature_data:
+            try:
+                temperature_data = self.get_temperature() or []
+            except Exception as e:
+                print(f"[SSE] Error mengambil data suhu untuk snapshot: {e}")
+                temperature_data = []
+        return {
+            "mapping": mapping,
+            "temperature": {"individual_sensors": temperature_data},
+            "density": event_bus.latest.get("density")
+        }
+
+    def push_mapping(self, db_row):
+        """Dipanggil setelah siklus pemetaan menyimpan baris baru, agar dashboard tidak menunggu TTL habis."""
+        mapping = {key: db_row.get(key) for key in ("density_plot_url", "heatmap_plot_url")}
+        self.cache.put("mapping", mapping, self.mapping_ttl_s)
+
+    def ensure_temperature_publisher(self, event_bus):
+        """Mulai (sekali) thread yang mem-push data suhu ke event_bus; dipanggil saat ada pelanggan SSE pertama."""
+        with self._publisher_lock:
+            if not self._publisher_started:
+                threading.Thread(target=_temperature_publisher_loop, args=(self, event_bus, self.temperature_ttl_s), daemon=True).start()
+                self._publisher_started = True
+
+
+def _temperature_publisher_loop(dashboard_cache, event_bus, interval_s):
+    """Ambil data sensor sekali per interval (bukan per penonton) dan push jika berubah, hanya saat ada subscriber."""
+    while True:
+        if event_bus.subscribers > 0:
+            try:
+                temperature_data = dashboard_cache.get_temperature()
+                if temperature_data is not None:
+                    event_bus.publish_if_changed("temperature", temperature_data)
+            except Exception as e:
+                print(f"[SSE] Error mengambil data suhu: {e}")
+        time.sleep(interval_s)
+
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def _finite(number, value):
+    # float() menerima 'nan' & 'inf' yang membuat math.ceil di HistoryStore gagal
+    if not math.isfinite(number):
+        raise ValueError(f"'{value}' bukan angka berhingga")
+    return number
+
+def _parse_time_arg(value, default):
+    """Epoch detik atau ISO 8601 (mis. 2024-05-01T00:00:00)."""
+    if not value:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+    return _finite(number, value)
+
+def _parse_duration_arg(value):
+    """Detik, atau angka dengan satuan s/m/h/d (mis. 15m, 1h); kosong = otomatis."""
+    if not value:
+        return None
+    unit = value[-1].lower()
+    if unit in _DURATION_UNITS:
+        return _finite(float(value[:-1]) * _DURATION_UNITS[unit], value)
+    return _finite(float(value), value)
+
+
+def register_web_routes(app, supabase_handler, outbox=None, config=None, event_bus=None, analyzer=None, startup_profile=None, history=None):
+    dashboard_cache = DashboardDataCache(
+        supabase_handler,
+        mapping_ttl_s=getattr(config, "DASHBOARD_MAPPING_TTL_S", 120.0),
+        temperature_ttl_s=getattr(config, "DASHBOARD_TEMPERATURE_TTL_S", 10.0),
+        failure_ttl_s=getattr(config, "DASHBOARD_FAILURE_TTL_S", 5.0)
+    )
+    # ETag terakhir & kapan isinya terakhir berubah, untuk header Last-Modified
+    last_payload = {"etag": None, "modified_at": time.time()}
 
     @app.route('/')
     def index():
-        return render_template('index.html', title='Dashboard Kandang Broiler')
+        # Port server SSE async (None = dashboard memakai /api/events di server ini)
+        return render_template('index.html', title='Dashboard Kandang Broiler', events_port=getattr(config, "EVENTS_ASYNC_PORT", None))
 
     # --- API BARU YANG MENGGABUNGKAN SEMUA DATA ---
     @app.route('/api/dashboard_data')
     def get_dashboard_data():
         try:
-            # 1. Ambil data plot terakhir dari tabel 'density_mappings'
-            # --- Pastikan memilih 'heatmap_plot_url' juga ---
-            mapping_response = supabase_handler.client.table("density_mappings") \
-                .select("density_plot_url, heatmap_plot_url") \
-                .order("id", desc=True) \
-                .limit(1) \
-                .execute()
-
-            if mapping_response.data:
-                latest_mapping_data = mapping_response.data[0]
-            else:
-                # Sediakan data placeholder jika tabel mapping kosong
-                latest_mapping_data = {
-                    "density_plot_url": "https://via.placeholder.com/300x200/343a40/ffffff?text=No+Density+Data",
-                    "heatmap_plot_url": "https://via.placeholder.com/300x200/343a40/ffffff?text=No+Heatmap+Data"
-                }
-
-            # 2. Ambil data suhu terakhir dari semua sensor
-            # --- Panggil fungsi baru yang sudah kita buat ---
-            temperature_data = supabase_handler.get_latest_temperature_data()
+            latest_mapping_data = dashboard_cache.get_mapping()
+            temperature_data = dashboard_cache.get_temperature()
 
             # Buat struktur data suhu untuk dikirim
             if temperature_data is None:
@@ -46,8 +142,16 @@ def register_web_routes(app, supabase_handler):
                 "mapping": latest_mapping_data,
                 "temperature": temperature_data_to_send
             }
-            
-            return jsonify(final_data)
+
+            # Polling yang datanya belum berubah cukup dijawab 304 tanpa body
+            etag = hashlib.md5(json.dumps(final_data, sort_keys=True, default=str).encode()).hexdigest()
+            if etag != last_payload["etag"]:
+                last_payload["etag"], last_payload["modified_at"] = etag, time.time()
+            response = jsonify(final_data)
+            response.set_etag(etag)
+            response.last_modified = last_payload["modified_at"]
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
 
         except Exception as e:
             print(f"Error fatal di API /api/dashboard_data: {e}")
@@ -59,4 +163,85 @@ def register_web_routes(app, supabase_handler):
                     "heatmap_plot_url": "https://via.placeholder.com/300x200/343a40/ffffff?text=API+Error"
                 },
                 "temperature": {"individual_sensors": []}
-            }), 500
\ No newline at end of file
+            }), 500
+
+    if event_bus is not None:
+        heartbeat_s = getattr(config, "EVENTS_HEARTBEAT_S", 15.0)
+        max_subscribers = getattr(config, "EVENTS_MAX_SUBSCRIBERS", 100)
+
+        def generate_events(last_id):
+            # Klien baru atau yang tertinggal terlalu jauh mendapat snapshot penuh, sisanya hanya delta
+            if last_id is None or last_id > event_bus.latest_id:
+                last_id = event_bus.latest_id
+                yield event_bus.format_sse(last_id, "snapshot", json.dumps(dashboard_cache.snapshot(event_bus), default=str))
+            yield "retry: 5000\n\n"
+            while True:
+                events = event_bus.wait_for_events(last_id, timeout=heartbeat_s)
+                if events is None:
+                    last_id = event_bus.latest_id
+                    yield event_bus.format_sse(last_id, "snapshot", json.dumps(dashboard_cache.snapshot(event_bus), default=str))
+                    continue
+                if not events:
+                    yield ": ping\n\n"  # heartbeat agar proxy tidak menutup koneksi idle
+                    continue
+                for event_id, event_type, data_json in events:
+                    yield event_bus.format_sse(event_id, event_type, data_json)
+                    last_id = event_id
+
+        # Setiap koneksi SSE di sini memegang satu thread server WSGI selama terhubung (generator berjalan di thread request),
+        # jadi jumlahnya dibatasi EVENTS_MAX_SUBSCRIBERS. Dashboard memakai event_server.AsyncEventServer
+        # (EVENTS_ASYNC_PORT) untuk ratusan koneksi idle; route ini cadangan jika server async dimatikan.
+        @app.route('/api/events')
+        def events():
+            last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+            try:
+                last_id = int(last_event_id) if last_event_id else None
+            except ValueError:
+                last_id = None
+            if not event_bus.add_subscriber(max_subscribers):
+                return Response("Jumlah koneksi event sudah maksimal.", status=503, mimetype='text/plain')
+            dashboard_cache.ensure_temperature_publisher(event_bus)
+            response = Response(generate_events(last_id), mimetype='text/event-stream')
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Accel-Buffering'] = 'no'
+            response.call_on_close(event_bus.remove_subscriber)
+            return response
+
+    @app.route('/api/ready')
+    def get_readiness():
+        # 200 jika semua komponen siap, 503 (dengan status per komponen) selama masih startup atau ada yang gagal
+        payload = analyzer.readiness() if analyzer is not None else {"ready": False, "components": {}}
+        payload["components"]["web"] = {"status": "ready"}
+        if startup_profile is not None:
+            payload["startup"] = startup_profile.as_dict()
+        return jsonify(payload), 200 if payload["ready"] else 503
+
+    @app.route('/api/history')
+    def get_history():
+        # ?from=&to= (epoch detik atau ISO 8601, default 24 jam terakhir) &resolution= (mis. 300, 15m, 1h) &grid=1
+        if history is None:
+            return jsonify({"error": "Riwayat lokal tidak aktif (HISTORY_ENABLED = False)."}), 404
+        try:
+            to_ts = _parse_time_arg(request.args.get("to"), time.time())
+            from_ts = _parse_time_arg(request.args.get("from"), to_ts - 86400)
+            resolution_s = _parse_duration_arg(request.args.get("resolution"))
+        except ValueError as e:
+            return jsonify({"error": f"Parameter tidak valid: {e}"}), 400
+        if from_ts >= to_ts:
+            return jsonify({"error": "'from' harus lebih awal dari 'to'."}), 400
+        return jsonify(history.query(from_ts, to_ts, resolution_s, include_grid=request.args.get("grid") == "1"))
+
+    @app.route('/api/outbox_stats')
+    def get_outbox_stats():
+        if outbox is None:
+            return jsonify({"enabled": False})
+        return jsonify(dict(outbox.stats(), enabled=True))
+
+    @app.route('/api/cascade_stats')
+    def get_cascade_stats():
+        # Laporan kaskade nano -> small: seberapa sering eskalasi terpicu, dijalankan, dan alasannya (per kamera)
+        if analyzer is None or analyzer.cascade is None:
+            return jsonify({"enabled": False})
+        return jsonify({"enabled": True, "cameras": analyzer.cascade.stats()})
+
+    return dashboard_cache